@@ -146,6 +146,12 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": time.time()}
 
+@app.get("/api/rate-limits")
+async def rate_limit_stats():
+    """Counters of the provider rate limiters of the backend process"""
+    from cmbagent.utils.rate_limit import get_rate_limiter
+    return {"limits": get_rate_limiter().limits, "limiters": get_rate_limiter().stats()}
+
 @app.post("/api/task/submit", response_model=TaskResponse)
 async def submit_task(request: TaskRequest):
     """Submit a task for execution"""
@@ -259,6 +265,33 @@ async def get_file_content(path: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/files/transcript")
+async def get_transcript(path: str, agent: Optional[str] = None, tail: int = 0):
+    """Get the messages of a chat transcript (chats/transcript*.jsonl), optionally of one agent or the last ones"""
+    from cmbagent.utils.transcript import read_transcript, tail_transcript
+
+    try:
+        if path.startswith("~"):
+            path = os.path.expanduser(path)
+
+        path = os.path.abspath(path)
+
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="Transcript not found")
+
+        agents = [agent] if agent else None
+        if tail > 0:
+            messages = tail_transcript(path, n=tail, agents=agents)
+        else:
+            messages = list(read_transcript(path, agents=agents))
+
+        return {"path": path, "messages": messages}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/api/files/clear-directory")
 async def clear_directory(path: str):
     """Clear all contents of a directory"""
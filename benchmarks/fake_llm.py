@@ -0,0 +1,361 @@
+"""Deterministic, offline OpenAI-compatible chat completions endpoint.
+
+Used by the benchmarks to measure cmbagent's own overhead without any model
+latency. Point the OpenAI SDK at it with ``OPENAI_BASE_URL``::
+
+    python benchmarks/fake_llm.py --port 8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-fake python my_script.py
+
+Replies are derived only from the request, so the same conversation always
+produces the same transcript:
+
+- ``response_format`` with a JSON schema: the content is a minimal instance of
+  the schema (structured output formatters).
+- ``tool_choice`` naming a function, or ``"required"``: that function (or the
+  preferred available one) is called.
+- ``tools`` available: workflow functions (``record_status``, ``record_plan``,
+  ...) are always called; other functions (hand-offs) only if they have not
+  been called yet in the conversation. Otherwise the agent answers in plain
+  text.
+- otherwise: a short plain text answer.
+
+Tool arguments are generated from the function's JSON schema. Enums prefer
+values that make a workflow move forward (``success``, ``completed``, ...).
+``record_status`` walks the plan like a well-behaved controller: each step is
+reported ``in progress`` (so the agent in charge runs once) and then
+``completed``.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# values picked from enums when available, in order of preference
+PREFERRED_ENUM_VALUES = (
+    "success", "completed", "complete", "continue", "proceed", "yes", "true",
+)
+
+# functions that end or advance the workflows, tried before anything else
+PREFERRED_TOOLS = (
+    "post_execution_transfer",
+    "record_status",
+    "record_plan",
+    "record_review",
+    "record_aas_keywords",
+    "terminate_session",
+)
+
+# length of generated arrays, e.g. two plan steps so multi-step loops are exercised
+ARRAY_LENGTH = 2
+
+BENCHMARK_CODE = (
+    "import numpy as np\n"
+    "x = np.arange(10)\n"
+    "print('benchmark', x.sum())\n"
+)
+
+
+def _resolve_ref(schema, root):
+    ref = schema.get("$ref")
+    if not ref or not ref.startswith("#/"):
+        return schema
+    node = root
+    for part in ref[2:].split("/"):
+        node = node[part]
+    return node
+
+
+# string arguments with these words copy the last text message (e.g. a formatted plan)
+ECHO_ARGUMENT_WORDS = ("plan", "suggestion", "recommendation")
+
+
+def _string_for(name, echo=""):
+    name = (name or "").lower()
+    if echo and any(word in name for word in ECHO_ARGUMENT_WORDS):
+        return echo
+    if "code" in name and "explanation" not in name:
+        return BENCHMARK_CODE
+    if "filename" in name or name.endswith("file"):
+        return "benchmark_script.py"
+    if "path" in name:
+        return ""
+    if "keyword" in name:
+        return "Cosmology"
+    return f"benchmark {name}".strip()
+
+
+def instance_from_schema(schema, root=None, name=None, echo=""):
+    """Return a small value valid under ``schema`` (subset of JSON schema).
+
+    ``echo`` is used for string fields that are expected to copy earlier output.
+    """
+    root = root if root is not None else schema
+    schema = _resolve_ref(schema, root)
+
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        for value in PREFERRED_ENUM_VALUES:
+            if value in schema["enum"]:
+                return value
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [option for option in schema[key] if _resolve_ref(option, root).get("type") != "null"]
+            return instance_from_schema((options or schema[key])[0], root, name, echo)
+    if "allOf" in schema:
+        return instance_from_schema(schema["allOf"][0], root, name, echo)
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+    if schema_type is None and "properties" in schema:
+        schema_type = "object"
+
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        return {key: instance_from_schema(value, root, key, echo) for key, value in properties.items()}
+    if schema_type == "array":
+        if name and "depends_on" in name:
+            # independent plan steps, so that parallel execution is exercised
+            return []
+        n_items = max(ARRAY_LENGTH, schema.get("minItems", 0))
+        if "maxItems" in schema:
+            n_items = min(n_items, schema["maxItems"])
+        return [instance_from_schema(schema.get("items", {}), root, name, echo) for _ in range(n_items)]
+    if schema_type == "integer":
+        if name and "number_of_steps" in name:
+            return ARRAY_LENGTH
+        return int(schema.get("minimum", 1))
+    if schema_type == "number":
+        return float(schema.get("minimum", 1.0))
+    if schema_type == "boolean":
+        return True
+    if schema_type == "null":
+        return None
+    if "default" in schema:
+        return schema["default"]
+    return _string_for(name, echo)
+
+
+def _last_text(messages):
+    for message in reversed(messages):
+        content = message.get("content")
+        if isinstance(content, str) and content.strip() and message.get("role") != "system":
+            return content
+    return ""
+
+
+def _called_tools(messages):
+    called = set()
+    for message in messages:
+        for tool_call in message.get("tool_calls") or []:
+            called.add(tool_call.get("function", {}).get("name"))
+    return called
+
+
+def _plan_progress(messages):
+    """Return the ``(step, status)`` the controller should record next.
+
+    The last ``record_status`` output in the conversation is advanced by one
+    transition. Without one, the state comes from the controller's prompt.
+    """
+    for message in reversed(messages):
+        content = message.get("content")
+        if message.get("role") != "tool" or not isinstance(content, str):
+            continue
+        step = re.search(r"\*\*Step number:\*\* (\d+) out of", content)
+        status = re.search(r"\*\*Status:\*\* ([a-z ]+)", content)
+        if step and status:
+            step, status = int(step.group(1)), status.group(1).strip()
+            if status == "completed":
+                return step + 1, "in progress"
+            if status == "in progress":
+                return step, "completed"
+            return step, "in progress"
+
+    system = next((m.get("content") for m in messages if m.get("role") == "system"), "") or ""
+    step = re.search(r"\*\*Current step in plan:\*\*\s*(\d+)", system)
+    status = re.search(r"\*\*Current status:\*\*\s*([A-Za-z ]+)", system)
+    step = int(step.group(1)) if step else 1
+    if status and status.group(1).strip().lower() == "in progress":
+        return step, "completed"
+    return step, "in progress"
+
+
+def _pick_tool(request):
+    tools = [tool["function"] for tool in request.get("tools") or [] if tool.get("type") == "function"]
+    tool_choice = request.get("tool_choice")
+    if not tools or tool_choice == "none":
+        return None
+
+    by_name = {tool["name"]: tool for tool in tools}
+    if isinstance(tool_choice, dict):
+        return by_name.get(tool_choice.get("function", {}).get("name"))
+
+    called = _called_tools(request.get("messages", []))
+    ordered = sorted(
+        tools,
+        key=lambda tool: (
+            PREFERRED_TOOLS.index(tool["name"]) if tool["name"] in PREFERRED_TOOLS else len(PREFERRED_TOOLS),
+            tool["name"].startswith("transfer_to_"),
+            tool["name"],
+        ),
+    )
+    for tool in ordered:
+        if tool["name"] in PREFERRED_TOOLS or tool["name"] not in called:
+            return tool
+    if tool_choice == "required":
+        return ordered[0]
+    return None
+
+
+class FakeLLM:
+    """Reply generator and request statistics shared by the server threads."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.n_requests = 0
+        self.n_tool_calls = 0
+        self.n_structured = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.n_requests,
+                "tool_calls": self.n_tool_calls,
+                "structured_outputs": self.n_structured,
+            }
+
+    def complete(self, request):
+        with self.lock:
+            self.n_requests += 1
+            request_id = self.n_requests
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        message = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+
+        response_format = request.get("response_format") or {}
+        tool = _pick_tool(request)
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"].get("schema", {})
+            message["content"] = json.dumps(instance_from_schema(schema))
+            with self.lock:
+                self.n_structured += 1
+        elif tool is not None:
+            messages = request.get("messages", [])
+            arguments = instance_from_schema(
+                tool.get("parameters") or {"type": "object"},
+                echo=_last_text(messages),
+            )
+            if tool["name"] == "record_status":
+                step, status = _plan_progress(messages)
+                arguments.update(current_plan_step_number=step, current_status=status)
+            message["tool_calls"] = [{
+                "id": f"call_{request_id}",
+                "type": "function",
+                "function": {"name": tool["name"], "arguments": json.dumps(arguments)},
+            }]
+            finish_reason = "tool_calls"
+            with self.lock:
+                self.n_tool_calls += 1
+        elif response_format.get("type") == "json_object":
+            message["content"] = "{}"
+        else:
+            message["content"] = (
+                "Benchmark reply.\n"
+                "- Cosmology\n"
+                "```python\n" + BENCHMARK_CODE + "```\n"
+            )
+
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in request.get("messages", [])) // 4
+        completion_tokens = len(json.dumps(message)) // 4
+        return {
+            "id": f"chatcmpl-fake-{request_id}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def _make_handler(fake):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, format, *args):
+            return
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self._send_json(200, fake.stats())
+            elif self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": []})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(200, fake.complete(request))
+            else:
+                self._send_json(404, {"error": {"message": f"unsupported endpoint {self.path}"}})
+
+    return Handler
+
+
+def start_server(host="127.0.0.1", port=0, latency=0.0):
+    """Start the fake endpoint in a daemon thread.
+
+    Returns:
+        Tuple ``(server, fake, base_url)``. Call ``server.shutdown()`` to stop it.
+    """
+    fake = FakeLLM(latency=latency)
+    server = ThreadingHTTPServer((host, port), _make_handler(fake))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, fake, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible endpoint for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per request.")
+    args = parser.parse_args()
+
+    server, _, base_url = start_server(args.host, args.port, args.latency)
+    print(f"Fake LLM listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Offline stand-in for the Mistral OCR endpoint (``POST /v1/ocr``).
+
+Used by ``benchmarks/ocr.py`` to measure the throughput of the OCR pipeline
+without network or API costs. Point the processor at it with ``server_url``::
+
+    python benchmarks/fake_mistral_ocr.py --port 8766 --latency 0.5 --error-rate 0.1
+    MistralOCRProcessor(api_key="fake", server_url="http://127.0.0.1:8766")
+
+Each request returns one markdown page per ``/Type /Page`` object of the
+posted PDF, after ``latency`` seconds (plus ``latency_per_page`` per page).
+A fraction ``error_rate`` of the requests fail, alternately with a 429 (and a
+``retry-after`` header) and a 503, to exercise the retries. The failures are
+drawn from a seeded generator, so runs are reproducible.
+"""
+
+import re
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?!s)")
+
+
+class FakeMistralOCR:
+    """OCR responses, injected failures and request statistics shared by the server threads."""
+
+    def __init__(self, latency=0.0, latency_per_page=0.0, error_rate=0.0, retry_after=0.1, seed=0):
+        self.latency = latency
+        self.latency_per_page = latency_per_page
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.n_requests = 0
+        self.n_errors = 0
+        self.n_pages = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.n_requests,
+                "errors": self.n_errors,
+                "pages": self.n_pages,
+                "max_in_flight": self.max_in_flight,
+            }
+
+    def process(self, request):
+        """Return ``(status, headers, payload)`` for an OCR request."""
+        with self.lock:
+            self.n_requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.n_errors += 1
+                rate_limited = self.n_errors % 2 == 1
+        try:
+            document = base64.b64decode(request["document"]["document_url"].split(",", 1)[1])
+            n_pages = max(1, len(_PAGE_PATTERN.findall(document)))
+            time.sleep(self.latency + self.latency_per_page * n_pages)
+            if fail and rate_limited:
+                return 429, {"retry-after": str(self.retry_after)}, {"message": "Requests rate limit exceeded"}
+            if fail:
+                return 503, {}, {"message": "Service unavailable"}
+
+            with self.lock:
+                self.n_pages += n_pages
+            pages = [{
+                "index": i,
+                "markdown": f"# Page {i + 1}\n\n" + "Benchmark OCR text. " * 50,
+                "images": [],
+                "dimensions": {"dpi": 200, "height": 2200, "width": 1700},
+            } for i in range(n_pages)]
+            return 200, {}, {
+                "pages": pages,
+                "model": request.get("model", "mistral-ocr-latest"),
+                "usage_info": {"pages_processed": n_pages, "doc_size_bytes": len(document)},
+            }
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def _make_handler(fake):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        # keep-alive, as the real endpoint, so that client connection pooling is exercised
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            return
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self._send_json(200, fake.stats())
+            else:
+                self._send_json(404, {"message": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.rstrip("/").endswith("/ocr"):
+                status, headers, payload = fake.process(request)
+                self._send_json(status, payload, headers)
+            else:
+                self._send_json(404, {"message": f"unsupported endpoint {self.path}"})
+
+    return Handler
+
+
+def start_server(host="127.0.0.1", port=0, **kwargs):
+    """Start the fake OCR endpoint in a daemon thread, ``kwargs`` as in ``FakeMistralOCR``.
+
+    Returns:
+        Tuple ``(server, fake, server_url)``. Call ``server.shutdown()`` to stop it.
+    """
+    fake = FakeMistralOCR(**kwargs)
+    server = ThreadingHTTPServer((host, port), _make_handler(fake))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server_url = f"http://{host}:{server.server_address[1]}"
+    return server, fake, server_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Mistral OCR endpoint for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per request.")
+    parser.add_argument("--latency-per-page", type=float, default=0.0, help="Extra seconds per page.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 429/503.")
+    args = parser.parse_args()
+
+    server, _, server_url = start_server(
+        args.host, args.port, latency=args.latency,
+        latency_per_page=args.latency_per_page, error_rate=args.error_rate,
+    )
+    print(f"Fake Mistral OCR listening on {server_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Cold-start import benchmark for cmbagent.
+
+Each statement is timed in a fresh interpreter, so nothing is shared between
+runs except the OS file cache. Use ``--ref`` to compare the working tree
+against another git revision (e.g. the commit before lazy imports landed):
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --ref HEAD~1 --repeat 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+STATEMENTS = [
+    "import cmbagent",
+    "import cmbagent.cli",
+    "import cmbagent.utils",
+    "from cmbagent.utils.ocr import process_folder",
+    "from cmbagent import CMBAgent",
+]
+
+TIMER = """
+import time
+t0 = time.perf_counter()
+{statement}
+print(time.perf_counter() - t0)
+"""
+
+
+def time_statement(statement, tree, repeat):
+    """Run ``statement`` ``repeat`` times in fresh interpreters and return the timings in seconds."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(tree) + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", TIMER.format(statement=statement)],
+            cwd=tempfile.gettempdir(),  # make sure the tree under test is the one on PYTHONPATH
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if out.returncode != 0:
+            raise RuntimeError(f"'{statement}' failed in {tree}:\n{out.stderr}")
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def export_ref(ref, dest):
+    """Export the cmbagent package at git revision ``ref`` into ``dest``."""
+    archive = subprocess.run(
+        ["git", "-C", str(REPO_ROOT), "archive", ref, "cmbagent"],
+        check=True, capture_output=True,
+    )
+    subprocess.run(["tar", "-x", "-C", str(dest)], input=archive.stdout, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of cmbagent")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per statement")
+    parser.add_argument("--ref", help="git revision to compare the working tree against")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    trees = {"working tree": REPO_ROOT}
+    tmp_dir = None
+    if args.ref:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="cmbagent_import_bench_")
+        export_ref(args.ref, tmp_dir.name)
+        trees[args.ref] = Path(tmp_dir.name)
+
+    results = []
+    try:
+        for statement in STATEMENTS:
+            row = {"statement": statement}
+            for label, tree in trees.items():
+                timings = time_statement(statement, tree, args.repeat)
+                row[label] = {"median_s": statistics.median(timings), "min_s": min(timings)}
+            results.append(row)
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    width = max(len(s) for s in STATEMENTS)
+    header = f"{'statement'.ljust(width)}  " + "  ".join(f"{label:>16}" for label in trees)
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        cells = "  ".join(f"{row[label]['median_s'] * 1000:>13.1f} ms" for label in trees)
+        print(f"{row['statement'].ljust(width)}  {cells}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\nResults saved to: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Offline throughput benchmark of the OCR pipeline.
+
+A folder of generated PDFs is OCR'd with ``MistralOCRProcessor.process_folder``
+against the stand-in endpoint in ``benchmarks/fake_mistral_ocr.py``, once per
+in-flight limit and engine chain, so what is measured is how well the pipeline
+overlaps requests (and recovers from injected 429/503 errors) and how many
+pages the local engines keep away from the API, not Mistral itself. The PDFs
+have a text layer except on every ``--scanned-every``-th page, which is blank
+like a scanned page:
+
+- ``wall_s``: time to process the folder
+- ``files_per_s`` / ``pages_per_s``: throughput
+- ``ocr_pages``: pages sent to (and billed by) the OCR endpoint
+- ``requests`` / ``errors``: OCR requests received by the endpoint, and how many failed
+- ``max_in_flight``: highest number of concurrent requests seen by the endpoint
+- ``failed_files``: PDFs given up after the retries or the per-file timeout
+
+    python benchmarks/ocr.py
+    python benchmarks/ocr.py --files 200 --in-flight 1 4 16 32 --latency 1.0 --error-rate 0.1 --json ocr.json
+    python benchmarks/ocr.py --engines mistral text_layer,mistral --scanned-every 4
+
+Needs ``pypdf`` to generate the PDFs.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from fake_mistral_ocr import start_server  # noqa: E402
+
+
+PAGE_TEXT = " ".join(
+    f"({i}. The angular power spectrum of the cosmic microwave background constrains the cosmological parameters.) Tj 0 -14 Td"
+    for i in range(40)
+)
+
+
+def make_pdfs(folder, n_files, max_pages, scanned_every):
+    """Write ``n_files`` PDFs of 1 to ``max_pages`` pages to ``folder``, every ``scanned_every``-th page blank."""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    n_pages = 0
+    for i in range(n_files):
+        writer = PdfWriter()
+        font = writer._add_object(DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        }))
+        for _ in range(i % max_pages + 1):
+            page = writer.add_blank_page(width=612, height=792)
+            n_pages += 1
+            if scanned_every and n_pages % scanned_every == 0:
+                continue
+            stream = DecodedStreamObject()
+            stream.set_data(f"BT /F1 10 Tf 72 740 Td {PAGE_TEXT} ET".encode())
+            page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+            page[NameObject("/Contents")] = writer._add_object(stream)
+        with open(os.path.join(folder, f"paper_{i:04d}.pdf"), "wb") as f:
+            writer.write(f)
+    return n_pages
+
+
+def run(folder, n_pages, in_flight, engines, args):
+    from cmbagent.utils.ocr import MistralOCRProcessor
+    from cmbagent.utils.rate_limit import configure_rate_limits
+
+    # fresh limiters, so that the backoff of a run does not slow down the next one
+    configure_rate_limits({"mistral": {"requests_per_minute": args.requests_per_minute}})
+    server, fake, server_url = start_server(
+        latency=args.latency, latency_per_page=args.latency_per_page,
+        error_rate=args.error_rate, retry_after=0.1,
+    )
+    try:
+        processor = MistralOCRProcessor(
+            api_key="fake", server_url=server_url, ocr_cache=False, retry_base_delay=0.1, engines=engines,
+        )
+        with tempfile.TemporaryDirectory() as output_dir:
+            log = io.StringIO()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(log if not args.verbose else sys.stdout):
+                results = processor.process_folder(
+                    folder, output_dir=output_dir, max_workers=in_flight, file_timeout=args.file_timeout,
+                )
+            wall = time.perf_counter() - start
+        stats = fake.stats()
+    finally:
+        server.shutdown()
+
+    return {
+        "engines": ",".join(engines),
+        "in_flight": in_flight,
+        "wall_s": wall,
+        "files_per_s": results["processed_files"] / wall,
+        "pages_per_s": n_pages / wall,
+        "ocr_pages": stats["pages"],
+        "requests": stats["requests"],
+        "errors": stats["errors"],
+        "max_in_flight": stats["max_in_flight"],
+        "failed_files": results["failed_files"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure OCR pipeline throughput against a fake Mistral OCR endpoint")
+    parser.add_argument("--files", type=int, default=120, help="number of PDFs in the folder")
+    parser.add_argument("--max-pages", type=int, default=8, help="PDFs have 1 to this many pages")
+    parser.add_argument("--scanned-every", type=int, default=5, help="every n-th page has no text layer (0: none)")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 16], help="in-flight limits to compare")
+    parser.add_argument("--engines", nargs="+", default=["mistral", "text_layer,mistral"],
+                        help="engine chains to compare, comma-separated")
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated seconds per OCR request")
+    parser.add_argument("--latency-per-page", type=float, default=0.02, help="simulated extra seconds per page")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="fraction of requests failing with 429/503")
+    parser.add_argument("--requests-per-minute", type=int, default=6000,
+                        help="Mistral rate limit applied by the client (the real default is lower)")
+    parser.add_argument("--file-timeout", type=float, default=None, help="per-file timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's output")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+    with tempfile.TemporaryDirectory() as folder:
+        n_pages = make_pdfs(folder, args.files, args.max_pages, args.scanned_every)
+        print(f"{args.files} PDFs, {n_pages} pages, {args.latency}s + {args.latency_per_page}s/page per request, "
+              f"{args.error_rate:.0%} errors\n")
+        header = (f"{'engines':<18} {'in-flight':>9} {'wall':>8} {'files/s':>8} {'pages/s':>8} {'ocr pages':>9} "
+                  f"{'requests':>8} {'errors':>6} {'peak':>5} {'failed':>6}")
+        print(header)
+        print("-" * len(header))
+        runs = []
+        for engines in args.engines:
+            for in_flight in args.in_flight:
+                m = run(folder, n_pages, in_flight, engines.split(","), args)
+                runs.append(m)
+                print(f"{m['engines']:<18} {m['in_flight']:>9} {m['wall_s']:>7.2f}s {m['files_per_s']:>8.2f} "
+                      f"{m['pages_per_s']:>8.1f} {m['ocr_pages']:>9} {m['requests']:>8} {m['errors']:>6} "
+                      f"{m['max_in_flight']:>5} {m['failed_files']:>6}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"files": args.files, "pages": n_pages, "runs": runs}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Offline overhead benchmark for the cmbagent workflows.
+
+Every workflow runs in a fresh interpreter against the deterministic fake
+OpenAI-compatible endpoint in ``benchmarks/fake_llm.py``, so what is measured
+is cmbagent's (and autogen's) own overhead, not model latency:
+
+- ``import_s``: importing cmbagent and autogen
+- ``init_s``: total time spent constructing ``CMBAgent`` instances
+- ``llm_s`` / ``llm_calls``: time in, and number of, chat completion calls
+- ``code_exec_s``: time spent executing generated code blocks
+- ``overhead_per_round_s``: (wall - init - llm - code execution) / llm_calls,
+  only for the workflows that make one call at a time (None for those in
+  ``CONCURRENT_WORKFLOWS``, whose summed call times exceed the wall time)
+- ``max_rss_mb``: memory high-water mark of the workflow process
+- ``files_written`` / ``bytes_written``: content of the work dir afterwards
+
+    python benchmarks/workflows.py
+    python benchmarks/workflows.py --workflows one_shot control --repeat 3 --json bench.json
+    python benchmarks/workflows.py --compare bench.json   # exit 1 on regressions
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from fake_llm import start_server  # noqa: E402
+
+
+TASK = "Compute the sum of the integers from 1 to 10 with numpy and print it."
+
+DOCUMENT = """# A benchmark paper
+
+## Abstract
+
+We measure the sum of the integers from 1 to 10 and find it to be 55.
+
+## Introduction
+
+""" + "Cosmology is the study of the universe as a whole. " * 200
+
+# a 40-page review, as written by the OCR (page markers), summarized in parts
+LONG_DOCUMENT = "# A long review\n\n" + "\n\n".join(
+    f"<!-- page {page} -->\n\n## Section {page}\n\n" + "Cosmology is the study of the universe as a whole. " * 120
+    for page in range(1, 41)
+)
+
+CONTROL_PLAN = {
+    "sub_tasks": [
+        {"sub_task": "Compute the sum", "sub_task_agent": "engineer", "bullet_points": ["Use numpy."]},
+        {"sub_task": "Compute it again", "sub_task_agent": "engineer", "bullet_points": ["Print it."]},
+    ]
+}
+
+
+def run_one_shot(work_dir):
+    from cmbagent import one_shot
+    one_shot(TASK, agent="engineer", max_rounds=20, work_dir=work_dir)
+
+
+def run_deep_research(work_dir):
+    from cmbagent import deep_research
+    deep_research(TASK, max_plan_steps=2, max_rounds_planning=30, max_rounds_control=40, work_dir=work_dir)
+
+
+def run_deep_research_parallel(work_dir):
+    from cmbagent import deep_research
+    deep_research(TASK, max_plan_steps=2, max_rounds_planning=30, max_rounds_control=40, work_dir=work_dir,
+                  max_parallel_steps=2)
+
+
+def run_control(work_dir):
+    from cmbagent import control
+    plan_path = os.path.join(work_dir, "benchmark_plan.json")
+    with open(plan_path, "w") as f:
+        json.dump(CONTROL_PLAN, f)
+    control(TASK, plan=plan_path, max_rounds=40, work_dir=work_dir)
+
+
+def run_get_keywords(work_dir):
+    from cmbagent import get_keywords
+    get_keywords(TASK, n_keywords=3, kw_type="aas", work_dir=work_dir)
+
+
+# papers summarized by the summarize_documents benchmarks
+N_DOCUMENTS = 8
+
+
+def run_summarize_document(work_dir, engine="direct"):
+    from cmbagent import summarize_document
+    document_path = os.path.join(work_dir, "benchmark_paper.md")
+    with open(document_path, "w") as f:
+        f.write(DOCUMENT)
+    summarize_document(document_path, work_dir=os.path.join(work_dir, "summary"), clear_work_dir=True, engine=engine)
+
+
+def run_summarize_long_document(work_dir, chunk_workers=4):
+    from cmbagent import summarize_document
+    document_path = os.path.join(work_dir, "benchmark_review.md")
+    with open(document_path, "w") as f:
+        f.write(LONG_DOCUMENT)
+    summarize_document(document_path, work_dir=os.path.join(work_dir, "summary"), clear_work_dir=True,
+                       max_chunk_chars=30000, chunk_workers=chunk_workers)
+
+
+def run_summarize_documents(work_dir, engine="direct"):
+    from cmbagent.utils.summarization import summarize_documents
+    documents_dir = os.path.join(work_dir, "docs_processed")
+    os.makedirs(documents_dir)
+    for i in range(N_DOCUMENTS):
+        with open(os.path.join(documents_dir, f"2401.{i:05d}.md"), "w") as f:
+            f.write(DOCUMENT)
+    summarize_documents(documents_dir, work_dir_base=os.path.join(work_dir, "summaries"), max_workers=4, engine=engine)
+
+
+WORKFLOWS = {
+    "one_shot": run_one_shot,
+    "deep_research": run_deep_research,
+    "deep_research_parallel": run_deep_research_parallel,
+    "control": run_control,
+    "get_keywords": run_get_keywords,
+    "summarize_document": run_summarize_document,
+    "summarize_document_agents": lambda work_dir: run_summarize_document(work_dir, engine="agents"),
+    "summarize_long_document": run_summarize_long_document,
+    "summarize_long_document_sequential": lambda work_dir: run_summarize_long_document(work_dir, chunk_workers=1),
+    "summarize_documents": run_summarize_documents,
+    "summarize_documents_agents": lambda work_dir: run_summarize_documents(work_dir, engine="agents"),
+}
+
+# workflows making LLM calls from several threads at once
+CONCURRENT_WORKFLOWS = {
+    "deep_research_parallel",
+    "summarize_long_document",
+    "summarize_documents",
+    "summarize_documents_agents",
+}
+
+# metrics compared by --compare, lower is better
+COMPARED_METRICS = ("import_s", "init_s", "overhead_per_round_s", "max_rss_mb", "files_written")
+
+
+def _timed(owner, attribute, totals, key):
+    """Wrap ``owner.attribute`` so that its calls are counted and timed into ``totals``."""
+    original = getattr(owner, attribute)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            totals[key + "_s"] += time.perf_counter() - start
+            totals[key + "_calls"] += 1
+
+    setattr(owner, attribute, wrapper)
+
+
+def child(workflow, work_dir, result_path):
+    """Run a single workflow in this (fresh) process and write its metrics."""
+    totals = {"init_s": 0.0, "init_calls": 0, "llm_s": 0.0, "llm_calls": 0, "code_exec_s": 0.0, "code_exec_calls": 0}
+
+    start = time.perf_counter()
+    import cmbagent
+    from cmbagent.cmbagent import CMBAgent
+    from autogen.oai.client import OpenAIWrapper
+    from autogen.coding import LocalCommandLineCodeExecutor
+    import_s = time.perf_counter() - start
+
+    _timed(CMBAgent, "__init__", totals, "init")
+    _timed(OpenAIWrapper, "create", totals, "llm")
+    _timed(LocalCommandLineCodeExecutor, "execute_code_blocks", totals, "code_exec")
+
+    start = time.perf_counter()
+    WORKFLOWS[workflow](work_dir)
+    wall_s = time.perf_counter() - start
+
+    files_written, bytes_written = 0, 0
+    for root, _, files in os.walk(work_dir):
+        for name in files:
+            files_written += 1
+            bytes_written += os.path.getsize(os.path.join(root, name))
+
+    orchestration_s = None
+    if workflow not in CONCURRENT_WORKFLOWS:
+        orchestration_s = wall_s - totals["init_s"] - totals["llm_s"] - totals["code_exec_s"]
+    result = {
+        "cmbagent_version": cmbagent.__version__,
+        "import_s": import_s,
+        "wall_s": wall_s,
+        "init_s": totals["init_s"],
+        "cmbagent_instances": totals["init_calls"],
+        "llm_s": totals["llm_s"],
+        "llm_calls": totals["llm_calls"],
+        "code_exec_s": totals["code_exec_s"],
+        "code_exec_calls": totals["code_exec_calls"],
+        "orchestration_s": orchestration_s,
+        "overhead_per_round_s": orchestration_s / max(totals["llm_calls"], 1) if orchestration_s is not None else None,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024),
+        "files_written": files_written,
+        "bytes_written": bytes_written,
+    }
+    with open(result_path, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def run_workflow(workflow, base_url, verbose=False):
+    """Run ``workflow`` in a fresh interpreter and return its metrics."""
+    env = dict(os.environ)
+    env["OPENAI_BASE_URL"] = base_url
+    env["OPENAI_API_KEY"] = "sk-benchmark"
+    env["PYTHONPATH"] = str(BENCHMARKS_DIR.parent) + os.pathsep + env.get("PYTHONPATH", "")
+    with tempfile.TemporaryDirectory(prefix=f"cmbagent_bench_{workflow}_") as tmp:
+        work_dir = os.path.join(tmp, "work_dir")
+        result_path = os.path.join(tmp, "result.json")
+        os.makedirs(work_dir)
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", workflow, "--work-dir", work_dir, "--result", result_path],
+            cwd=tmp,
+            env=env,
+            stdout=None if verbose else subprocess.PIPE,
+            stderr=None if verbose else subprocess.STDOUT,
+            text=True,
+        )
+        if out.returncode != 0 or not os.path.exists(result_path):
+            tail = "" if verbose else "\n".join(out.stdout.splitlines()[-30:])
+            raise RuntimeError(f"workflow '{workflow}' failed (exit code {out.returncode}):\n{tail}")
+        with open(result_path) as f:
+            return json.load(f)
+
+
+def summarize(runs):
+    """Median of every numeric metric over repeated runs."""
+    summary = {}
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)):
+            summary[key] = statistics.median(run[key] for run in runs)
+        else:
+            summary[key] = value
+    summary["repeat"] = len(runs)
+    return summary
+
+
+def compare(results, baseline_path, tolerance):
+    """Print metrics that got worse than ``baseline`` by more than ``tolerance`` and return them."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for workflow, metrics in results.items():
+        if workflow not in baseline:
+            continue
+        for key in COMPARED_METRICS:
+            old, new = baseline[workflow].get(key), metrics.get(key)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > 1e-3:
+                regressions.append((workflow, key, old, new))
+                print(f"REGRESSION {workflow}.{key}: {old:.4g} -> {new:.4g} ({(new / old - 1) * 100 if old else float('inf'):+.1f}%)")
+    if not regressions:
+        print(f"No regressions against {baseline_path} (tolerance {tolerance:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cmbagent workflow overhead against a fake LLM endpoint")
+    parser.add_argument("--workflows", nargs="+", choices=list(WORKFLOWS), default=list(WORKFLOWS))
+    parser.add_argument("--repeat", type=int, default=1, help="fresh processes per workflow (median is reported)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per LLM call")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown for --compare")
+    parser.add_argument("--verbose", action="store_true", help="show the workflows' output")
+    parser.add_argument("--child", choices=list(WORKFLOWS), help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.work_dir, args.result)
+        return
+
+    server, fake, base_url = start_server(latency=args.latency)
+    results = {}
+    try:
+        for workflow in args.workflows:
+            runs = [run_workflow(workflow, base_url, verbose=args.verbose) for _ in range(args.repeat)]
+            results[workflow] = summarize(runs)
+    finally:
+        server.shutdown()
+
+    header = f"{'workflow':<34} {'import':>8} {'init':>8} {'wall':>8} {'llm calls':>10} {'ovh/round':>10} {'rss MB':>8} {'files':>6}"
+    print(header)
+    print("-" * len(header))
+    for workflow, m in results.items():
+        overhead = f"{m['overhead_per_round_s'] * 1000:>8.1f}ms" if m['overhead_per_round_s'] is not None else f"{'-':>10}"
+        print(f"{workflow:<34} {m['import_s']:>7.2f}s {m['init_s']:>7.2f}s {m['wall_s']:>7.2f}s "
+              f"{m['llm_calls']:>10.0f} {overhead} {m['max_rss_mb']:>8.0f} {m['files_written']:>6.0f}")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "latency_s": args.latency,
+            "fake_llm": fake.stats(),
+        },
+        "results": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,28 +19,77 @@ warnings.filterwarnings(
 )
 
 
-from .cmbagent import CMBAgent
-from .version import __version__
 import os
-from IPython.display import Image, display, Markdown
-from autogen.cmbagent_utils import LOGO, IMG_WIDTH, cmbagent_disable_display
+import importlib
+
+from .version import __version__
+
+
+# Public attributes are loaded on first access (PEP 562) so that `import cmbagent`
+# does not pull in autogen, pandas, IPython or the Mistral SDK. Backend workers,
+# MCP tools and the CLI only pay for what they use.
+_lazy_attributes = {
+    # core
+    "CMBAgent": ".cmbagent",
+    "work_dir_default": ".cmbagent",
+
+    # workflows
+    "planning_and_control": ".cmbagent",
+    "one_shot": ".cmbagent",
+    "human_in_the_loop": ".cmbagent",
+    "control": ".cmbagent",
+    "load_plan": ".cmbagent",
+    "deep_research": ".cmbagent",
+    "get_keywords": ".cmbagent",
+    "get_keywords_from_aaai": ".cmbagent",
+    "get_keywords_from_string": ".cmbagent",
+    "get_aas_keywords": ".cmbagent",
+    "run_batch": ".workflows.batch",
 
+    # OCR functionality
+    "process_single_pdf": ".utils.ocr",
+    "process_folder": ".utils.ocr",
+    "process_folder_async": ".utils.ocr",
 
+    # arXiv downloader functionality
+    "arxiv_filter": ".utils.arxiv_downloader",
 
-from .cmbagent import planning_and_control, one_shot, human_in_the_loop, control, load_plan, deep_research, work_dir_default
-from .cmbagent import get_keywords, get_keywords_from_aaai, get_keywords_from_string, get_aas_keywords
+    # Summarization functionality
+    "preprocess_task": ".utils.summarization",
+    "summarize_document": ".utils.summarization",
+    "summarize_documents": ".utils.summarization",
+}
 
-# OCR functionality
-from .utils.ocr import process_single_pdf, process_folder
+__all__ = ["__version__", "print_cmbagent_logo", *_lazy_attributes]
 
-# arXiv downloader functionality
-from .utils.arxiv_downloader import arxiv_filter
 
-# Summarization functionality
-from .utils.summarization import preprocess_task, summarize_document, summarize_documents 
+def __getattr__(name):
+    if name in _lazy_attributes:
+        module = importlib.import_module(_lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value  # cache, so __getattr__ is only hit once per name
+        return value
+    if not name.startswith("__"):
+        # submodules, e.g. `cmbagent.utils` without an explicit `import cmbagent.utils`
+        try:
+            return importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
+
+_logo_printed = False
 
 
 def print_cmbagent_logo():
+    from IPython.display import Image, display, Markdown
+    from autogen.cmbagent_utils import LOGO, IMG_WIDTH, cmbagent_disable_display
+
     base_dir = os.path.dirname(__file__)
     # logo.png is in the images directory at the project root
     # base_dir is cmbagent/cmbagent/, so go up one level to get to cmbagent/
@@ -72,4 +121,10 @@ def print_cmbagent_logo():
     # display(HTML(github_html))
     # display(HTML(youtube_html))
 
-print_cmbagent_logo()
\ No newline at end of file
+
+def print_cmbagent_logo_once():
+    """Print the logo the first time it is needed (first CMBAgent built), rather than at import."""
+    global _logo_printed
+    if not _logo_printed:
+        _logo_printed = True
+        print_cmbagent_logo()
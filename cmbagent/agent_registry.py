@@ -0,0 +1,212 @@
+"""Process-wide registry of the agents shipped in ``cmbagent/agents``.
+
+Scanning the agents folder imports every custom agent module and builds a
+``BaseAgent`` wrapper class for each YAML-only agent. The result only depends
+on which folders and files exist, so it is built once per process and reused
+by every ``CMBAgent`` until the folder layout changes.
+
+The cache is invalidated by a fingerprint made of the modification times of
+the agents folder and its sub-folders. Adding, removing or renaming an agent
+file changes the mtime of its parent folder, so a stale registry is rebuilt on
+the next lookup. Editing a YAML file in place does not invalidate the registry:
+YAML files are read when agents are instantiated, not when they are registered.
+"""
+
+import os
+import importlib
+import threading
+
+from .utils import path_to_agents
+
+
+_registry_lock = threading.Lock()
+_registry_cache = {
+    'fingerprint': None,
+    'agents': None,
+}
+
+
+def _class_name_from_agent_name(agent_name):
+    return ''.join([part.capitalize() for part in agent_name.split('_')]) + 'Agent'
+
+
+def _make_yaml_agent_class(class_name, agent_id):
+    """Create a ``BaseAgent`` subclass for an agent defined only by a YAML file."""
+    from cmbagent.base_agent import BaseAgent
+
+    # Create a closure to capture agent_id by value
+    def __init__(self, llm_config=None, **kw):
+        BaseAgent.__init__(self, llm_config=llm_config, agent_id=agent_id, **kw)
+
+    return type(class_name, (BaseAgent,), {'__init__': __init__})
+
+
+def agents_fingerprint(agents_path=None):
+    """Return a cheap fingerprint of the agents folder layout.
+
+    Only directories are stat'ed: their mtime changes whenever an entry is
+    added, removed or renamed inside them.
+
+    Args:
+        agents_path: Folder to fingerprint. Defaults to ``path_to_agents``.
+
+    Returns:
+        Tuple of ``(relative_dir, mtime_ns)`` pairs.
+    """
+    agents_path = agents_path or path_to_agents
+    fingerprint = []
+    stack = [agents_path]
+    while stack:
+        current = stack.pop()
+        try:
+            mtime_ns = os.stat(current).st_mtime_ns
+            entries = os.scandir(current)
+        except FileNotFoundError:
+            continue
+        fingerprint.append((os.path.relpath(current, agents_path), mtime_ns))
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(".") or entry.name == "__pycache__":
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return tuple(sorted(fingerprint))
+
+
+def scan_agents(agents_path=None):
+    """Scan the agents folder and build the agent class map.
+
+    Agents can be defined in two ways:
+    1. With a .py file (for custom logic) - traditional import
+    2. YAML-only (no .py file) - uses BaseAgent directly
+
+    Both the old layout (``agents/<agent>/``) and the category layout
+    (``agents/<category>/<agent>/``) are supported.
+
+    Args:
+        agents_path: Folder to scan. Defaults to ``path_to_agents``.
+
+    Returns:
+        Dict keyed by agent class name with ``agent_class``, ``agent_name``,
+        ``category``, ``kind`` (``"custom"`` or ``"yaml"``) and ``yaml_path``.
+    """
+    agents_path = agents_path or path_to_agents
+
+    imported_agents = {}
+    for item in sorted(os.listdir(agents_path)):
+        # Skip hidden items and pycache
+        if item.startswith(".") or item == "__pycache__":
+            continue
+        item_path = os.path.join(agents_path, item)
+        if not os.path.isdir(item_path):
+            continue
+
+        item_files = os.listdir(item_path)
+
+        # Check if this is an agent folder (has .py and .yaml files) or a category folder
+        has_py_file = any(f.endswith(".py") and f != "__init__.py" for f in item_files)
+
+        if has_py_file:
+            # This is an agent folder directly under agents/ (old structure)
+            for filename in sorted(item_files):
+                if filename.endswith(".py") and filename != "__init__.py" and filename[0] != ".":
+                    module_name = filename[:-3]
+                    class_name = _class_name_from_agent_name(module_name)
+                    module = importlib.import_module(f"cmbagent.agents.{item}.{module_name}")
+                    imported_agents[class_name] = {
+                        'agent_class': getattr(module, class_name),
+                        'agent_name': module_name,
+                        'category': None,
+                        'kind': 'custom',
+                        'yaml_path': os.path.join(item_path, f"{module_name}.yaml"),
+                    }
+        elif any(f.endswith(".yaml") for f in item_files):
+            # Old structure with YAML-only (no .py file)
+            yaml_file = os.path.join(item_path, f"{item}.yaml")
+            if os.path.exists(yaml_file):
+                class_name = _class_name_from_agent_name(item)
+                imported_agents[class_name] = {
+                    'agent_class': _make_yaml_agent_class(class_name, os.path.splitext(yaml_file)[0]),
+                    'agent_name': item,
+                    'category': None,
+                    'kind': 'yaml',
+                    'yaml_path': yaml_file,
+                }
+        else:
+            # This is a category folder (new structure)
+            for agent_folder in sorted(item_files):
+                agent_folder_path = os.path.join(item_path, agent_folder)
+                if agent_folder.startswith(".") or agent_folder == "__pycache__" or not os.path.isdir(agent_folder_path):
+                    continue
+
+                # Check for YAML file (required)
+                yaml_file = os.path.join(agent_folder_path, f"{agent_folder}.yaml")
+                if not os.path.exists(yaml_file):
+                    continue
+
+                # Check for .py file (optional)
+                py_file = os.path.join(agent_folder_path, f"{agent_folder}.py")
+                class_name = _class_name_from_agent_name(agent_folder)
+
+                if os.path.exists(py_file):
+                    # Custom agent with .py file - use traditional import
+                    module = importlib.import_module(f"cmbagent.agents.{item}.{agent_folder}.{agent_folder}")
+                    agent_class = getattr(module, class_name)
+                    kind = 'custom'
+                else:
+                    # YAML-only agent - use BaseAgent
+                    agent_class = _make_yaml_agent_class(class_name, os.path.splitext(yaml_file)[0])
+                    kind = 'yaml'
+
+                imported_agents[class_name] = {
+                    'agent_class': agent_class,
+                    'agent_name': agent_folder,
+                    'category': item,
+                    'kind': kind,
+                    'yaml_path': yaml_file,
+                }
+    return imported_agents
+
+
+def get_agent_registry(refresh=False):
+    """Return the agent class map, scanning the agents folder only when needed.
+
+    Args:
+        refresh: Force a rescan even if the folder fingerprint is unchanged.
+
+    Returns:
+        A new dict (same layout as ``scan_agents``) that callers may mutate freely.
+    """
+    fingerprint = agents_fingerprint()
+    with _registry_lock:
+        if refresh or _registry_cache['agents'] is None or _registry_cache['fingerprint'] != fingerprint:
+            _registry_cache['agents'] = scan_agents()
+            _registry_cache['fingerprint'] = fingerprint
+        agents = _registry_cache['agents']
+    return {class_name: dict(entry) for class_name, entry in agents.items()}
+
+
+def clear_agent_registry():
+    """Drop the cached registry so the next lookup rescans the agents folder."""
+    with _registry_lock:
+        _registry_cache['fingerprint'] = None
+        _registry_cache['agents'] = None
+
+
+def list_agents(refresh=False):
+    """Return a sorted list of registered agents for inspection.
+
+    Returns:
+        List of dicts with ``name``, ``class_name``, ``category``, ``kind`` and ``yaml_path``.
+    """
+    registry = get_agent_registry(refresh=refresh)
+    rows = []
+    for class_name, entry in registry.items():
+        rows.append({
+            'name': entry['agent_name'],
+            'class_name': class_name,
+            'category': entry['category'],
+            'kind': entry['kind'],
+            'yaml_path': entry['yaml_path'],
+        })
+    return sorted(rows, key=lambda row: (row['category'] or '', row['name']))
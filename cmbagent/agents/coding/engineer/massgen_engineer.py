@@ -190,7 +190,7 @@ class MassGenEngineerAgent(CmbAgentSwarmAgent):
         Returns:
             Fully formatted prompt with all context variables
         """
-        from cmbagent.utils.yaml import yaml_load_file
+        from cmbagent.utils.yaml import yaml_load_file_cached
         import os
 
         # Load engineer template
@@ -198,7 +198,7 @@ class MassGenEngineerAgent(CmbAgentSwarmAgent):
             os.path.dirname(__file__),
             "engineer.yaml"
         )
-        engineer_info = yaml_load_file(engineer_yaml)
+        engineer_info = yaml_load_file_cached(engineer_yaml)
         template = engineer_info['instructions']
 
         # Get context variables from AG2's ContextVariables
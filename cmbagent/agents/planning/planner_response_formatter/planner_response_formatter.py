@@ -12,6 +12,9 @@ class Subtasks(BaseModel):
     bullet_points: List[str] = Field(
         ..., description="A list of bullet points explaining what the sub-task should do"
     )
+    depends_on: List[int] = Field(
+        ..., description="Numbers of the earlier steps whose results this sub-task needs. Empty if it can run independently of the other steps."
+    )
 
 class PlannerResponse(BaseModel):
     # main_task: str = Field(..., description="The exact main task to solve.")
@@ -21,6 +24,7 @@ class PlannerResponse(BaseModel):
         plan_output = ""
         for i, step in enumerate(self.sub_tasks):
             plan_output += f"\n- Step {i + 1}:\n\t* sub-task: {step.sub_task}\n\t* agent in charge: {step.sub_task_agent}\n"
+            plan_output += f"\t* depends on: {', '.join(str(d) for d in step.depends_on) if step.depends_on else 'none'}\n"
             if step.bullet_points:
                 plan_output += "\n\t* instructions:\n"
                 for bullet in step.bullet_points:
@@ -89,6 +93,13 @@ def _parse_plan_string(plan_str: str) -> List[Dict[str, Any]]:
             )
             continue
 
+        # --- dependencies ---------------------------------------------------
+        if ln_stripped.startswith("* depends on:"):
+            depends_on = ln_stripped.removeprefix("* depends on:").strip()
+            current["depends_on"] = [int(d) for d in depends_on.replace(",", " ").split() if d.isdigit()]
+            in_instr = False
+            continue
+
         # --- instructions block start --------------------------------------
         if ln_stripped.startswith("* instructions:"):
             in_instr = True
@@ -116,7 +127,8 @@ def save_final_plan(final_context: Dict[str, Any], work_dir: str) -> Path:
                 {
                     "sub_task": "...",
                     "sub_task_agent": "...",
-                    "bullet_points": [...]
+                    "bullet_points": [...],
+                    "depends_on": [...]
                 },
                 ...
             ]
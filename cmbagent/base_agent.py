@@ -1,11 +1,10 @@
 import os
 import logging
-from cmbagent.utils.yaml import yaml_load_file
+from cmbagent.utils.yaml import yaml_load_file_cached
 from autogen.coding import LocalCommandLineCodeExecutor
 from autogen.agentchat import UserProxyAgent
 from autogen.agentchat import ConversableAgent, UpdateSystemMessage
 import autogen
-import copy
 
 # cmbagent_debug=True
 
@@ -37,9 +36,12 @@ class BaseAgent:
             print('\n\n in base_agent.py: __init__: llm_config: ', llm_config)
             print('\n\n')
 
-        self.llm_config = copy.deepcopy(llm_config)
+        # two-level copy: we only ever modify the top-level keys and the model entries
+        self.llm_config = dict(llm_config)
+        self.llm_config['config_list'] = [dict(config) for config in llm_config['config_list']]
 
-        self.info = yaml_load_file(agent_id + ".yaml")
+        # parsed once per process and revalidated by mtime; we get our own copy to modify
+        self.info = yaml_load_file_cached(agent_id + ".yaml")
 
         self.name = self.info["name"]
 
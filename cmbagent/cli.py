@@ -165,6 +165,39 @@ def run_next_gui():
         sys.exit(1)
 
 
+def list_agents_cli(as_json=False, refresh=False):
+    """Print the agents found in the agents registry"""
+    import json
+    from cmbagent.agent_registry import list_agents
+
+    rows = list_agents(refresh=refresh)
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    name_width = max(len(row['name']) for row in rows)
+    category_width = max(len(row['category'] or '-') for row in rows)
+    print(f"{'agent'.ljust(name_width)}  {'category'.ljust(category_width)}  kind")
+    for row in rows:
+        print(f"{row['name'].ljust(name_width)}  {(row['category'] or '-').ljust(category_width)}  {row['kind']}")
+    print(f"\n{len(rows)} agents registered")
+
+
+def run_batch_cli(args):
+    """Run the tasks of a JSON-lines file with the batch runner"""
+    from cmbagent.workflows.batch import run_batch
+
+    results = run_batch(
+        args.tasks,
+        work_dir=args.work_dir,
+        max_workers=args.workers,
+        response_cache=False if args.no_cache else (args.cache or True),
+        resume=not args.no_resume,
+    )
+    if any(state["status"] == "failed" for state in results.values()):
+        sys.exit(1)
+
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(
@@ -179,9 +212,41 @@ def main():
         help="Launch the CMBAgent Next.js interface with FastAPI backend"
     )
 
+    # Agents command - inspect the agent registry
+    agents_parser = subparsers.add_parser(
+        "agents",
+        help="Inspect the agents available to CMBAgent"
+    )
+    agents_subparsers = agents_parser.add_subparsers(dest="agents_command")
+    agents_list_parser = agents_subparsers.add_parser(
+        "list",
+        help="List registered agents with their category and kind (custom .py or YAML-only)"
+    )
+    agents_list_parser.add_argument("--json", action="store_true", help="Print the registry as JSON")
+    agents_list_parser.add_argument("--refresh", action="store_true", help="Rescan the agents folder")
+
+    # Batch command - run many tasks in worker processes
+    batch_parser = subparsers.add_parser(
+        "batch",
+        help="Run the one_shot / deep_research tasks of a JSON-lines file concurrently"
+    )
+    batch_parser.add_argument("tasks", help="JSON-lines file, one {\"task\": ..., \"workflow\": ...} per line")
+    batch_parser.add_argument("--work-dir", default="cmbagent_batch", help="Directory of the batch outputs")
+    batch_parser.add_argument("--workers", type=int, default=None, help="Tasks run at once (default: number of CPUs)")
+    batch_parser.add_argument("--cache", default=None, help="Path of the shared LLM response cache")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Do not use the LLM response cache")
+    batch_parser.add_argument("--no-resume", action="store_true", help="Rerun the tasks that already succeeded")
+
     args = parser.parse_args()
 
     if args.command == "run":
         run_next_gui()
+    elif args.command == "batch":
+        run_batch_cli(args)
+    elif args.command == "agents":
+        if args.agents_command == "list":
+            list_agents_cli(as_json=args.json, refresh=args.refresh)
+        else:
+            agents_parser.print_help()
     else:
         parser.print_help()
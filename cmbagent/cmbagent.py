@@ -1,30 +1,37 @@
 import os
 import logging
-import importlib
 import autogen
 import json
 import sys
-import pandas as pd
 import copy
 import datetime
+import contextlib
 from pathlib import Path
 from collections import defaultdict
 from openai import OpenAI
 from typing import List, Dict, Any
 from autogen.agentchat.group import ContextVariables
 from autogen.agentchat.group.patterns import AutoPattern
+from autogen.agentchat.group.group_utils import make_remove_function
 
 from .agents.planning.planner_response_formatter.planner_response_formatter import save_final_plan
 from .utils import work_dir_default
 from .utils import default_llm_model as default_llm_model_default
 from .utils import default_formatter_model as default_formatter_model_default
-from .utils import clean_llm_config
+from .utils import FrozenLLMConfig
+from .utils import get_response_cache
+from .utils.history_compaction import get_history_compaction
+from .utils.record_replay import recordable
+from .utils.transcript import transcript_session
+from .utils.rate_limit import install_rate_limit_hook
 
 from .utils import (path_to_apis,path_to_agents, update_yaml_preserving_format, get_model_config,
                     default_top_p, default_temperature, default_max_round,default_llm_config_list, default_agent_llm_configs,
-                    default_agents_llm_model, camb_context_url, AAS_keywords_string, get_api_keys_from_env)
+                    default_agents_llm_model, camb_context_url, get_api_keys_from_env)
 
-from .hand_offs import register_all_hand_offs
+from . import print_cmbagent_logo_once
+from .agent_registry import get_agent_registry
+from .hand_offs import register_all_hand_offs, get_reachable_agents
 from .functions import register_functions_to_agents
 from .workflows.one_shot import one_shot
 from .workflows.deep_research import deep_research
@@ -37,112 +44,33 @@ from .utils.keywords_utils import UnescoKeywords
 from .utils.keywords_utils import AaaiKeywords
 from .utils import unesco_taxonomy_path, aaai_keywords_path
 
-def import_agents():
-    """Import all agents from the agents directory.
+def import_agents(refresh=False):
+    """Return all agents from the agents directory.
 
     Agents can be defined in two ways:
     1. With a .py file (for custom logic) - traditional import
     2. YAML-only (no .py file) - uses BaseAgent directly
 
     This allows simple agents to be defined purely in YAML without boilerplate code.
+
+    The scan is done once per process and cached by ``cmbagent.agent_registry``;
+    it is only repeated when the layout of the agents folder changes or when
+    ``refresh=True``.
     """
-    from cmbagent.base_agent import BaseAgent
-
-    imported_agents = {}
-    for item in os.listdir(path_to_agents):
-        # Skip hidden items and pycache
-        if item.startswith(".") or item == "__pycache__":
-            continue
-        item_path = os.path.join(path_to_agents, item)
-        if not os.path.isdir(item_path):
-            continue
-
-        # Check if this is an agent folder (has .py and .yaml files) or a category folder
-        has_py_file = any(f.endswith(".py") and f != "__init__.py" for f in os.listdir(item_path))
-
-        if has_py_file:
-            # This is an agent folder directly under agents/ (old structure)
-            for filename in os.listdir(item_path):
-                if filename.endswith(".py") and filename != "__init__.py" and filename[0] != ".":
-                    module_name = filename[:-3]
-                    class_name = ''.join([part.capitalize() for part in module_name.split('_')]) + 'Agent'
-                    module_path = f"cmbagent.agents.{item}.{module_name}"
-                    module = importlib.import_module(module_path)
-                    agent_class = getattr(module, class_name)
-                    imported_agents[class_name] = {
-                        'agent_class': agent_class,
-                        'agent_name': module_name,
-                    }
-        elif any(f.endswith(".yaml") for f in os.listdir(item_path)):
-            # Old structure with YAML-only (no .py file)
-            yaml_file = os.path.join(item_path, f"{item}.yaml")
-            if os.path.exists(yaml_file):
-                class_name = ''.join([part.capitalize() for part in item.split('_')]) + 'Agent'
-                agent_id = os.path.splitext(yaml_file)[0]
-
-                # Create a closure to capture agent_id by value
-                def make_init(captured_agent_id):
-                    def __init__(self, llm_config=None, **kw):
-                        BaseAgent.__init__(self, llm_config=llm_config, agent_id=captured_agent_id, **kw)
-                    return __init__
-
-                # Create a wrapper class that uses BaseAgent
-                agent_class = type(
-                    class_name,
-                    (BaseAgent,),
-                    {'__init__': make_init(agent_id)}
-                )
-                imported_agents[class_name] = {
-                    'agent_class': agent_class,
-                    'agent_name': item,
-                }
-        else:
-            # This is a category folder (new structure)
-            for agent_folder in os.listdir(item_path):
-                agent_folder_path = os.path.join(item_path, agent_folder)
-                if os.path.isdir(agent_folder_path) and not agent_folder.startswith(".") and agent_folder != "__pycache__":
-                    # Check for YAML file (required)
-                    yaml_file = os.path.join(agent_folder_path, f"{agent_folder}.yaml")
-                    if not os.path.exists(yaml_file):
-                        continue
-
-                    # Check for .py file (optional)
-                    py_file = os.path.join(agent_folder_path, f"{agent_folder}.py")
-                    class_name = ''.join([part.capitalize() for part in agent_folder.split('_')]) + 'Agent'
-
-                    if os.path.exists(py_file):
-                        # Custom agent with .py file - use traditional import
-                        module_path = f"cmbagent.agents.{item}.{agent_folder}.{agent_folder}"
-                        module = importlib.import_module(module_path)
-                        agent_class = getattr(module, class_name)
-                    else:
-                        # YAML-only agent - use BaseAgent
-                        agent_id = os.path.splitext(yaml_file)[0]
-
-                        # Create a closure to capture agent_id by value
-                        def make_init(captured_agent_id):
-                            def __init__(self, llm_config=None, **kw):
-                                BaseAgent.__init__(self, llm_config=llm_config, agent_id=captured_agent_id, **kw)
-                            return __init__
-
-                        # Create a wrapper class that uses BaseAgent
-                        agent_class = type(
-                            class_name,
-                            (BaseAgent,),
-                            {'__init__': make_init(agent_id)}
-                        )
-
-                    imported_agents[class_name] = {
-                        'agent_class': agent_class,
-                        'agent_name': agent_folder,
-                    }
-    return imported_agents
+    return get_agent_registry(refresh=refresh)
 
 from autogen import cmbagent_debug
 from autogen.agentchat import initiate_group_chat
 from cmbagent.context import shared_context as shared_context_default
 import shutil
 
+
+def _is_transit_message_hook(hook):
+    """Whether ``hook`` is the transit-message filter that ag2 registers at every ``initiate_group_chat``."""
+    func = getattr(hook, "func", hook)
+    return getattr(func, "__qualname__", "").startswith(make_remove_function.__name__ + ".")
+
+
 class CMBAgent:
 
     logging.disable(logging.CRITICAL)
@@ -185,12 +113,17 @@ class CMBAgent:
                  clear_work_dir = True,
                  mode = "planning_and_control", # can be "one_shot", "human_in_the_loop", or "planning_and_control" (default is planning and control), or "deep_research"
                  chat_agent = None,
+                 initial_agent = None,
                  api_keys = None,
                  use_massgen = False,
                  massgen_config = None,
                  massgen_verbose = False,
                  massgen_enable_logging = True,
                  massgen_use_for_retries = False,
+                 response_cache = None,
+                 response_cache_agents = None,
+                 history_compaction = None,
+                 chat_transcript = True,
                  **kwargs):
         """
         Initialize the CMBAgent.
@@ -201,6 +134,20 @@ class CMBAgent:
             timeout (int, optional): Timeout for LLM requests in seconds. Defaults to 1200.
             max_round (int, optional): Maximum number of conversation rounds. Defaults to 50. If too small, the conversation stops.
             llm_api_key (str, optional): API key for LLM. If None, uses the key from the config file.
+            initial_agent (str or list, optional): Agent(s) the chats of this instance will start from.
+                If given, only the agents reachable from them through the hand-off graph of `mode`
+                are instantiated (see `hand_offs.get_reachable_agents`). If None, all agents are built.
+            response_cache (bool, str or ResponseCache, optional): Persistent LLM response cache.
+                True uses the default SQLite file, a str is a path to one. None disables caching.
+            response_cache_agents (list, optional): Names of the agents whose calls go through
+                `response_cache`. If None, all agents use it.
+            history_compaction (dict or bool, optional): Token budgets of the message histories of
+                the controller, engineer and researcher, see `utils.history_compaction`. None or
+                False (the default) leaves the histories alone, True uses the default budgets, and a
+                dict sets the budgets of the agents it lists.
+            chat_transcript (bool, optional): Stream the messages of each `solve` to
+                `chats/transcript[_step_N].jsonl` as they are produced, see `utils.transcript`.
+                Defaults to True.
 
             **kwargs: Additional keyword arguments.
 
@@ -215,6 +162,8 @@ class CMBAgent:
         Note:
             This class initializes various agents and configurations for cosmological data analysis.
         """
+        print_cmbagent_logo_once()
+
         if default_llm_model != default_llm_model_default:
 
             default_llm_config_list = [get_model_config(default_llm_model, api_keys)]
@@ -233,6 +182,7 @@ class CMBAgent:
 
         self.mode = mode
         self.chat_agent = chat_agent
+        self.initial_agent = initial_agent
 
         self.verbose = verbose
 
@@ -241,12 +191,13 @@ class CMBAgent:
         if work_dir != work_dir_default:
             # delete work_dir_default as it wont be used
             # exception if we are working within work_dir_default, i.e., work_dir is a subdirectory of work_dir_default
-            if not work_dir_default.resolve() in work_dir.resolve().parents:
+            if not work_dir_default.resolve() in Path(work_dir).expanduser().resolve().parents:
                 shutil.rmtree(work_dir_default, ignore_errors=True)
             # shutil.rmtree(work_dir_default, ignore_errors=True)
 
         self.work_dir = os.path.expanduser(work_dir)
         self.clear_work_dir_bool = clear_work_dir
+        self.chat_transcript = chat_transcript
         if clear_work_dir:
             self.clear_work_dir()
         
@@ -256,7 +207,8 @@ class CMBAgent:
 
         self.logger.info(f"Autogen version: {autogen.__version__}")
 
-        llm_config_list = default_llm_config_list.copy()
+        # copy the model entry too, so that the api key/type set below never leak into the module default
+        llm_config_list = [dict(config) for config in default_llm_config_list]
 
         if llm_api_key is not None:
             llm_config_list[0]['api_key'] = llm_api_key
@@ -366,6 +318,7 @@ class CMBAgent:
         if cmbagent_debug:
             print('\nregistering all hand_offs...')
 
+        self.history_compaction = get_history_compaction(history_compaction)
         register_all_hand_offs(self)
 
         if cmbagent_debug:
@@ -380,17 +333,83 @@ class CMBAgent:
         if cmbagent_debug:
             print('\nfunctions added to agents...')
 
-        self.shared_context = shared_context_default
+        # every LLM call of the process shares the provider rate limits
+        install_rate_limit_hook()
+
+        self.response_cache = get_response_cache(response_cache)
+        if self.response_cache is not None:
+            for agent in self.agents:
+                if response_cache_agents is None or agent.name in response_cache_agents:
+                    self.response_cache.attach(agent.agent)
+
+        # copy so that instance updates (and resets) never leak into the module-level defaults
+        self.shared_context = copy.deepcopy(shared_context_default)
         if shared_context is not None:
             self.shared_context.update(shared_context)
 
         if cmbagent_debug:
             print('\nshared_context: ', self.shared_context)
 
+    def reset(self, shared_context=None, clear_work_dir=False):
+        """
+        Reset the conversation state so the same instance can run another ``solve``.
+
+        Agents, hand-offs, nested chats and registered functions are kept as they are,
+        which makes a reset orders of magnitude cheaper than building a new CMBAgent.
+        What is cleared is everything tied to the previous run: agent message histories
+        and auto-reply counters, LLM usage and per-agent ``cost_dict`` entries, history
+        compaction counters, and the results stored by the previous ``solve`` call.
+
+        Parameters
+        ----------
+        shared_context : dict, optional
+            Context variables merged on top of the default shared context for the
+            next run. If None, only the defaults are used.
+        clear_work_dir : bool, optional
+            If True, the work directory is emptied now and again at the start of the
+            next ``solve``. Defaults to False, so outputs from earlier runs (e.g. the
+            codebase of previous deep_research steps) stay available.
+
+        Examples
+        --------
+        >>> agent = CMBAgent(work_dir="control", mode="deep_research")
+        >>> agent.solve(task, initial_agent="controller", shared_context=context_1, step=1)
+        >>> agent.reset()
+        >>> agent.solve(task, initial_agent="control_starter", shared_context=context_2, step=2)
+        """
+        for agent in self.agents:
+            agent.agent.reset()
+            # the next solve registers its own filter, they would otherwise pile up on reused agents
+            hooks = agent.agent.hook_lists["process_all_messages_before_reply"]
+            hooks[:] = [hook for hook in hooks if not _is_transit_message_hook(hook)]
+            if hasattr(agent.agent, "cost_dict"):
+                for key in agent.agent.cost_dict:
+                    agent.agent.cost_dict[key] = []
+        # the cost rows start again from zero, and so do the costs already in the ledger
+        self._recorded_costs = {}
+        for compactor in getattr(self, "history_compactors", {}).values():
+            compactor.reset_stats()
+
+        self.shared_context = copy.deepcopy(shared_context_default)
+        if shared_context is not None:
+            self.shared_context.update(shared_context)
+
+        self.clear_work_dir_bool = clear_work_dir
+        if clear_work_dir:
+            self.clear_work_dir()
+
+        self.results = {}
+        self.step = None
+        for attr in ("final_context", "chat_result", "last_agent", "groupchat"):
+            if hasattr(self, attr):
+                delattr(self, attr)
+
     def display_cost(self, name_append = None):
         """Display a full cost report as a right‑aligned Markdown table with $ and a
-        rule above the total row. Also saves the cost data as JSON in the workdir."""
+        rule above the total row. Also saves the cost data as JSON in the workdir, with
+        the prompt tokens before and after history compaction of the compacted agents."""
         import json
+        import pandas as pd
 
         cost_dict = defaultdict(list)
 
@@ -437,6 +456,8 @@ class CMBAgent:
         if df.empty:
             print("\n[Cost] No cost data available (may be using external backends like MassGen)")
             print("[Cost] Note: MassGen costs are tracked separately in MassGen logs")
+            self.display_response_cache_stats()
+            self.display_history_compaction_stats()
             return
 
         numeric_cols = df.select_dtypes(include="number").columns
@@ -489,11 +510,15 @@ class CMBAgent:
         print("\nDisplaying cost…\n")
         print("\n".join(lines))
 
+        self.display_response_cache_stats()
+        compaction_stats = self.display_history_compaction_stats()
+
         self.final_context['cost_dataframe'] = df
 
         # --- Save cost data as JSON ------------------------------------------------
         # Convert DataFrame to dict for JSON serialization
         cost_data = df.to_dict(orient='records')
+        self._add_compaction_tokens(cost_data, compaction_stats)
         
         # Add timestamp
         from datetime import datetime
@@ -510,11 +535,96 @@ class CMBAgent:
         print(f"\nCost report data saved to: {json_path}\n")
 
         self.final_context['cost_report_path'] = json_path
+
+        self._record_costs(cost_data, json_path)
         
         return df
 
         
 
+    def _add_compaction_tokens(self, cost_rows, compaction_stats):
+        """Add the prompt tokens before and after history compaction to the rows of the compacted agents and to the total."""
+        if not compaction_stats:
+            return
+        # rows are named like in display_cost
+        stats = {agent_name.replace("_", " "): counts for agent_name, counts in compaction_stats.items()}
+        total_before = total_after = 0
+        for row in cost_rows:
+            counts = stats.get(row["Agent"])
+            if counts is not None and row["Agent"] != "Total":
+                row["Prompt Tokens Before Compaction"] = counts["tokens_before"]
+                row["Prompt Tokens After Compaction"] = counts["tokens_after"]
+                total_before += counts["tokens_before"]
+                total_after += counts["tokens_after"]
+        for row in cost_rows:
+            if row["Agent"] == "Total":
+                row["Prompt Tokens Before Compaction"] = total_before
+                row["Prompt Tokens After Compaction"] = total_after
+
+    def _record_costs(self, cost_rows, report_path):
+        """Append the agent costs incurred since the last report to the cost ledger of the work_dir."""
+        from .utils.cost_ledger import CostLedger, cost_ledger_path
+
+        # agent costs are cumulative, only what was not recorded yet is appended
+        recorded = self.__dict__.setdefault("_recorded_costs", {})
+        entries = []
+        for row in cost_rows:
+            if row["Agent"] == "Total":
+                continue
+            costs = {
+                "cost_usd": float(row["Cost ($)"]),
+                "prompt_tokens": int(row["Prompt Tokens"]),
+                "completion_tokens": int(row["Completion Tokens"]),
+                "total_tokens": int(row["Total Tokens"]),
+            }
+            if "Prompt Tokens Before Compaction" in row:
+                costs["prompt_tokens_before_compaction"] = int(row["Prompt Tokens Before Compaction"])
+                costs["prompt_tokens_after_compaction"] = int(row["Prompt Tokens After Compaction"])
+            previous = recorded.get(row["Agent"], {})
+            increments = {field: value - previous.get(field, 0) for field, value in costs.items()}
+            if not any(increments.values()):
+                continue
+            recorded[row["Agent"]] = costs
+            entries.append({
+                "kind": "llm",
+                "agent": row["Agent"],
+                "model": row["Model"],
+                **increments,
+                "report": os.path.relpath(report_path, self.work_dir),
+            })
+        try:
+            CostLedger(cost_ledger_path(self.work_dir)).extend(entries)
+        except OSError as e:
+            print(f"Could not record the costs in the cost ledger: {e}")
+
+    def display_response_cache_stats(self):
+        """Print the response cache hit/miss counters, if a response cache is used."""
+        if getattr(self, "response_cache", None) is None:
+            return None
+        cache_stats = self.response_cache.stats()
+        hits = sum(counts["hits"] for counts in cache_stats.values())
+        misses = sum(counts["misses"] for counts in cache_stats.values())
+        print(f"\nResponse cache: {hits} hits, {misses} misses (cached replies are not billed)")
+        for agent_name, counts in sorted(cache_stats.items(), key=lambda item: str(item[0])):
+            print(f"  {agent_name}: {counts['hits']} hits, {counts['misses']} misses")
+        if hasattr(self, "final_context"):
+            self.final_context['response_cache_stats'] = cache_stats
+        return cache_stats
+
+    def display_history_compaction_stats(self):
+        """Print the prompt tokens of the compacted agents before and after compaction."""
+        compactors = getattr(self, "history_compactors", {})
+        compaction_stats = {name: dict(c.stats) for name, c in compactors.items() if c.stats["calls"]}
+        if not compaction_stats:
+            return None
+        print("\nHistory compaction (prompt tokens before -> after):")
+        for agent_name, counts in compaction_stats.items():
+            print(f"  {agent_name}: {counts['tokens_before']} -> {counts['tokens_after']}"
+                  f" ({counts['compacted_calls']} of {counts['calls']} calls compacted)")
+        if hasattr(self, "final_context"):
+            self.final_context['history_compaction_stats'] = compaction_stats
+        return compaction_stats
+
     def clear_work_dir(self):
         # Clear everything inside work_dir if it exists
         if os.path.exists(self.work_dir):
@@ -526,6 +636,7 @@ class CMBAgent:
                     shutil.rmtree(item_path)
 
 
+    @recordable
     def solve(self, task,
               initial_agent='planner',
               shared_context=None,
@@ -572,6 +683,15 @@ class CMBAgent:
             terminate after this many rounds even if the task is not fully completed.
             Defaults to 10.
             
+        record : str, optional
+            Keyword only. Write every LLM response and code execution result of the
+            group chat to this log file (gzip-compressed for ``.gz``). See
+            ``cmbagent.utils.record_replay``.
+
+        replay : str, optional
+            Keyword only. Re-run the group chat from a log written with ``record``,
+            without network access or code execution.
+
         Returns
         -------
         None
@@ -658,7 +778,8 @@ class CMBAgent:
         codebase_full_path = os.path.join(self.work_dir, this_shared_context.get("codebase_path", "codebase"))
 
         # add the codebase to the python path so we can import modules from it
-        sys.path.append(codebase_full_path)
+        if codebase_full_path not in sys.path:
+            sys.path.append(codebase_full_path)
 
         chat_full_path = os.path.join(self.work_dir, "chats")
         time_full_path = os.path.join(self.work_dir, "time")
@@ -696,12 +817,15 @@ class CMBAgent:
                                       "name": "main_cmbagent_chat"},
             )
 
-        chat_result, context_variables, last_agent = initiate_group_chat(
-            pattern=agent_pattern,
-            messages=this_shared_context['main_task'],
-            # user_agent=self.get_agent_from_name("admin"),
-            max_rounds = max_rounds,
-        )
+        transcript_name = "transcript.jsonl" if step is None else f"transcript_step_{step}.jsonl"
+        transcript = transcript_session(os.path.join(chat_full_path, transcript_name)) if self.chat_transcript else contextlib.nullcontext()
+        with transcript:
+            chat_result, context_variables, last_agent = initiate_group_chat(
+                pattern=agent_pattern,
+                messages=this_shared_context['main_task'],
+                # user_agent=self.get_agent_from_name("admin"),
+                max_rounds = max_rounds,
+            )
 
         self.final_context = copy.deepcopy(context_variables)
 
@@ -819,6 +943,17 @@ class CMBAgent:
         if self.skip_executor:
             self.agent_classes.pop('executor', None)
 
+        # only keep the agents that can be reached from the initial agent(s)
+        if self.initial_agent is not None:
+            self.reachable_agents = get_reachable_agents(self.initial_agent, self.mode, chat_agent=self.chat_agent)
+            self.agent_classes = {
+                agent_name: agent_class
+                for agent_name, agent_class in self.agent_classes.items()
+                if agent_name in self.reachable_agents
+            }
+        else:
+            self.reachable_agents = set(self.agent_classes)
+
         if cmbagent_debug:
             print('self.agent_classes after skipping agents: ')
             print()
@@ -831,22 +966,29 @@ class CMBAgent:
             print('self.llm_config: ', self.llm_config)
 
 
+        # all agents share the same frozen base config, per-agent variants only copy the model entry
+        base_llm_config = FrozenLLMConfig.from_dict(self.llm_config)
+        formatter_model_config = get_model_config(default_formatter_model, self.api_keys)
+
         for agent_name  in self.agent_classes:
             agent_class = self.agent_classes[agent_name]
 
             if cmbagent_debug:
                 print('instantiating agent: ', agent_name)
 
+            agent_llm_config = base_llm_config
             if agent_name in agent_llm_configs:
-                llm_config = copy.deepcopy(self.llm_config)
-                llm_config['config_list'][0].update(agent_llm_configs[agent_name])
-                clean_llm_config(llm_config)
-                
+                agent_llm_config = agent_llm_config.override(**agent_llm_configs[agent_name])
+
                 if cmbagent_debug:
                     print('in cmbagent.py: found agent_llm_configs for: ', agent_name)
-                    print('in cmbagent.py: llm_config updated to: ', llm_config)
-            else:
-                llm_config = copy.deepcopy(self.llm_config)
+                    print('in cmbagent.py: llm_config updated to: ', agent_llm_config)
+
+            if "formatter" in agent_name:
+                agent_llm_config = agent_llm_config.override(**formatter_model_config)
+
+            # fresh shallow dict, cleaned of inconsistent parameters
+            llm_config = agent_llm_config.to_dict()
 
             if cmbagent_debug:
                 print('in cmbagent.py BEFORE agent_instance: llm_config: ', llm_config)
@@ -866,14 +1008,6 @@ class CMBAgent:
                 print('agent.llm_config: ', agent.llm_config)
                 print('\n\n')
 
-        for agent in self.agents:
-
-            if "formatter" in agent.name:
-                agent.llm_config['config_list'][0].update(get_model_config(default_formatter_model, self.api_keys))
-
-            # make sure the llm config doesnt have inconsistent parameters
-            clean_llm_config(agent.llm_config)
-
 
         if self.verbose or cmbagent_debug:
 
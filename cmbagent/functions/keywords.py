@@ -3,7 +3,7 @@
 from typing import List
 from autogen.agentchat.group import ContextVariables
 from autogen.agentchat.group import AgentTarget, ReplyResult
-from ..utils import AAS_keywords_dict
+from ..utils import get_aas_keywords_dict
 
 
 def create_record_aas_keywords(aas_keyword_finder, controller):
@@ -18,6 +18,7 @@ def create_record_aas_keywords(aas_keyword_finder, controller):
             context_variables (dict): A dictionary maintaining execution context, including previous plans,
                 feedback tracking, and finalized plans.
         """
+        AAS_keywords_dict = get_aas_keywords_dict()
 
         for keyword in aas_keywords:
             if keyword not in AAS_keywords_dict:
@@ -12,41 +12,50 @@ from .status import create_record_status, create_record_status_starter
 def register_functions_to_agents(cmbagent_instance):
     """
     This function registers the functions to the agents.
+
+    Agents that were not instantiated (see ``CMBAgent(initial_agent=...)``) are
+    skipped, together with the functions they would call.
     """
+    def get_agent(name):
+        if name in cmbagent_instance.agent_names:
+            return cmbagent_instance.get_agent_from_name(name)
+        return None
+
     # Get all agent references
-    planner = cmbagent_instance.get_agent_from_name('planner')
-    planner_response_formatter = cmbagent_instance.get_agent_from_name('planner_response_formatter')
-    plan_recorder = cmbagent_instance.get_agent_from_name('plan_recorder')
-    plan_reviewer = cmbagent_instance.get_agent_from_name('plan_reviewer')
-    reviewer_response_formatter = cmbagent_instance.get_agent_from_name('reviewer_response_formatter')
-    review_recorder = cmbagent_instance.get_agent_from_name('review_recorder')
-    researcher = cmbagent_instance.get_agent_from_name('researcher')
-    researcher_response_formatter = cmbagent_instance.get_agent_from_name('researcher_response_formatter')
-    engineer = cmbagent_instance.get_agent_from_name('engineer')
-    engineer_response_formatter = cmbagent_instance.get_agent_from_name('engineer_response_formatter')
-    executor = cmbagent_instance.get_agent_from_name('executor')
-    executor_response_formatter = cmbagent_instance.get_agent_from_name('executor_response_formatter')
-    terminator = cmbagent_instance.get_agent_from_name('terminator')
-    controller = cmbagent_instance.get_agent_from_name('controller')
-    admin = cmbagent_instance.get_agent_from_name('admin')
-    aas_keyword_finder = cmbagent_instance.get_agent_from_name('aas_keyword_finder')
-    plan_setter = cmbagent_instance.get_agent_from_name('plan_setter')
-    idea_maker = cmbagent_instance.get_agent_from_name('idea_maker')
-    installer = cmbagent_instance.get_agent_from_name('installer')
-    idea_saver = cmbagent_instance.get_agent_from_name('idea_saver')
-    control_starter = cmbagent_instance.get_agent_from_name('control_starter')
-    camb_context = cmbagent_instance.get_agent_from_name('camb_context')
+    planner = get_agent('planner')
+    planner_response_formatter = get_agent('planner_response_formatter')
+    plan_recorder = get_agent('plan_recorder')
+    plan_reviewer = get_agent('plan_reviewer')
+    reviewer_response_formatter = get_agent('reviewer_response_formatter')
+    review_recorder = get_agent('review_recorder')
+    researcher = get_agent('researcher')
+    researcher_response_formatter = get_agent('researcher_response_formatter')
+    engineer = get_agent('engineer')
+    engineer_response_formatter = get_agent('engineer_response_formatter')
+    executor = get_agent('executor')
+    executor_response_formatter = get_agent('executor_response_formatter')
+    terminator = get_agent('terminator')
+    controller = get_agent('controller')
+    admin = get_agent('admin')
+    aas_keyword_finder = get_agent('aas_keyword_finder')
+    plan_setter = get_agent('plan_setter')
+    idea_maker = get_agent('idea_maker')
+    installer = get_agent('installer')
+    idea_saver = get_agent('idea_saver')
+    control_starter = get_agent('control_starter')
+    camb_context = get_agent('camb_context')
 
     # Create and register execution control functions
-    post_execution_transfer = create_post_execution_transfer(
-        controller, engineer, camb_context, installer, terminator
-    )
-
-    register_function(
-        post_execution_transfer,
-        caller=executor_response_formatter,
-        executor=executor_response_formatter,
-        description=r"""
+    if executor_response_formatter is not None:
+        post_execution_transfer = create_post_execution_transfer(
+            controller, engineer, camb_context, installer, terminator
+        )
+
+        register_function(
+            post_execution_transfer,
+            caller=executor_response_formatter,
+            executor=executor_response_formatter,
+            description=r"""
 Transfer to the next agent based on the execution status.
 For the next agent suggestion, follow these rules:
 
@@ -56,19 +65,21 @@ For the next agent suggestion, follow these rules:
     - Suggest the engineer agent if error related to generic Python code. Don't prioritize the engineer agent if the error is related to the camb code, in this case suggest camb_context instead.
     - Suggest the controller only if execution was successful.
 """,
-    )
+        )
 
-    terminate_session = create_terminate_session()
-    terminator._add_single_function(terminate_session)
+    if terminator is not None:
+        terminate_session = create_terminate_session()
+        terminator._add_single_function(terminate_session)
 
     # Create and register planning functions
-    record_plan = create_record_plan(plan_reviewer, terminator)
-
-    register_function(
-        record_plan,
-        caller=plan_recorder,
-        executor=plan_recorder,
-        description=r"""
+    if plan_recorder is not None:
+        record_plan = create_record_plan(plan_reviewer, terminator)
+
+        register_function(
+            record_plan,
+            caller=plan_recorder,
+            executor=plan_recorder,
+            description=r"""
         Records a suggested plan and updates relevant execution context.
 
         This function logs a full plan suggestion into the `context_variables` dictionary. If no feedback
@@ -85,57 +96,62 @@ For the next agent suggestion, follow these rules:
             context_variables (dict): A dictionary maintaining execution context, including previous plans,
                 feedback tracking, and finalized plans.
         """,
-    )
+        )
 
-    record_plan_constraints = create_record_plan_constraints(cmbagent_instance, planner)
-    plan_setter._add_single_function(record_plan_constraints)
+    if plan_setter is not None:
+        record_plan_constraints = create_record_plan_constraints(cmbagent_instance, planner)
+        plan_setter._add_single_function(record_plan_constraints)
 
-    record_review = create_record_review(planner)
+    if review_recorder is not None:
+        record_review = create_record_review(planner)
 
-    register_function(
-        record_review,
-        caller=review_recorder,
-        executor=review_recorder,
-        description=r"""
+        register_function(
+            record_review,
+            caller=review_recorder,
+            executor=review_recorder,
+            description=r"""
         Records the reviews of the plan.
         """,
-    )
+        )
 
     # Create and register recording functions
-    record_ideas = create_record_ideas(cmbagent_instance)
-
-    register_function(
-        record_ideas,
-        caller=idea_saver,
-        executor=idea_saver,
-        description=r"""
+    if idea_saver is not None:
+        record_ideas = create_record_ideas(cmbagent_instance)
+
+        register_function(
+            record_ideas,
+            caller=idea_saver,
+            executor=idea_saver,
+            description=r"""
         Records the ideas. You must record the entire list of ideas and their descriptions. You must not alter the list.
         """,
-    )
+        )
 
-    record_aas_keywords = create_record_aas_keywords(aas_keyword_finder, controller)
+    if aas_keyword_finder is not None:
+        record_aas_keywords = create_record_aas_keywords(aas_keyword_finder, controller)
 
-    register_function(
-        record_aas_keywords,
-        caller=aas_keyword_finder,
-        executor=aas_keyword_finder,
-        description=r"""
+        register_function(
+            record_aas_keywords,
+            caller=aas_keyword_finder,
+            executor=aas_keyword_finder,
+            description=r"""
         Extracts the relevant AAS keywords from the list, given the text input.
         Args:
             aas_keywords (list[str]): The list of AAS keywords to be recorded
             context_variables (dict): A dictionary maintaining execution context, including previous plans,
                 feedback tracking, and finalized plans.
         """,
-    )
+        )
 
     # Create and register status tracking functions
-    record_status = create_record_status(cmbagent_instance, controller)
-
-    register_function(
-        record_status,
-        caller=controller,
-        executor=controller,
-        description=r"""
+    if controller is not None:
+        record_status = create_record_status(cmbagent_instance, controller)
+
+        register_function(
+            record_status,
+            caller=controller,
+            executor=controller,
+            description=r"""
         Updates the context and returns the current progress.
         Must be called **before calling the agent in charge of the next sub-task**.
         Must be called **after** each action taken.
@@ -151,15 +167,16 @@ For the next agent suggestion, follow these rules:
         Returns:
             ReplyResult: Contains a formatted status message and updated context.
         """,
-    )
+        )
 
-    record_status_starter = create_record_status_starter(cmbagent_instance)
+    if control_starter is not None:
+        record_status_starter = create_record_status_starter(cmbagent_instance)
 
-    register_function(
-        record_status_starter,
-        caller=control_starter,
-        executor=control_starter,
-        description=r"""
+        register_function(
+            record_status_starter,
+            caller=control_starter,
+            executor=control_starter,
+            description=r"""
         Updates the context and returns the current progress.
         Must be called **before calling the agent in charge of the next sub-task**.
         Must be called **after** each action taken.
@@ -171,4 +188,4 @@ For the next agent suggestion, follow these rules:
         Returns:
             ReplyResult: Contains a formatted status message and updated context.
         """,
-    )
+        )
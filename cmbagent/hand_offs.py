@@ -1,13 +1,183 @@
 from autogen.agentchat.group import AgentTarget, TerminateTarget, OnCondition, StringLLMCondition
 from autogen.cmbagent_utils import cmbagent_debug
 import autogen
+from collections import defaultdict
 from autogen import GroupChatManager, GroupChat
 from autogen.agentchat.contrib.capabilities.transform_messages import TransformMessages
 from autogen.agentchat.contrib.capabilities.transforms import MessageHistoryLimiter
+from .utils.history_compaction import HistoryCompactor
 
 cmbagent_debug = autogen.cmbagent_utils.cmbagent_debug
 
 
+# ============================================================================
+# HAND-OFF GRAPH
+# ============================================================================
+# The wiring below is shared by register_all_hand_offs (which applies it to the
+# agents) and get_reachable_agents (which uses it to decide which agents a
+# CMBAgent needs to build for a given starting agent and mode).
+
+# Define simple A -> B handoff chains
+SIMPLE_HAND_OFFS = [
+    # Planning flow
+    ('plan_setter', 'planner'),
+    ('planner', 'planner_response_formatter'),
+    ('planner_response_formatter', 'plan_recorder'),
+    ('plan_recorder', 'plan_reviewer'),
+    ('plan_reviewer', 'reviewer_response_formatter'),
+    ('reviewer_response_formatter', 'review_recorder'),
+    ('review_recorder', 'planner'),
+
+    # Coding and Execution flow
+    ('engineer', 'engineer_nest'),
+    ('engineer_nest', 'executor_response_formatter'),
+    ('installer', 'executor_bash'),
+    ('executor_bash', 'executor_response_formatter'),
+
+    # Research flow
+    ('researcher', 'researcher_response_formatter'),
+    ('researcher_response_formatter', 'researcher_executor'),
+    ('researcher_executor', 'controller'),
+
+    # Summarizer flow
+    ('summarizer', 'summarizer_response_formatter'),
+    ('summarizer_response_formatter', 'terminator'),
+
+    # Idea flow
+    ('idea_hater', 'idea_hater_response_formatter'),
+    ('idea_hater_response_formatter', 'controller'),
+    ('idea_maker', 'idea_maker_nest'),
+    ('idea_maker_nest', 'controller'),
+
+    # Other flows
+    ('aas_keyword_finder', 'controller'),
+
+
+    # Context agents
+    ('camb_context', 'camb_response_formatter'),
+]
+
+# Response formatters that route differently based on mode
+MODE_DEPENDENT_FORMATTERS = ['camb_response_formatter']
+
+# Agents that need message history limiting
+LIMITED_HISTORY_AGENTS = [
+    'executor_response_formatter', 'planner_response_formatter', 'plan_recorder',
+    'reviewer_response_formatter', 'review_recorder', 'researcher_response_formatter',
+    'researcher_executor', 'idea_maker_response_formatter', 'idea_hater_response_formatter',
+    'summarizer_response_formatter'
+]
+
+# Nested chats, triggered by the f"{trigger_agent}_nest" agent
+NESTED_CHATS = [
+    {
+        'trigger_agent': 'engineer',
+        'manager_name': 'engineer_nested_chat',
+        'chat_agents': ['engineer_response_formatter', 'executor'],
+        'max_round': 3,
+    },
+    {
+        'trigger_agent': 'idea_maker',
+        'manager_name': 'idea_maker_manager',
+        'chat_agents': ['idea_maker_response_formatter', 'idea_saver'],
+        'max_round': 4,
+    },
+]
+
+# Controller LLM conditions (all modes except human_in_the_loop)
+CONTROLLER_CONDITIONS = [
+    ('engineer', "Code execution failed."),
+    ('researcher', "Researcher needed to generate reasoning, write report, or interpret results"),
+    ('engineer', "Engineer needed to write code, make plots, do calculations."),
+    ('idea_maker', "idea_maker needed to make new ideas"),
+    ('idea_hater', "idea_hater needed to critique ideas"),
+    ('terminator', "The task is completed."),
+]
+
+# Transfers decided at run time by the functions registered in cmbagent/functions
+FUNCTION_HAND_OFFS = {
+    'executor_response_formatter': ['controller', 'engineer', 'camb_context', 'installer', 'terminator'],
+    'plan_setter': ['planner'],
+    'plan_recorder': ['plan_reviewer', 'terminator'],
+    'review_recorder': ['planner'],
+    'aas_keyword_finder': ['aas_keyword_finder', 'controller'],
+    'controller': ['engineer', 'researcher', 'idea_maker', 'idea_hater', 'camb_context',
+                   'terminator', 'controller', 'researcher_response_formatter'],
+    'control_starter': ['engineer', 'researcher', 'idea_maker', 'idea_hater', 'camb_context'],
+}
+
+# Agents that registered functions look up (e.g. for their description) without handing off to them
+FUNCTION_LOOKUPS = {
+    'plan_setter': ['engineer', 'researcher', 'idea_maker', 'idea_hater', 'camb_context', 'aas_keyword_finder'],
+}
+
+
+def get_hand_off_graph(mode, chat_agent=None):
+    """Return the hand-off graph for a mode as ``{agent_name: set_of_next_agent_names}``.
+
+    Edges cover after-work hand-offs, nested chat members, controller LLM conditions
+    and the transfers made by registered functions.
+    """
+    graph = defaultdict(set)
+
+    for source, target in SIMPLE_HAND_OFFS:
+        graph[source].add(target)
+
+    formatter_target = 'engineer' if mode == "one_shot" else 'controller'
+    for formatter in MODE_DEPENDENT_FORMATTERS:
+        graph[formatter] = {formatter_target}
+
+    for nested_chat in NESTED_CHATS:
+        graph[f"{nested_chat['trigger_agent']}_nest"].update(nested_chat['chat_agents'])
+
+    if mode == "human_in_the_loop":
+        graph['controller'].add('admin')
+        if chat_agent is not None:
+            graph['admin'].add(chat_agent)
+    else:
+        graph['controller'].add('terminator')
+        graph['controller'].update(target_agent for target_agent, _ in CONTROLLER_CONDITIONS)
+
+    for source, targets in FUNCTION_HAND_OFFS.items():
+        graph[source].update(targets)
+
+    return graph
+
+
+def get_reachable_agents(initial_agents, mode, chat_agent=None):
+    """Return the names of the agents that can take part in a chat started from ``initial_agents``.
+
+    Agents listed in FUNCTION_LOOKUPS are included but not traversed, since they are
+    only inspected and never handed off to.
+
+    Args:
+        initial_agents: Agent name or list of agent names the chat can start from.
+        mode: CMBAgent mode (e.g. "one_shot", "deep_research", "human_in_the_loop").
+        chat_agent: Agent the admin hands off to in human_in_the_loop mode.
+
+    Returns:
+        Set of agent names.
+    """
+    if isinstance(initial_agents, str):
+        initial_agents = [initial_agents]
+
+    graph = get_hand_off_graph(mode, chat_agent=chat_agent)
+
+    reachable = set()
+    stack = list(initial_agents)
+    while stack:
+        name = stack.pop()
+        if name in reachable:
+            continue
+        reachable.add(name)
+        stack.extend(graph.get(name, ()))
+
+    for name in list(reachable):
+        reachable.update(FUNCTION_LOOKUPS.get(name, ()))
+
+    return reachable
+
+
 def register_all_hand_offs(cmbagent_instance):
     """Register all agent handoffs in a data-driven, Pythonic way."""
 
@@ -20,7 +190,9 @@ def register_all_hand_offs(cmbagent_instance):
     # 1. AGENT RETRIEVAL - Use dictionary comprehension for bulk retrieval
     # ============================================================================
 
-    # Core agents (always needed)
+    # Core agents. With lazy instantiation (CMBAgent(initial_agent=...)) only the
+    # agents reachable from the initial agent exist, so wiring involving any other
+    # agent is skipped.
     core_agent_names = [
         'planner', 'planner_response_formatter',
         'plan_recorder', 'plan_reviewer', 'reviewer_response_formatter', 'review_recorder',
@@ -34,70 +206,32 @@ def register_all_hand_offs(cmbagent_instance):
         'camb_response_formatter'
     ]
 
-    # Retrieve all core agents at once
+    # Retrieve all available core agents at once
     agents = {
         name: cmbagent_instance.get_agent_object_from_name(name)
         for name in core_agent_names
+        if name in cmbagent_instance.agent_names
     }
 
     # ============================================================================
     # 2. SIMPLE HANDOFF CHAINS - Use data structure + loop
     # ============================================================================
 
-    # Define simple A -> B handoff chains
-    simple_handoffs = [
-        # Planning flow
-        ('plan_setter', 'planner'),
-        ('planner', 'planner_response_formatter'),
-        ('planner_response_formatter', 'plan_recorder'),
-        ('plan_recorder', 'plan_reviewer'),
-        ('plan_reviewer', 'reviewer_response_formatter'),
-        ('reviewer_response_formatter', 'review_recorder'),
-        ('review_recorder', 'planner'),
-
-        # Coding and Execution flow
-        ('engineer', 'engineer_nest'),
-        ('engineer_nest', 'executor_response_formatter'),
-        ('installer', 'executor_bash'),
-        ('executor_bash', 'executor_response_formatter'),
-
-        # Research flow
-        ('researcher', 'researcher_response_formatter'),
-        ('researcher_response_formatter', 'researcher_executor'),
-        ('researcher_executor', 'controller'),
-
-        # Summarizer flow
-        ('summarizer', 'summarizer_response_formatter'),
-        ('summarizer_response_formatter', 'terminator'),
-
-        # Idea flow
-        ('idea_hater', 'idea_hater_response_formatter'),
-        ('idea_hater_response_formatter', 'controller'),
-        ('idea_maker', 'idea_maker_nest'),
-        ('idea_maker_nest', 'controller'),
-
-        # Other flows
-        ('aas_keyword_finder', 'controller'),
-
-
-        # Context agents
-        ('camb_context', 'camb_response_formatter'),
-    ]
-
     # Apply simple handoffs
-    for source, target in simple_handoffs:
-        agents[source].agent.handoffs.set_after_work(AgentTarget(agents[target].agent))
+    for source, target in SIMPLE_HAND_OFFS:
+        if source in agents and target in agents:
+            agents[source].agent.handoffs.set_after_work(AgentTarget(agents[target].agent))
 
     # ============================================================================
     # 3. CONDITIONAL HANDOFFS - Based on mode
     # ============================================================================
 
     # Response formatters that route differently based on mode
-    mode_dependent_formatters = ['camb_response_formatter']
     target = 'engineer' if mode == "one_shot" else 'controller'
 
-    for formatter in mode_dependent_formatters:
-        agents[formatter].agent.handoffs.set_after_work(AgentTarget(agents[target].agent))
+    for formatter in MODE_DEPENDENT_FORMATTERS:
+        if formatter in agents and target in agents:
+            agents[formatter].agent.handoffs.set_after_work(AgentTarget(agents[target].agent))
 
     # ============================================================================
     # 4. MESSAGE HISTORY LIMITING - Use list + loop
@@ -107,16 +241,20 @@ def register_all_hand_offs(cmbagent_instance):
         transforms=[MessageHistoryLimiter(max_messages=1)]
     )
 
-    # Agents that need message history limiting
-    limited_history_agents = [
-        'executor_response_formatter', 'planner_response_formatter', 'plan_recorder',
-        'reviewer_response_formatter', 'review_recorder', 'researcher_response_formatter',
-        'researcher_executor', 'idea_maker_response_formatter', 'idea_hater_response_formatter',
-        'summarizer_response_formatter'
-    ]
+    for agent_name in LIMITED_HISTORY_AGENTS:
+        if agent_name in agents:
+            context_handling.add_to_agent(agents[agent_name].agent)
+
+    # ============================================================================
+    # 5. HISTORY COMPACTION - Token budgets for the long-running agents
+    # ============================================================================
 
-    for agent_name in limited_history_agents:
-        context_handling.add_to_agent(agents[agent_name].agent)
+    cmbagent_instance.history_compactors = {}
+    for agent_name, settings in getattr(cmbagent_instance, 'history_compaction', {}).items():
+        if agent_name in agents:
+            compactor = HistoryCompactor(name=agent_name, **settings)
+            TransformMessages(transforms=[compactor], verbose=cmbagent_debug).add_to_agent(agents[agent_name].agent)
+            cmbagent_instance.history_compactors[agent_name] = compactor
 
     # ============================================================================
     # 6. NESTED CHATS - Helper function to reduce duplication
@@ -153,51 +291,36 @@ def register_all_hand_offs(cmbagent_instance):
         )
 
     # Set up nested chats
-    setup_nested_chat(
-        trigger_agent='engineer',
-        manager_name='engineer_nested_chat',
-        chat_agents=['engineer_response_formatter', 'executor'],
-        max_round=3
-    )
-
-    setup_nested_chat(
-        trigger_agent='idea_maker',
-        manager_name='idea_maker_manager',
-        chat_agents=['idea_maker_response_formatter', 'idea_saver'],
-        max_round=4
-    )
+    for nested_chat in NESTED_CHATS:
+        required_agents = [f"{nested_chat['trigger_agent']}_nest", nested_chat['trigger_agent']] + nested_chat['chat_agents']
+        if all(name in agents for name in required_agents):
+            setup_nested_chat(**nested_chat)
 
     # ============================================================================
     # 7. TERMINATOR & CONTROLLER SETUP
     # ============================================================================
 
     # Terminator always terminates
-    agents['terminator'].agent.handoffs.set_after_work(TerminateTarget())
+    if 'terminator' in agents:
+        agents['terminator'].agent.handoffs.set_after_work(TerminateTarget())
 
     # Controller behavior depends on mode
-    if mode == "human_in_the_loop":
+    if 'controller' in agents and mode == "human_in_the_loop":
         agent_on = cmbagent_instance.get_agent_object_from_name(cmbagent_instance.chat_agent)
         agents['controller'].agent.handoffs.set_after_work(AgentTarget(agents['admin'].agent))
         agents['admin'].agent.handoffs.set_after_work(AgentTarget(agent_on.agent))
-    else:
-        agents['controller'].agent.handoffs.set_after_work(AgentTarget(agents['terminator'].agent))
+    elif 'controller' in agents:
+        if 'terminator' in agents:
+            agents['controller'].agent.handoffs.set_after_work(AgentTarget(agents['terminator'].agent))
 
         # Controller LLM conditions - use data structure
-        controller_conditions = [
-            ('engineer', "Code execution failed."),
-            ('researcher', "Researcher needed to generate reasoning, write report, or interpret results"),
-            ('engineer', "Engineer needed to write code, make plots, do calculations."),
-            ('idea_maker', "idea_maker needed to make new ideas"),
-            ('idea_hater', "idea_hater needed to critique ideas"),
-            ('terminator', "The task is completed."),
-        ]
-
         agents['controller'].agent.handoffs.add_llm_conditions([
             OnCondition(
                 target=AgentTarget(agents[target_agent].agent),
                 condition=StringLLMCondition(prompt=prompt)
             )
-            for target_agent, prompt in controller_conditions
+            for target_agent, prompt in CONTROLLER_CONDITIONS
+            if target_agent in agents
         ])
 
     if cmbagent_debug:
@@ -24,14 +24,20 @@ from .utils import (
     default_llm_config_list,
     update_yaml_preserving_format,
     aas_keyword_to_url,
-    AAS_keywords_dict,
-    AAS_keywords_string,
+    get_aas_keywords_dict,
+    get_aas_keywords_string,
     unesco_taxonomy_path,
     aaai_keywords_path,
     camb_context_url,
     clean_llm_config,
 )
-from .yaml import yaml_load_file
+from .yaml import yaml_load_file, yaml_load_file_cached, clear_yaml_cache
+from .llm_config import FrozenLLMConfig
+from .response_cache import ResponseCache, get_response_cache, default_response_cache_path
+from .record_replay import record_run, replay_run
+from .history_compaction import HistoryCompactor, default_history_compaction
+from .transcript import transcript_session, read_transcript, tail_transcript, follow_transcript
+from .rate_limit import get_rate_limiter, configure_rate_limits, default_rate_limits
 from ruamel.yaml import YAML
 from .context_utils import fetch_context_from_url, add_contexts_from_urls, get_context_for_agent
 
@@ -59,6 +65,8 @@ __all__ = [
     "default_llm_config_list",
     "update_yaml_preserving_format",
     "aas_keyword_to_url",
+    "get_aas_keywords_dict",
+    "get_aas_keywords_string",
     "AAS_keywords_dict",
     "AAS_keywords_string",
     "unesco_taxonomy_path",
@@ -66,8 +74,34 @@ __all__ = [
     "camb_context_url",
     "clean_llm_config",
     "yaml_load_file",
+    "yaml_load_file_cached",
+    "clear_yaml_cache",
+    "FrozenLLMConfig",
+    "ResponseCache",
+    "get_response_cache",
+    "default_response_cache_path",
+    "record_run",
+    "replay_run",
+    "HistoryCompactor",
+    "default_history_compaction",
+    "transcript_session",
+    "read_transcript",
+    "tail_transcript",
+    "follow_transcript",
+    "get_rate_limiter",
+    "configure_rate_limits",
+    "default_rate_limits",
     "YAML",
     "fetch_context_from_url",
     "add_contexts_from_urls",
     "get_context_for_agent",
 ]
+
+
+def __getattr__(name):
+    # AAS keyword taxonomy is loaded lazily, see utils.get_aas_keywords_dict
+    if name == "AAS_keywords_dict":
+        return get_aas_keywords_dict()
+    if name == "AAS_keywords_string":
+        return get_aas_keywords_string()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,110 @@
+"""Content-addressed file store.
+
+Blobs are stored once under ``root/<first 2 hex chars>/<sha256>`` and never
+modified, so several snapshots (or checkpoints) that contain the same file
+share a single copy on disk.
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def bytes_digest(data):
+    """Return the hex SHA-256 of ``data``."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path):
+    """Return the hex SHA-256 of the file at ``path``, read in chunks."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class BlobStore:
+    """Store files and byte strings by content hash.
+
+    Args:
+        root: Directory holding the blobs, created if needed.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def _write(self, digest, write):
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so that a blob is either complete or absent
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def put_bytes(self, data):
+        """Store ``data`` and return its digest."""
+        return self._write(bytes_digest(data), lambda f: f.write(data))
+
+    def put_file(self, path):
+        """Store a copy of the file at ``path`` and return its digest."""
+
+        def write(f):
+            with open(path, "rb") as source:
+                shutil.copyfileobj(source, f, _CHUNK_SIZE)
+
+        return self._write(file_digest(path), write)
+
+    def get_bytes(self, digest):
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def restore_file(self, digest, destination):
+        """Copy the blob ``digest`` to ``destination``."""
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+        shutil.copyfile(self.path(digest), destination)
+
+
+def _tree_files(base_dir, folders):
+    # relative paths of the files in folders, __pycache__ directories are ignored
+    for folder in folders:
+        for root, dirs, files in os.walk(os.path.join(base_dir, folder)):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                yield os.path.relpath(os.path.join(root, name), base_dir)
+
+
+def tree_digests(base_dir, folders):
+    """Return ``{relative path: digest}`` of the files in ``folders`` of ``base_dir``."""
+    return {path: file_digest(os.path.join(base_dir, path)) for path in _tree_files(base_dir, folders)}
+
+
+def snapshot_tree(base_dir, folders, store):
+    """Store the files in ``folders`` of ``base_dir`` and return ``{relative path: digest}``."""
+    return {path: store.put_file(os.path.join(base_dir, path)) for path in _tree_files(base_dir, folders)}
+
+
+def restore_tree(base_dir, snapshot, store):
+    """Write the files of ``snapshot`` (from ``snapshot_tree``) back under ``base_dir``."""
+    for relative_path, digest in snapshot.items():
+        store.restore_file(digest, os.path.join(base_dir, relative_path))
@@ -0,0 +1,142 @@
+"""Compact, incremental checkpoints of the deep_research shared context.
+
+The shared context grows with every control step (documentation contexts,
+``previous_steps_execution_summary``, ``displayed_images``, the cost
+dataframe, ...), and pickling all of it at every step makes the checkpoints
+grow quadratically with the length of the plan. A checkpoint here only stores
+what changed since its base checkpoint:
+
+- every context value is pickled and hashed; values whose hash is the same as
+  in the base checkpoint are not stored again;
+- changed values larger than ``BLOB_THRESHOLD`` bytes are zlib-compressed into
+  a ``BlobStore``, so a large value is stored once however many steps keep it;
+- the checkpoint file itself is a zlib-compressed manifest with the small
+  changed values, the hashes of all the values and the digest of its base.
+
+Manifests are also kept in the blob store and bases are referenced by digest,
+so rewriting a step's checkpoint never breaks the ones built on it. Loading a
+checkpoint walks back the chain of bases only as far as needed, and only for
+the keys that are asked for.
+"""
+
+import os
+import zlib
+import pickle
+import hashlib
+import tempfile
+
+from .blob_store import BlobStore
+
+
+CHECKPOINT_VERSION = 1
+
+# pickled values above this size go to the blob store
+BLOB_THRESHOLD = 2048
+
+
+def default_blob_dir(checkpoint_path):
+    """Blob store used for the checkpoints in the directory of ``checkpoint_path``."""
+    return os.path.join(os.path.dirname(os.path.abspath(checkpoint_path)), "blobs")
+
+
+def _read_manifest(data):
+    manifest = pickle.loads(zlib.decompress(data))
+    if manifest.get("version", CHECKPOINT_VERSION) > CHECKPOINT_VERSION:
+        raise ValueError(f"checkpoint version {manifest['version']} is newer than supported ({CHECKPOINT_VERSION})")
+    return manifest
+
+
+def save_checkpoint(context, path, base_path=None, blob_dir=None):
+    """Write ``context`` as a checkpoint at ``path``, as a delta on the checkpoint at ``base_path``.
+
+    Args:
+        context: The context dict to save.
+        path: Checkpoint file to write.
+        base_path: Earlier checkpoint to store the delta against. If None or
+            missing, all the values are stored.
+        blob_dir: Blob store directory, by default ``blobs`` next to ``path``.
+
+    Returns:
+        Dict with the number of ``changed`` values and the ``bytes_written``.
+    """
+    store = BlobStore(blob_dir or default_blob_dir(path))
+
+    base_digest, base_digests = None, {}
+    if base_path and os.path.exists(base_path):
+        with open(base_path, "rb") as f:
+            base_data = f.read()
+        base_digest = store.put_bytes(base_data)
+        base_digests = _read_manifest(base_data)["digests"]
+
+    digests, changes = {}, {}
+    bytes_written = 0
+    for key, value in context.items():
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha256(raw).hexdigest()
+        digests[key] = digest
+        if base_digests.get(key) == digest:
+            continue
+        if len(raw) > BLOB_THRESHOLD:
+            compressed = zlib.compress(raw)
+            blob = store.put_bytes(compressed)
+            changes[key] = ("blob", blob)
+            bytes_written += len(compressed)
+        else:
+            changes[key] = ("inline", raw)
+
+    manifest = {"version": CHECKPOINT_VERSION, "base": base_digest, "digests": digests, "changes": changes}
+    data = zlib.compress(pickle.dumps(manifest, protocol=pickle.HIGHEST_PROTOCOL))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return {"changed": len(changes), "bytes_written": bytes_written + len(data)}
+
+
+class Checkpoint:
+    """Read access to a checkpoint, resolving values from its bases on demand.
+
+    Args:
+        path: Checkpoint file written by ``save_checkpoint``.
+        blob_dir: Blob store directory, by default ``blobs`` next to ``path``.
+    """
+
+    def __init__(self, path, blob_dir=None):
+        self.path = str(path)
+        self.store = BlobStore(blob_dir or default_blob_dir(path))
+        with open(self.path, "rb") as f:
+            self._manifest = _read_manifest(f.read())
+        self._bases = {}
+
+    def keys(self):
+        return list(self._manifest["digests"])
+
+    def _base(self, manifest):
+        digest = manifest["base"]
+        if digest not in self._bases:
+            self._bases[digest] = _read_manifest(self.store.get_bytes(digest))
+        return self._bases[digest]
+
+    def get(self, key):
+        """Return the value of ``key``, raising ``KeyError`` if it is not in the context."""
+        digest = self._manifest["digests"][key]
+        manifest = self._manifest
+        # walk back to the checkpoint that stored this version of the value
+        while key not in manifest["changes"] or manifest["digests"].get(key) != digest:
+            if manifest["base"] is None:
+                raise KeyError(f"{key} missing from the checkpoint chain of {self.path}")
+            manifest = self._base(manifest)
+        kind, payload = manifest["changes"][key]
+        raw = payload if kind == "inline" else zlib.decompress(self.store.get_bytes(payload))
+        return pickle.loads(raw)
+
+    def to_dict(self, keys=None):
+        """Reconstruct the context, or only ``keys`` of it."""
+        return {key: self.get(key) for key in (self.keys() if keys is None else keys)}
+
+
+def load_checkpoint(path, keys=None, blob_dir=None):
+    """Return the context saved at ``path`` (only ``keys`` of it if given)."""
+    return Checkpoint(path, blob_dir=blob_dir).to_dict(keys)
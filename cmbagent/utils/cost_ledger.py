@@ -0,0 +1,183 @@
+"""Append-only ledger of the OCR and LLM costs of a work_dir.
+
+Every cost is one JSON line appended to ``<work_dir>/cost_ledger.jsonl``::
+
+    {"kind": "ocr", "file": "paper.pdf", "pages_processed": 12, "cost_usd": 0.012, "run": "20250101_120000_4242", "timestamp": ...}
+    {"kind": "llm", "agent": "summarizer", "model": "gpt-4.1", "prompt_tokens": 9000, "cost_usd": 0.02, ...}
+
+An append is a single write to the file opened with ``O_APPEND``, under an
+exclusive ``flock`` (where available), so concurrent threads and processes
+never lose or interleave entries, and recording a cost does not depend on the
+size of the ledger. Totals are computed when asked for::
+
+    CostLedger(cost_ledger_path(work_dir)).totals()                 # {"entries": 42, "cost_usd": 0.31, ...}
+    CostLedger(cost_ledger_path(work_dir)).totals(by="file", kind="ocr")
+    cost_totals(work_dir, by="day")                                 # every ledger under work_dir
+
+When ``$CMBAGENT_COST_LEDGER`` is set, every work_dir of the process records
+its costs there instead, stamped with the task ``$CMBAGENT_TASK_ID``: the
+workers of a batch (see ``cmbagent.workflows.batch``) share the ledger of the
+batch, which can be queried while they run.
+
+``ocr_cost.json`` and the ``cost/cost_report_*.json`` files are views of
+the ledger, kept for the readers of their formats.
+"""
+
+import os
+import json
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+
+
+LEDGER_FILENAME = "cost_ledger.jsonl"
+
+# fields summed by ``totals``
+SUMMED_FIELDS = (
+    "cost_usd",
+    "pages_processed",
+    "cached_pages",
+    "local_pages",
+    "doc_size_bytes",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "prompt_tokens_before_compaction",
+    "prompt_tokens_after_compaction",
+)
+
+_append_lock = threading.Lock()
+_run_id = None
+
+
+def get_run_id():
+    """Return the run the costs of this process are recorded under, ``$CMBAGENT_RUN_ID`` or start time and pid."""
+    global _run_id
+    if _run_id is None:
+        _run_id = os.environ.get("CMBAGENT_RUN_ID") or f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    return _run_id
+
+
+def get_task_id():
+    """Return the batch task the costs of this process are recorded under, ``$CMBAGENT_TASK_ID``, or None."""
+    return os.environ.get("CMBAGENT_TASK_ID") or None
+
+
+def cost_ledger_path(work_dir):
+    """Return the ledger file of ``work_dir``, or the shared ``$CMBAGENT_COST_LEDGER`` if set."""
+    return os.environ.get("CMBAGENT_COST_LEDGER") or os.path.join(work_dir, LEDGER_FILENAME)
+
+
+class CostLedger:
+    """The cost ledger in the JSONL file ``path``, created on the first append."""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def append(self, entry):
+        """Record one cost, see ``extend``."""
+        self.extend([entry])
+
+    def extend(self, entries, only_if_empty=False):
+        """Record costs, stamped with the run, time and batch task unless they have them.
+
+        Args:
+            entries: JSON-serializable dicts, with a ``kind`` (``"ocr"``, ``"llm"``) and ``cost_usd``.
+            only_if_empty: Only record them in an empty ledger, e.g. to import the costs of an
+                earlier format once, whoever gets there first.
+
+        Returns:
+            Whether the costs were recorded.
+        """
+        now = time.time()
+        stamp = {"run": get_run_id(), "timestamp": now}
+        if get_task_id() is not None:
+            stamp["task"] = get_task_id()
+        data = "".join(
+            json.dumps({**stamp, **entry}, ensure_ascii=False, default=str) + "\n"
+            for entry in entries
+        ).encode("utf-8")
+        if not data:
+            return False
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with _append_lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                if only_if_empty and os.fstat(fd).st_size > 0:
+                    return False
+                while data:
+                    data = data[os.write(fd, data):]
+            finally:
+                # also releases the lock
+                os.close(fd)
+        return True
+
+    def entries(self, kind=None, since=None, task=None):
+        """Return the recorded costs, of ``kind``, recorded after the time ``since`` and of the batch ``task`` if given."""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_SH)
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # last line cut short by a crash
+                    continue
+                if kind is not None and entry.get("kind") != kind:
+                    continue
+                if since is not None and entry.get("timestamp", 0) < since:
+                    continue
+                if task is not None and entry.get("task") != task:
+                    continue
+                entries.append(entry)
+        return entries
+
+    def totals(self, by=None, kind=None, since=None, task=None):
+        """Sum the recorded costs, see ``summarize_costs``."""
+        return summarize_costs(self.entries(kind=kind, since=since, task=task), by=by)
+
+
+def summarize_costs(entries, by=None):
+    """Sum the ``SUMMED_FIELDS`` of cost entries.
+
+    Args:
+        entries: Cost entries, as returned by ``CostLedger.entries``.
+        by: None for the overall totals, or the entry field to group by
+            (``"file"``, ``"run"``, ``"task"``, ``"kind"``, ``"agent"``, ``"model"``...), or ``"day"``.
+
+    Returns:
+        ``{"entries": n, "cost_usd": ..., ...}``, or ``{group: totals}`` with ``by``.
+    """
+    groups = {}
+    for entry in entries:
+        if by == "day":
+            key = time.strftime("%Y-%m-%d", time.localtime(entry.get("timestamp", 0)))
+        else:
+            key = entry.get(by) if by is not None else None
+        total = groups.setdefault(key, {"entries": 0, "cost_usd": 0.0})
+        total["entries"] += 1
+        for field in SUMMED_FIELDS:
+            if isinstance(entry.get(field), (int, float)):
+                total[field] = total.get(field, 0) + entry[field]
+    if by is None:
+        return groups.get(None, {"entries": 0, "cost_usd": 0.0})
+    return groups
+
+
+def cost_totals(work_dir, by=None, kind=None, since=None, task=None):
+    """Sum the costs of every ledger under ``work_dir`` (e.g. those of the documents of ``summarize_documents``)."""
+    entries = []
+    for root, _, files in os.walk(work_dir):
+        if LEDGER_FILENAME in files:
+            entries.extend(CostLedger(os.path.join(root, LEDGER_FILENAME)).entries(kind=kind, since=since, task=task))
+    return summarize_costs(entries, by=by)
@@ -0,0 +1,214 @@
+"""Token-budget compaction of the message history of long-running agents.
+
+Formatters and recorders only ever see the last message
+(``MessageHistoryLimiter(max_messages=1)``), but the controller, engineer and
+researcher receive the full group chat history on every turn. Over the
+``max_rounds_control`` rounds of a deep research step the prompt grows with
+every round, so prompt tokens (and latency) grow roughly quadratically.
+
+``HistoryCompactor`` is an autogen ``MessageTransform`` that keeps an agent's
+history under a token budget. The first message (the task) and the most
+recent ``keep_recent`` messages are never touched. When the history is over
+budget, older messages are compacted in two stages:
+
+1. stale outputs are dropped: tool responses and executor outputs are cut to
+   their first ``stale_output_tokens`` tokens and fenced code blocks are
+   replaced by a placeholder (the code lives in the codebase directory);
+2. if that is not enough, the older turns are folded into a single summary
+   message listing who said what, capped at ``summary_tokens``.
+
+Compaction is opt-in, with the ``history_compaction`` argument of
+``CMBAgent`` and the workflows: ``True`` for the budgets of
+``default_history_compaction``. Each compactor counts the tokens it saw and
+sent, ``CMBAgent.display_cost`` reports them per agent.
+"""
+
+import re
+import json
+import threading
+
+
+# token budgets of the agents whose history is compacted with history_compaction=True
+default_history_compaction = {
+    "controller": {"max_tokens": 16000, "keep_recent": 6},
+    "engineer": {"max_tokens": 24000, "keep_recent": 8},
+    "researcher": {"max_tokens": 24000, "keep_recent": 8},
+}
+
+_CODE_BLOCK = re.compile(r"```[^\n]*\n.*?```", re.DOTALL)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                # no tiktoken or no network to fetch the encoding, use the usual 4 chars per token
+                _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    """Return the number of tokens of ``text`` (approximate when tiktoken is unavailable)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _content_text(content):
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def message_tokens(message):
+    """Return the tokens of one chat message: content, tool calls and per-message overhead."""
+    tokens = 4 + count_tokens(_content_text(message.get("content")))
+    if message.get("tool_calls"):
+        tokens += count_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def _is_output(message):
+    content = _content_text(message.get("content"))
+    return (
+        message.get("role") == "tool"
+        or "tool_responses" in message
+        or content.lstrip().startswith("exitcode:")
+    )
+
+
+def _truncate(text, n_tokens, note):
+    # cheap character-based cut, n_tokens is a soft limit
+    n_chars = 4 * n_tokens
+    if len(text) <= n_chars:
+        return text
+    return text[:n_chars] + f"\n[... {note}]"
+
+
+class HistoryCompactor:
+    """Keep an agent's message history under a token budget.
+
+    Args:
+        max_tokens: Token budget of the history (system message excluded).
+        keep_recent: Number of most recent messages that are never compacted.
+        stale_output_tokens: Tokens kept of older tool and code execution outputs.
+        summary_tokens: Upper bound on the summary replacing older turns.
+        name: Name of the agent, used in the logs.
+    """
+
+    def __init__(self, max_tokens, keep_recent=6, stale_output_tokens=200, summary_tokens=1000, name=None):
+        self.max_tokens = max_tokens
+        self.keep_recent = max(keep_recent, 1)
+        self.stale_output_tokens = stale_output_tokens
+        self.summary_tokens = summary_tokens
+        self.name = name
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"calls": 0, "compacted_calls": 0, "tokens_before": 0, "tokens_after": 0}
+        self._last = (0, 0)
+
+    def apply_transform(self, messages):
+        tokens_before = sum(message_tokens(message) for message in messages)
+        compacted = messages
+        if tokens_before > self.max_tokens and len(messages) > self.keep_recent + 1:
+            compacted = self._compact(messages)
+        tokens_after = tokens_before if compacted is messages else sum(message_tokens(m) for m in compacted)
+
+        self.stats["calls"] += 1
+        self.stats["compacted_calls"] += tokens_after < tokens_before
+        self.stats["tokens_before"] += tokens_before
+        self.stats["tokens_after"] += tokens_after
+        self._last = (tokens_before, tokens_after)
+        return compacted
+
+    def _compact(self, messages):
+        messages = [dict(message) for message in messages]
+        cut = len(messages) - self.keep_recent
+        # a tool response must stay with the assistant message that called the tool
+        while cut > 1 and messages[cut].get("role") == "tool":
+            cut -= 1
+
+        # 1. drop stale code and outputs
+        for message in messages[1:cut]:
+            content = message.get("content")
+            if not isinstance(content, str):
+                continue
+            if _is_output(message):
+                message["content"] = _truncate(content, self.stale_output_tokens, "stale output dropped")
+                if "tool_responses" in message:
+                    message["tool_responses"] = [
+                        {**response, "content": _truncate(str(response.get("content", "")), self.stale_output_tokens, "stale output dropped")}
+                        for response in message["tool_responses"]
+                    ]
+            else:
+                message["content"] = _CODE_BLOCK.sub("[code block dropped, see the codebase]", content)
+
+        if sum(message_tokens(message) for message in messages) <= self.max_tokens or cut <= 1:
+            return messages
+
+        # 2. fold the older turns into one summary message
+        lines = []
+        for message in messages[1:cut]:
+            speaker = message.get("name") or message.get("role", "")
+            text = " ".join(_content_text(message.get("content")).split())
+            if message.get("tool_calls"):
+                called = ", ".join(call.get("function", {}).get("name", "") for call in message["tool_calls"])
+                text = f"called {called}. {text}".strip()
+            if text:
+                lines.append(f"- {speaker}: {_truncate(text, 60, 'cut')}")
+        # keep the most recent lines within summary_tokens
+        kept, n_chars = [], 0
+        for line in reversed(lines):
+            if n_chars + len(line) > 4 * self.summary_tokens:
+                break
+            kept.insert(0, line)
+            n_chars += len(line) + 1
+        omitted = f", the oldest {len(lines) - len(kept)} omitted" if len(kept) < len(lines) else ""
+        summary = f"Summary of {cut - 1} earlier messages{omitted}:\n" + "\n".join(kept)
+        return [messages[0], {"role": "user", "name": "history_summary", "content": summary}] + messages[cut:]
+
+    def get_logs(self, pre_transform_messages, post_transform_messages):
+        tokens_before, tokens_after = self._last
+        if tokens_after < tokens_before:
+            return f"Compacted the history of {self.name} from {tokens_before} to {tokens_after} tokens.", True
+        return "The history was not compacted.", False
+
+
+def get_history_compaction(history_compaction):
+    """Normalize the ``history_compaction`` argument of ``CMBAgent``.
+
+    Args:
+        history_compaction: ``None`` or ``False`` (disabled), ``True`` (the
+            budgets of ``default_history_compaction``) or a dict
+            ``{agent_name: settings}`` of the agents to compact, where settings are
+            ``HistoryCompactor`` keyword arguments updating the agent's defaults,
+            ``True`` for the defaults, or ``False`` to leave the agent out.
+
+    Returns:
+        Dict ``{agent_name: HistoryCompactor keyword arguments}``.
+    """
+    if not history_compaction:
+        return {}
+    if history_compaction is True:
+        return {name: dict(agent_settings) for name, agent_settings in default_history_compaction.items()}
+    settings = {}
+    for name, agent_settings in history_compaction.items():
+        if agent_settings is True:
+            agent_settings = {}
+        elif not isinstance(agent_settings, dict):
+            continue
+        settings[name] = {**default_history_compaction.get(name, {}), **agent_settings}
+    return settings
@@ -0,0 +1,98 @@
+"""Immutable LLM configurations shared between agents.
+
+Every agent used to receive a deep copy of the full ``llm_config`` dict, which
+was then deep-copied again in ``BaseAgent`` and patched in place for the
+response formatters. ``FrozenLLMConfig`` keeps the common settings (cache seed,
+temperature, timeout, ...) in a single read-only mapping that all derived
+configs share, and only stores the (small) model entry per agent. Deriving a
+per-agent config is constant-time and never touches the shared part.
+
+``to_dict`` materializes the plain dict that autogen expects. The result is a
+fresh, shallow structure: the caller owns the top-level dict, the
+``config_list`` and its model entry, so agents may still set things like
+``response_format`` without affecting any other agent.
+"""
+
+from types import MappingProxyType
+
+from .utils import get_model_config, clean_llm_config
+
+
+class FrozenLLMConfig:
+    """Read-only LLM config made of shared settings and one model entry.
+
+    Args:
+        settings: Top-level llm_config keys (``temperature``, ``top_p``,
+            ``cache_seed``, ``timeout``, ...). A ``config_list`` key, if present,
+            is ignored in favour of ``model_config``.
+        model_config: The model entry, i.e. ``config_list[0]`` (``model``,
+            ``api_key``, ``api_type`` and optional ``reasoning_effort``,
+            ``temperature``, ...).
+    """
+
+    __slots__ = ("_settings", "_model_config")
+
+    def __init__(self, settings, model_config):
+        if not isinstance(settings, MappingProxyType):
+            settings = MappingProxyType({k: v for k, v in settings.items() if k != "config_list"})
+        if not isinstance(model_config, MappingProxyType):
+            model_config = MappingProxyType(dict(model_config))
+        self._settings = settings
+        self._model_config = model_config
+
+    @classmethod
+    def from_dict(cls, llm_config):
+        """Build a frozen config from a regular ``llm_config`` dict."""
+        return cls(llm_config, llm_config["config_list"][0])
+
+    @property
+    def settings(self):
+        return self._settings
+
+    @property
+    def model_config(self):
+        return self._model_config
+
+    @property
+    def model(self):
+        return self._model_config["model"]
+
+    def override(self, **model_overrides):
+        """Return a config whose model entry is updated with ``model_overrides``.
+
+        Same semantics as ``config_list[0].update(...)``: keys that are not
+        overridden are kept. The shared settings are reused as is.
+        """
+        if not model_overrides:
+            return self
+        model_config = dict(self._model_config)
+        model_config.update(model_overrides)
+        return FrozenLLMConfig(self._settings, model_config)
+
+    def for_model(self, model, api_keys):
+        """Return a config using ``model``, with keys from ``get_model_config``."""
+        return self.override(**get_model_config(model, api_keys))
+
+    def to_dict(self):
+        """Materialize a new mutable ``llm_config`` dict for one agent.
+
+        The model entry's ``temperature`` (if any) is moved to the top level and
+        inconsistent parameters are dropped with ``clean_llm_config``.
+        """
+        llm_config = dict(self._settings)
+        model_config = dict(self._model_config)
+        if "temperature" in model_config:
+            llm_config["temperature"] = model_config.pop("temperature")
+        llm_config["config_list"] = [model_config]
+        clean_llm_config(llm_config)
+        return llm_config
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenLLMConfig):
+            return NotImplemented
+        return self._settings == other._settings and self._model_config == other._model_config
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"FrozenLLMConfig(model={self.model!r}, settings={dict(self._settings)!r})"
@@ -0,0 +1,133 @@
+"""Processing manifests, to make folder pipelines incremental and resumable.
+
+A manifest is a JSON file kept in a pipeline's output directory (e.g.
+``ocr_manifest.json`` for ``process_folder``, ``summary_manifest.json`` for
+``summarize_documents``). It records, for each source file, its size, mtime
+and SHA-256, the options it was processed with, its output files and its
+status::
+
+    {"version": 1, "files": {"/abs/path/paper.pdf": {
+        "path": "/abs/path/paper.pdf", "size": 1234, "mtime": 1718000000.0,
+        "sha256": "...", "options": {...}, "status": "done",
+        "outputs": ["paper.md"], "error": null, "updated": 1718000100.0}}}
+
+On a re-run, a file is skipped if it was processed successfully with the same
+options, has not changed since, and its outputs are still there. Entries are
+written as soon as a file is done, so an interrupted run resumes where it
+stopped.
+"""
+
+import os
+import json
+import time
+import threading
+
+from .blob_store import file_digest
+
+
+MANIFEST_VERSION = 1
+
+
+class ProcessingManifest:
+    """The manifest of one output directory.
+
+    Args:
+        path: Manifest file, created on the first ``record``.
+        base_dir: Directory the recorded output paths are relative to, by default that of the manifest.
+    """
+
+    def __init__(self, path, base_dir=None):
+        self.path = str(path)
+        self.base_dir = str(base_dir or os.path.dirname(os.path.abspath(self.path)))
+        self._lock = threading.Lock()
+        self.files = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"Could not read the manifest {self.path} ({e}), processing every file")
+
+    def pending_reason(self, source, outputs=(), options=None):
+        """Return why ``source`` has to be processed, or None if it can be skipped.
+
+        Args:
+            source: Source file.
+            outputs: Output files expected for the current settings, relative to ``base_dir``.
+            options: Settings the outputs depend on, compared with those of the last run.
+
+        Returns:
+            ``"new"``, ``"failed"``, ``"options changed"``, ``"changed"``,
+            ``"missing outputs"`` or None.
+        """
+        key = os.path.abspath(source)
+        with self._lock:
+            entry = self.files.get(key)
+        if entry is None:
+            return "new"
+        if entry.get("status") != "done":
+            return "failed"
+        if options is not None and entry.get("options") != _normalize(options):
+            return "options changed"
+        stat = os.stat(source)
+        if stat.st_size != entry.get("size"):
+            return "changed"
+        if stat.st_mtime != entry.get("mtime"):
+            # touched, or copied again: only a changed content counts
+            if file_digest(source) != entry.get("sha256"):
+                return "changed"
+            with self._lock:
+                entry["mtime"] = stat.st_mtime
+        if any(not os.path.exists(os.path.join(self.base_dir, output)) for output in outputs):
+            return "missing outputs"
+        return None
+
+    def get(self, source):
+        """Return the entry of ``source``, or None."""
+        with self._lock:
+            entry = self.files.get(os.path.abspath(source))
+            return dict(entry) if entry is not None else None
+
+    def record(self, source, status, outputs=(), options=None, error=None, **extra):
+        """Record the outcome of processing ``source`` and save the manifest.
+
+        Args:
+            source: Source file.
+            status: ``"done"`` or ``"failed"``.
+            outputs: Output files, absolute or relative to ``base_dir``.
+            options: Settings the outputs depend on.
+            error: Error message of a failure.
+            **extra: Other JSON-serializable fields to keep in the entry.
+        """
+        key = os.path.abspath(source)
+        stat = os.stat(source)
+        entry = {
+            "path": key,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_digest(source),
+            "options": _normalize(options),
+            "status": status,
+            "outputs": [os.path.relpath(os.path.join(self.base_dir, output), self.base_dir) for output in outputs],
+            "error": error,
+            "updated": time.time(),
+            **extra,
+        }
+        with self._lock:
+            self.files[key] = entry
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=2, ensure_ascii=False)
+        # a crash while writing leaves the previous manifest in place
+        os.replace(temporary_path, self.path)
+
+
+def _normalize(options):
+    # as read back from JSON, so that comparisons with the recorded options hold
+    return json.loads(json.dumps(options, sort_keys=True, default=str)) if options is not None else None
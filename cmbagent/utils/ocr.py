@@ -7,22 +7,39 @@ import re
 import json
 import time
 import base64
+import asyncio
+import tempfile
+import threading
+import contextlib
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Dict, List, Any, Optional
 import argparse
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import glob
 
-# Mistral AI imports
-from mistralai import Mistral, DocumentURLChunk
-from mistralai.extra import response_format_from_pydantic_model
+# Mistral AI SDK is imported where it is used, so that importing cmbagent
+# (which re-exports process_single_pdf and process_folder) does not load it.
 
 
 from pydantic import BaseModel, Field
 from enum import Enum
 
 from .utils import get_api_keys_from_env
+from .rate_limit import get_rate_limiter
+from .ocr_cache import get_ocr_cache, ocr_cache_key
+from .ocr_engines import DEFAULT_OCR_ENGINES, get_ocr_engine
+from .manifest import ProcessingManifest
+from .cost_ledger import CostLedger, cost_ledger_path, get_task_id, summarize_costs
+from .blob_store import file_digest
+
+# written before each page of the markdown outputs, invisible once rendered,
+# so that the pages can be found again (e.g. to summarize long documents in parts)
+PAGE_MARKER = "<!-- page {} -->"
+
+# so that the last ``ocr_cost.json`` written is read from the ledger after the last cost
+_cost_summary_lock = threading.Lock()
 
 class ImageType(str, Enum):
     GRAPH = "graph"
@@ -36,18 +53,92 @@ class Image(BaseModel):
     label: str = Field(...,description="the label of the image, i.e., number, letter, as it is refered in text")
 
 
+def _pdf_data_url(pdf_file, size):
+    """Return the ``size`` bytes of the file object ``pdf_file`` as a base64 data URL.
+
+    The blocks read are encoded into one preallocated buffer, so the peak memory
+    is about twice the size of the encoded document (the buffer, then the string).
+    """
+    prefix = b"data:application/pdf;base64,"
+    data_url = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+    data_url[:len(prefix)] = prefix
+    position = len(prefix)
+    # a multiple of 3 bytes, so that the blocks encode without padding
+    for block in iter(lambda: pdf_file.read(3 * 1024 * 1024), b""):
+        encoded = base64.b64encode(block)
+        data_url[position:position + len(encoded)] = encoded
+        position += len(encoded)
+    del data_url[position:]
+    return data_url.decode('ascii')
+
+
+def _run_sync(coroutine):
+    """Run ``coroutine`` to completion from synchronous code, also when called from a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # inside an event loop (e.g. a notebook): run it with its own loop in a thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
 class MistralOCRProcessor:
     """Process PDFs with Mistral OCR API and prepare for PaperQA2."""
+
+    model = "mistral-ocr-latest"
     
-    def __init__(self, api_key=None):
-        """Initialize the OCR processor."""
-        if api_key is None:
-            api_keys = get_api_keys_from_env()
-            api_key = api_keys.get("MISTRAL")
-        
-        if not api_key:
-            raise ValueError("MISTRAL_API_KEY environment variable is required")
-        self.client = Mistral(api_key=api_key)
+    def __init__(self, api_key=None, ocr_cache=True, pages_per_chunk=None, max_chunks_in_flight=2,
+                 max_retries=5, retry_base_delay=1.0, server_url=None, engines=DEFAULT_OCR_ENGINES):
+        """Initialize the OCR processor.
+
+        Args:
+            api_key: Mistral API key, read from the environment if None; only needed once a page
+                has to be OCR'd by Mistral (not for the pages of the local engines nor the OCR cache)
+            ocr_cache: OCR result cache shared across work_dirs: True for the default
+                SQLite file, a path, an ``OCRCache``, or False/None to disable it
+            pages_per_chunk: If set, PDFs with more pages are split into page ranges of this
+                size, OCR'd separately and merged in page order, which bounds the memory used
+                per PDF whatever its size (needs ``pypdf``)
+            max_chunks_in_flight: Number of chunks of one PDF encoded and OCR'd at once
+            max_retries: Retries of an OCR request after a rate-limit (429), server (5xx) or network error
+            retry_base_delay: Seconds before the first retry after a server error, doubled at each
+                attempt and jittered
+            server_url: Mistral API endpoint, e.g. a proxy or a local stand-in for benchmarks
+            engines: Page engines (names or ``OCREngine`` instances, see ``cmbagent.utils.ocr_engines``);
+                the local ones are tried in order, and ``"mistral"`` OCRs the pages they could not read.
+                By default the text layer of born-digital PDFs is used, and Mistral for the other pages
+        """
+        self.engines = [get_ocr_engine(engine) for engine in engines if engine != "mistral"]
+        self.use_mistral = "mistral" in engines
+        self.ocr_cache = get_ocr_cache(ocr_cache)
+        self.pages_per_chunk = pages_per_chunk
+        self.max_chunks_in_flight = max_chunks_in_flight
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.api_key = api_key
+        self.server_url = server_url
+        self._client = None
+
+    @property
+    def client(self):
+        """The Mistral client, created when the first page has to be OCR'd by Mistral."""
+        if self._client is None:
+            api_key = self.api_key
+            if api_key is None:
+                api_keys = get_api_keys_from_env()
+                api_key = api_keys.get("MISTRAL")
+
+            if not api_key:
+                raise ValueError("MISTRAL_API_KEY environment variable is required to OCR pages with Mistral")
+
+            from mistralai import Mistral
+            self._client = Mistral(api_key=api_key, server_url=self.server_url)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
 
 
     def process_folder(self, 
@@ -59,9 +150,69 @@ class MistralOCRProcessor:
                        meta_data_path: str = None,
                        max_depth: int = 10,
                        max_workers: int = 4,
-                       work_dir: str = None) -> Dict[str, Any]:
+                       work_dir: str = None,
+                       file_timeout: float = None,
+                       incremental: bool = True) -> Dict[str, Any]:
         """
         Process all PDF files in a folder and its subfolders.
+
+        Synchronous wrapper around ``process_folder_async``.
+        
+        Args:
+            folder_path: Path to the folder containing PDF files
+            save_markdown: Whether to save markdown files
+            save_json: Whether to save JSON files
+            save_text: Whether to save text files
+            output_dir: Directory to save the output files (default: folder_path + "_processed")
+            meta_data_path: Path to the metadata file
+            max_depth: Maximum depth to search for PDF files
+            max_workers: Number of PDFs processed at once
+            work_dir: Working directory for cost tracking (optional)
+            file_timeout: Seconds after which a PDF is given up and counted as failed (optional)
+            incremental: Skip the PDFs of the ``ocr_manifest.json`` of the output directory that
+                were processed successfully and have not changed since
+        
+        Returns:
+            Dictionary with processing results summary
+        """
+        return _run_sync(self._run_in_session(self.process_folder_async(
+            folder_path,
+            save_markdown=save_markdown,
+            save_json=save_json,
+            save_text=save_text,
+            output_dir=output_dir,
+            meta_data_path=meta_data_path,
+            max_depth=max_depth,
+            max_in_flight=max_workers,
+            work_dir=work_dir,
+            file_timeout=file_timeout,
+            incremental=incremental,
+        )))
+
+    async def process_folder_async(self,
+                                   folder_path: str,
+                                   save_markdown: bool = True,
+                                   save_json: bool = True,
+                                   save_text: bool = False,
+                                   output_dir: str = None,
+                                   meta_data_path: str = None,
+                                   max_depth: int = 10,
+                                   max_in_flight: int = 4,
+                                   work_dir: str = None,
+                                   file_timeout: float = None,
+                                   incremental: bool = True) -> Dict[str, Any]:
+        """
+        Process all PDF files in a folder and its subfolders on the event loop.
+
+        At most ``max_in_flight`` PDFs are processed at once. OCR requests failing
+        with a rate-limit (429), server (5xx) or network error are retried with
+        jittered exponential backoff. Cancelling the task cancels the PDFs still
+        being processed; the outputs of the finished ones are kept.
+
+        Each PDF processed is recorded in ``ocr_manifest.json`` in the output
+        directory (see ``cmbagent.utils.manifest``). With ``incremental``, a
+        re-run only processes the new, changed and failed PDFs, and those
+        whose outputs are missing.
         
         Args:
             folder_path: Path to the folder containing PDF files
@@ -71,8 +222,10 @@ class MistralOCRProcessor:
             output_dir: Directory to save the output files (default: folder_path + "_processed")
             meta_data_path: Path to the metadata file
             max_depth: Maximum depth to search for PDF files
-            max_workers: Number of parallel workers for processing
+            max_in_flight: Number of PDFs processed at once
             work_dir: Working directory for cost tracking (optional)
+            file_timeout: Seconds after which a PDF is given up and counted as failed (optional)
+            incremental: Skip the PDFs already processed, according to the manifest
         
         Returns:
             Dictionary with processing results summary
@@ -108,61 +261,90 @@ class MistralOCRProcessor:
             return {
                 "processed_files": 0,
                 "failed_files": 0,
+                "skipped_files": 0,
                 "output_directory": str(output_dir),
                 "pdf_files": []
             }
         
         print(f"Found {len(pdf_files)} PDF files to process")
+
+        # 3. Leave out the PDFs processed by an earlier run
+        manifest = ProcessingManifest(output_dir / "ocr_manifest.json")
+        options = {"model": self.model, "engines": [engine.name for engine in self.engines] + ["mistral"] * self.use_mistral}
+
+        def outputs_of(pdf_path):
+            return self._output_files(Path(pdf_path).stem, save_markdown, save_json, save_text)
+
+        def pending_reasons():
+            return {pdf_path: manifest.pending_reason(pdf_path, outputs_of(pdf_path), options) for pdf_path in pdf_files}
+
+        reasons = await asyncio.to_thread(pending_reasons) if incremental else {pdf_path: "new" for pdf_path in pdf_files}
+        skipped = [pdf_path for pdf_path in pdf_files if reasons[pdf_path] is None]
+        if skipped:
+            print(f"Skipping {len(skipped)} PDF files processed by an earlier run (see {manifest.path})")
         
-        # 3. Process PDF files in parallel
+        # 4. Process PDF files concurrently
         results = {
             "processed_files": 0,
             "failed_files": 0,
+            "skipped_files": len(skipped),
             "output_directory": str(output_dir),
             "pdf_files": pdf_files,
+            "skipped": skipped,
             "results": []
         }
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_pdf = {
-                executor.submit(
-                    self._process_pdf_with_error_handling,
-                    pdf_path,
-                    save_markdown,
-                    save_json,
-                    save_text,
-                    output_dir,
-                    meta_data_path,
-                    work_dir
-                ): pdf_path for pdf_path in pdf_files
-            }
-            
+        cache_hits_before = self.ocr_cache.stats()["hits"] if self.ocr_cache is not None else 0
+        in_flight = asyncio.Semaphore(max(1, max_in_flight))
+        tasks = [
+            asyncio.create_task(self._process_pdf_with_error_handling(
+                pdf_path,
+                save_markdown,
+                save_json,
+                save_text,
+                output_dir,
+                meta_data_path,
+                work_dir,
+                in_flight=in_flight,
+                timeout=file_timeout
+            )) for pdf_path in pdf_files if reasons[pdf_path] is not None
+        ]
+        try:
             # Process completed tasks
-            for future in as_completed(future_to_pdf):
-                pdf_path = future_to_pdf[future]
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if result["success"]:
+                    results["processed_files"] += 1
+                    print(f"✓ Processed: {Path(result['pdf_path']).name}")
+                else:
+                    results["failed_files"] += 1
+                    print(f"✗ Failed: {Path(result['pdf_path']).name} - {result['error']}")
+                
+                results["results"].append(result)
                 try:
-                    result = future.result()
-                    if result["success"]:
-                        results["processed_files"] += 1
-                        print(f"✓ Processed: {Path(pdf_path).name}")
-                    else:
-                        results["failed_files"] += 1
-                        print(f"✗ Failed: {Path(pdf_path).name} - {result['error']}")
-                    
-                    results["results"].append(result)
+                    await asyncio.to_thread(
+                        manifest.record, result["pdf_path"], "done" if result["success"] else "failed",
+                        outputs=outputs_of(result["pdf_path"]) if result["success"] else (),
+                        options=options, error=result["error"]
+                    )
                 except Exception as e:
-                    results["failed_files"] += 1
-                    print(f"✗ Failed: {Path(pdf_path).name} - {str(e)}")
-                    results["results"].append({
-                        "pdf_path": str(pdf_path),
-                        "success": False,
-                        "error": str(e)
-                    })
+                    print(f"Could not update {manifest.path}: {e}")
+        finally:
+            # on cancellation, stop the PDFs still in flight
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
         
         print(f"\nProcessing complete:")
         print(f"  Successfully processed: {results['processed_files']} files")
         print(f"  Failed: {results['failed_files']} files")
+        print(f"  Skipped (unchanged since an earlier run): {results['skipped_files']} files")
+        if work_dir is not None and results["processed_files"]:
+            await asyncio.to_thread(self._write_cost_summary, work_dir)
+        if self.ocr_cache is not None:
+            cache_stats = self.ocr_cache.stats()
+            results["ocr_cache_hits"] = cache_stats["hits"] - cache_hits_before
+            print(f"  From the OCR cache: {results['ocr_cache_hits']} files")
         print(f"  Output directory: {results['output_directory']}")
         
         return results
@@ -219,26 +401,33 @@ class MistralOCRProcessor:
         
         return sorted(pdf_files)
     
-    def _process_pdf_with_error_handling(self, 
-                                        pdf_path: str,
-                                        save_markdown: bool,
-                                        save_json: bool,
-                                        save_text: bool,
-                                        output_dir: Path,
-                                        meta_data_path: str,
-                                        work_dir: str = None) -> Dict[str, Any]:
-        """Process a single PDF with error handling for parallel execution."""
+    async def _process_pdf_with_error_handling(self, 
+                                              pdf_path: str,
+                                              save_markdown: bool,
+                                              save_json: bool,
+                                              save_text: bool,
+                                              output_dir: Path,
+                                              meta_data_path: str,
+                                              work_dir: str = None,
+                                              in_flight: asyncio.Semaphore = None,
+                                              timeout: float = None) -> Dict[str, Any]:
+        """Process a single PDF with error handling for concurrent execution.
+
+        The PDF waits for a slot of ``in_flight``, and ``timeout`` only counts from then on.
+        """
         try:
-            # Write files directly to the main output directory (no subfolders)
-            result = self.process_single_pdf(
-                pdf_path=pdf_path,
-                save_markdown=save_markdown,
-                save_json=save_json,
-                save_text=save_text,
-                output_dir=str(output_dir),
-                meta_data_path=meta_data_path,
-                work_dir=work_dir
-            )
+            async with in_flight or contextlib.nullcontext():
+                # Write files directly to the main output directory (no subfolders)
+                result = await asyncio.wait_for(self.process_single_pdf_async(
+                    pdf_path=pdf_path,
+                    save_markdown=save_markdown,
+                    save_json=save_json,
+                    save_text=save_text,
+                    output_dir=str(output_dir),
+                    meta_data_path=meta_data_path,
+                    work_dir=work_dir,
+                    update_cost_summary=False
+                ), timeout=timeout)
             
             return {
                 "pdf_path": pdf_path,
@@ -248,6 +437,14 @@ class MistralOCRProcessor:
                 "error": None
             }
             
+        except asyncio.TimeoutError:
+            return {
+                "pdf_path": pdf_path,
+                "success": False,
+                "output_directory": None,
+                "num_pages": 0,
+                "error": f"timed out after {timeout} s"
+            }
         except Exception as e:
             return {
                 "pdf_path": pdf_path,
@@ -267,6 +464,50 @@ class MistralOCRProcessor:
                            work_dir: str = None) -> Dict[str, Any]:
         """
         Process a single PDF file with Mistral OCR.
+
+        Synchronous wrapper around ``process_single_pdf_async``, same arguments.
+        """
+        return _run_sync(self._run_in_session(self.process_single_pdf_async(
+            pdf_path,
+            save_markdown=save_markdown,
+            save_json=save_json,
+            save_text=save_text,
+            output_dir=output_dir,
+            meta_data_path=meta_data_path,
+            work_dir=work_dir,
+        )))
+
+    async def _run_in_session(self, coroutine):
+        """Await ``coroutine`` with an HTTP connection pool opened on the running event loop.
+
+        Pooled connections can only be used on the loop that opened them, and every
+        call of the synchronous API runs on a new loop, so the pool of the Mistral
+        client is replaced for the duration of the call and closed after it.
+        """
+        # without a client yet, one created during the call opens its own pool on this loop
+        config = getattr(self._client, "sdk_configuration", None)
+        if config is None:
+            return await coroutine
+        import httpx
+        previous = config.async_client
+        async with httpx.AsyncClient(follow_redirects=True) as http_client:
+            config.async_client = http_client
+            try:
+                return await coroutine
+            finally:
+                config.async_client = previous
+
+    async def process_single_pdf_async(self,
+                                       pdf_path: str,
+                                       save_markdown: bool = True,
+                                       save_json: bool = True,
+                                       save_text: bool = False,
+                                       output_dir: str = None,
+                                       meta_data_path: str = None,
+                                       work_dir: str = None,
+                                       update_cost_summary: bool = True) -> Dict[str, Any]:
+        """
+        Process a single PDF file with Mistral OCR.
         
         Args:
             pdf_path: Path to the PDF file
@@ -276,6 +517,8 @@ class MistralOCRProcessor:
             output_dir: Directory to save the output files
             meta_data_path: Path to the metadata file
             work_dir: Working directory for cost tracking (optional)
+            update_cost_summary: Whether to rewrite ``ocr_cost.json`` from the cost ledger of
+                ``work_dir`` (``process_folder`` does it once, at the end)
         Returns:
             Dictionary with extracted text by page and cost information
         """
@@ -317,53 +560,70 @@ class MistralOCRProcessor:
             #     file_id=uploaded_file.id, 
             #     expiry=60
             # )
-            print(f"Encoding PDF: {pdf_path}")
-            base64_pdf = self._encode_pdf(pdf_path)
-            
-            # Process PDF with OCR
-            print("Processing PDF with OCR...")
-            include_image_base64 = True
+            ocr_options = {
+                "model": self.model,
+                "include_image_base64": True,
+                "bbox_annotation_format": Image.model_json_schema(),
+            }
+            # same file, model and options: reuse the result of an earlier run, whatever its work_dir
+            pdf_digest = await asyncio.to_thread(file_digest, pdf_path) if self.ocr_cache is not None else None
+
+            # page images are written to images/<pdf name>/ and only referenced from the outputs
+            images_dir = os.path.join(output_dir, "images", pdf_file.stem)
+
+            num_pages = await asyncio.to_thread(self._count_pages, pdf_path) if self.pages_per_chunk or self.engines else None
+
+            # local engines first, each on the pages the previous ones could not read
+            pages = []
+            page_engines = {}
+            remaining = list(range(num_pages)) if num_pages is not None else None
+            for engine in self.engines if remaining is not None else []:
+                if not remaining:
+                    break
+                found = await engine.extract(pdf_path, remaining)
+                for index, markdown in found.items():
+                    pages.append(SimpleNamespace(index=index, markdown=markdown, images=[]))
+                    page_engines[index] = engine.name
+                remaining = [index for index in remaining if index not in found]
+            if page_engines:
+                print(f"{pdf_file.name}: {len(page_engines)}/{num_pages} pages read locally, {len(remaining)} left")
+
+            usage_info, cached_pages, image_refs = None, 0, {}
+            if remaining is None or remaining:
+                if not self.use_mistral:
+                    if remaining is None:
+                        raise ValueError(f"Could not read {pdf_file.name} without Mistral OCR")
+                    # pages no engine could read are kept empty
+                    pages.extend(SimpleNamespace(index=index, markdown="", images=[]) for index in remaining)
+                else:
+                    mistral_pages, usage_info, cached_pages, image_refs = await self._mistral_ocr(
+                        pdf_path, remaining, num_pages, pdf_digest, ocr_options, images_dir, output_dir)
+                    pages.extend(mistral_pages)
+                    page_engines.update({page.index: "mistral" for page in mistral_pages})
+            ocr_response = SimpleNamespace(pages=sorted(pages, key=lambda page: page.index))
 
-            print(f"Processing PDF with OCR... include_image_base64: {include_image_base64}")
-            ocr_response = self.client.ocr.process(
-            document={
-                "type": "document_url",
-                "document_url": f"data:application/pdf;base64,{base64_pdf}" 
-            },
-                model="mistral-ocr-latest",
-                include_image_base64=include_image_base64,
-                bbox_annotation_format=response_format_from_pydantic_model(Image),
-            )
-            
             # Extract usage information and calculate cost
-            usage_info = ocr_response.usage_info if hasattr(ocr_response, 'usage_info') else None
-            cost_info = self._calculate_cost_info(usage_info, pdf_file.name)
+            local_pages = sum(engine != "mistral" for engine in page_engines.values())
+            cost_info = self._calculate_cost_info(usage_info, pdf_file.name, cached_pages=cached_pages, local_pages=local_pages)
             
-            # Save cost information to work_dir if provided
+            # Record the cost in the ledger of work_dir if provided
             if work_dir is not None:
-                self._save_cost_info(cost_info, work_dir)
+                await asyncio.to_thread(self._save_cost_info, cost_info, work_dir)
+                if update_cost_summary:
+                    await asyncio.to_thread(self._write_cost_summary, work_dir)
             
             # Extract structured content
-            structured_content = self._extract_structured_content(ocr_response, pdf_file.stem)
+            structured_content = self._extract_structured_content(ocr_response, pdf_file.stem, image_refs=image_refs,
+                                                                  page_engines=page_engines)
             
             # Add cost information to the result
             structured_content["cost_info"] = cost_info
             
             # Save outputs
-            base_name = pdf_file.stem
-            
-            if save_json:
-                json_path = os.path.join(output_dir, f"{base_name}_ocr.json")
-                self._save_to_json(structured_content, json_path)
-            
-            if save_markdown:
-                markdown_path = os.path.join(output_dir, f"{base_name}.md")
-                self._save_to_markdown(structured_content, markdown_path)
-            
-            # Also create PaperQA2 compatible text file if save_text is True    
-            if save_text:
-                txt_path = os.path.join(output_dir, f"{base_name}.txt")
-                self._save_to_text(structured_content, txt_path)
+            await asyncio.to_thread(
+                self._save_outputs, structured_content, output_dir, pdf_file.stem,
+                save_markdown, save_json, save_text
+            )
             
             return structured_content
             
@@ -371,11 +631,229 @@ class MistralOCRProcessor:
             print(f"Error processing PDF: {str(e)}")
             raise
         
+    @staticmethod
+    def _output_files(base_name, save_markdown, save_json, save_text):
+        """Return the names of the output files of a PDF, in its output directory."""
+        return [
+            name for name, saved in ((f"{base_name}_ocr.json", save_json), (f"{base_name}.md", save_markdown),
+                                     (f"{base_name}.txt", save_text))
+            if saved
+        ]
+
+    def _save_outputs(self, structured_content, output_dir, base_name, save_markdown, save_json, save_text):
+        """Write the JSON, markdown and text outputs of a PDF."""
+        if save_json:
+            json_path = os.path.join(output_dir, f"{base_name}_ocr.json")
+            self._save_to_json(structured_content, json_path)
+        
+        if save_markdown:
+            markdown_path = os.path.join(output_dir, f"{base_name}.md")
+            self._save_to_markdown(structured_content, markdown_path)
+        
+        # Also create PaperQA2 compatible text file if save_text is True    
+        if save_text:
+            txt_path = os.path.join(output_dir, f"{base_name}.txt")
+            self._save_to_text(structured_content, txt_path)
+
+    async def _mistral_ocr(self, pdf_path, page_indices, num_pages, pdf_digest, ocr_options, images_dir, output_dir):
+        """OCR pages of a PDF with Mistral, the whole document or only ``page_indices``.
+
+        Long documents (over ``pages_per_chunk`` pages) and page subsets are sent
+        in chunks, the whole document otherwise.
+
+        Returns:
+            The pages, the usage, the number of cached pages and the image references by page index
+        """
+        name = Path(pdf_path).name
+        whole = page_indices is None or len(page_indices) == num_pages
+        if whole and (num_pages is None or not self.pages_per_chunk or num_pages <= self.pages_per_chunk):
+            cache_key = ocr_cache_key(pdf_digest, ocr_options) if pdf_digest is not None else None
+            ocr_response, cached = await self._run_ocr(lambda: self._encode_pdf(pdf_path), cache_key, name, ocr_options)
+            if cached:
+                print(f"Using cached OCR result for {name}")
+            usage_info = None if cached else getattr(ocr_response, 'usage_info', None)
+            cached_pages = len(ocr_response.pages) if cached else 0
+            image_refs = await asyncio.to_thread(self._spill_images, ocr_response.pages, images_dir, output_dir)
+            return ocr_response.pages, usage_info, cached_pages, image_refs
+
+        return await self._ocr_in_chunks(pdf_path, page_indices, pdf_digest, ocr_options, images_dir, output_dir,
+                                         self.pages_per_chunk or len(page_indices))
+
+    async def _run_ocr(self, encode, cache_key, filename, ocr_options):
+        """OCR one document, a whole PDF or a chunk of it, through the OCR cache.
+
+        Args:
+            encode: Function returning the document as a base64 data URL, only called on a cache miss
+            cache_key: OCR cache key of the document, None to bypass the cache
+            filename: Name recorded in the cache
+            ocr_options: Model and options of the OCR call
+        Returns:
+            The OCR response and whether it came from the cache
+        """
+        from mistralai.extra import response_format_from_pydantic_model
+        from mistralai.models import OCRResponse
+
+        if cache_key is not None:
+            cached_response = await asyncio.to_thread(self.ocr_cache.get, cache_key)
+            if cached_response is not None:
+                return OCRResponse.model_validate(cached_response), True
+
+        print(f"Encoding PDF: {filename}")
+        data_url = await asyncio.to_thread(encode)
+
+        print(f"Processing PDF with OCR... include_image_base64: {ocr_options['include_image_base64']}")
+        ocr_response = await get_rate_limiter().acall(
+            "mistral", ocr_options["model"], self.client.ocr.process_async,
+            max_retries=self.max_retries,
+            base_delay=self.retry_base_delay,
+            document={
+                "type": "document_url",
+                "document_url": data_url
+            },
+            model=ocr_options["model"],
+            include_image_base64=ocr_options["include_image_base64"],
+            bbox_annotation_format=response_format_from_pydantic_model(Image),
+        )
+        del data_url
+        if cache_key is not None:
+            await asyncio.to_thread(self.ocr_cache.set, cache_key, ocr_response.model_dump(mode="json"), filename=filename)
+        return ocr_response, False
+
+    def _count_pages(self, pdf_path):
+        """Return the number of pages of the PDF, or None if ``pypdf`` is not installed or cannot read it."""
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            print("pypdf is not installed (pip install 'cmbagent[pdf]'), OCR-ing the PDF in one piece")
+            return None
+        try:
+            return len(PdfReader(pdf_path).pages)
+        except Exception as e:
+            print(f"Could not read {Path(pdf_path).name} with pypdf ({e}), OCR-ing it in one piece")
+            return None
+
+    async def _ocr_in_chunks(self, pdf_path, page_indices, pdf_digest, ocr_options, images_dir, output_dir, chunk_size):
+        """OCR pages of a PDF in chunks of ``chunk_size`` pages, at most ``max_chunks_in_flight`` at a time.
+
+        Each chunk is written to memory, encoded and sent only when a slot is
+        free, and its page images are written to ``images_dir`` once it is done,
+        so the memory used does not grow with the size of the PDF.
+
+        Returns:
+            The pages in order, the summed usage, the number of cached pages and
+            the image references by page index
+        """
+        from threading import Lock
+        from io import BytesIO
+        from pypdf import PdfReader, PdfWriter
+
+        reader = PdfReader(pdf_path)
+        reader_lock = Lock()  # pypdf readers are not thread safe
+        name = Path(pdf_path).name
+        chunks = [page_indices[i:i + chunk_size] for i in range(0, len(page_indices), chunk_size)]
+        print(f"OCR of {len(page_indices)} pages of {name} in {len(chunks)} chunks of up to {chunk_size} pages")
+
+        def encode_chunk(chunk):
+            with reader_lock:
+                writer = PdfWriter()
+                for page_index in chunk:
+                    writer.add_page(reader.pages[page_index])
+                buffer = BytesIO()
+                writer.write(buffer)
+            size = buffer.tell()
+            buffer.seek(0)
+            return _pdf_data_url(buffer, size)
+
+        in_flight = asyncio.Semaphore(self.max_chunks_in_flight)
+
+        async def ocr_chunk(chunk):
+            contiguous = chunk[-1] - chunk[0] == len(chunk) - 1
+            pages_key = [chunk[0], chunk[-1] + 1] if contiguous else chunk
+            cache_key = ocr_cache_key(pdf_digest, {**ocr_options, "pages": pages_key}) if pdf_digest is not None else None
+            label = f"{name} pages {chunk[0] + 1}-{chunk[-1] + 1}" if contiguous else f"{name} pages {[i + 1 for i in chunk]}"
+            async with in_flight:
+                response, cached = await self._run_ocr(lambda: encode_chunk(chunk), cache_key, label, ocr_options)
+                for page_index, page in zip(chunk, response.pages):
+                    page.index = page_index
+                chunk_refs = await asyncio.to_thread(self._spill_images, response.pages, images_dir, output_dir)
+            return response, cached, chunk_refs
+
+        pages = []
+        image_refs = {}
+        pages_processed = doc_size_bytes = cached_pages = 0
+        for response, cached, chunk_refs in await asyncio.gather(*(ocr_chunk(chunk) for chunk in chunks)):
+            pages.extend(response.pages)
+            image_refs.update(chunk_refs)
+            if cached:
+                cached_pages += len(response.pages)
+            elif getattr(response, 'usage_info', None) is not None:
+                pages_processed += response.usage_info.pages_processed or 0
+                doc_size_bytes += response.usage_info.doc_size_bytes or 0
+
+        usage_info = SimpleNamespace(pages_processed=pages_processed, doc_size_bytes=doc_size_bytes)
+        return pages, usage_info, cached_pages, image_refs
+
+    def _spill_images(self, pages, images_dir, output_dir):
+        """Write the base64 images of OCR'd pages to ``images_dir`` and drop them from the pages.
+
+        Each image is decoded in blocks straight to ``<page>_<idx>.<ext>``, so
+        no decoded copy of it is held in memory, and its base64 payload is
+        released once written.
+
+        Args:
+            pages: OCR response pages, their ``index`` is the 0-based page number
+            images_dir: Directory of the image files
+            output_dir: Directory the returned paths are relative to
+        Returns:
+            ``{page index: [image reference]}``, each reference with the image ``id``
+            (as linked from the page markdown), ``path``, ``bbox`` and ``annotation``
+        """
+        image_refs = {}
+        for position, page in enumerate(pages):
+            page_index = page.index if getattr(page, 'index', None) is not None else position
+            refs = []
+            for idx, image in enumerate(page.images or []):
+                data = image.image_base64
+                if not data:
+                    continue
+                header, _, data = data.rpartition(",")
+                extension = Path(image.id or "").suffix.lstrip(".")
+                if not extension:
+                    mime = re.match(r"data:image/(\w+)", header)
+                    extension = mime.group(1) if mime else "png"
+                image_path = os.path.join(images_dir, f"{page_index + 1}_{idx}.{extension}")
+                os.makedirs(images_dir, exist_ok=True)
+                try:
+                    with open(image_path, "wb") as f:
+                        # a multiple of 4 characters, so that each block decodes on its own
+                        for offset in range(0, len(data), 4 * 256 * 1024):
+                            f.write(base64.b64decode(data[offset:offset + 4 * 256 * 1024]))
+                except Exception as e:
+                    print(f"Error writing image {image.id} of page {page_index + 1}: {e}")
+                    continue
+                finally:
+                    image.image_base64 = None
+                annotation = image.image_annotation
+                if isinstance(annotation, str):
+                    try:
+                        annotation = json.loads(annotation)
+                    except json.JSONDecodeError:
+                        pass
+                refs.append({
+                    "id": image.id,
+                    "path": Path(os.path.relpath(image_path, output_dir)).as_posix(),
+                    "bbox": [image.top_left_x, image.top_left_y, image.bottom_right_x, image.bottom_right_y],
+                    "annotation": annotation,
+                })
+            if refs:
+                image_refs[page_index] = refs
+        return image_refs
+
     def _encode_pdf(self, pdf_path):
-        """Encode the pdf to base64."""
+        """Return the pdf as a base64 data URL, see ``_pdf_data_url``; ``pages_per_chunk`` bounds the memory used by large PDFs."""
         try:
             with open(pdf_path, "rb") as pdf_file:
-                return base64.b64encode(pdf_file.read()).decode('utf-8')
+                return _pdf_data_url(pdf_file, os.fstat(pdf_file.fileno()).st_size)
         except FileNotFoundError:
             print(f"Error: The file {pdf_path} was not found.")
             return None
@@ -384,8 +862,16 @@ class MistralOCRProcessor:
             return None
 
 
-    def _extract_structured_content(self, ocr_response, pdf_name: str) -> Dict[str, Any]:
-        """Extract structured content from OCR response."""
+    def _extract_structured_content(self, ocr_response, pdf_name: str, image_refs: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+                                    page_engines: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
+        """Extract structured content from OCR response.
+
+        ``image_refs`` (from ``_spill_images``) are listed under each page, and the
+        image links of the page markdown are pointed at the image files.
+        ``page_engines`` gives the engine that read each page, recorded as its ``engine``.
+        """
+        image_refs = image_refs or {}
+        page_engines = page_engines or {}
         structured_content = {
             "filename": pdf_name,
             "num_pages": len(ocr_response.pages),
@@ -405,17 +891,24 @@ class MistralOCRProcessor:
         for i, page in enumerate(ocr_response.pages):
             page_num = i + 1
             page_markdown = page.markdown
+            page_images = image_refs.get(i, [])
+            for ref in page_images:
+                page_markdown = page_markdown.replace(f"]({ref['id']})", f"]({ref['path']})")
             page_text = page.text if hasattr(page, 'text') else page_markdown
             
             full_text.append(page_text)
             full_markdown.append(page_markdown)
             #full_image_base64.append(page.image_base64)
             # Store page content
-            structured_content["pages"].append({
+            page_entry = {
                 "page_num": page_num,
                 "text": page_text,
-                "markdown": page_markdown
-            })
+                "markdown": page_markdown,
+                "engine": page_engines.get(i)
+            }
+            if page_images:
+                page_entry["images"] = page_images
+            structured_content["pages"].append(page_entry)
             
             # Try to identify sections
             lines = page_markdown.split("\n")
@@ -464,14 +957,19 @@ class MistralOCRProcessor:
             raise
 
     def _save_to_markdown(self, data: Dict[str, Any], output_path: str) -> None:
-        """Save the full markdown content to a .md file."""
+        """Save the full markdown content to a .md file, each page preceded by a ``PAGE_MARKER``."""
         try:
             with open(output_path, 'w', encoding='utf-8') as f:
                 # Add title
                 f.write(f"# {data['filename']}\n\n")
                 f.write(f"**Pages:** {data['num_pages']}\n\n")
                 f.write("---\n\n")
-                f.write(data["full_markdown"])
+                if data.get("pages"):
+                    f.write("\n\n".join(
+                        f"{PAGE_MARKER.format(page['page_num'])}\n\n{page['markdown']}" for page in data["pages"]
+                    ))
+                else:
+                    f.write(data["full_markdown"])
             print(f"Saved Markdown output to {output_path}")
         except Exception as e:
             print(f"Error saving Markdown output: {str(e)}")
@@ -487,12 +985,19 @@ class MistralOCRProcessor:
             print(f"Error saving text output: {str(e)}")
             raise
 
-    def _calculate_cost_info(self, usage_info, filename: str) -> Dict[str, Any]:
-        """Calculate cost information from Mistral OCR usage data."""
+    def _calculate_cost_info(self, usage_info, filename: str, cached_pages: int = 0, local_pages: int = 0) -> Dict[str, Any]:
+        """Calculate cost information from Mistral OCR usage data.
+
+        Results served from the OCR cache have no usage data, their pages are
+        reported as ``cached_pages`` at no cost, as are the ``local_pages`` read
+        by the local engines.
+        """
         if usage_info is None:
             return {
                 "filename": filename,
                 "pages_processed": 0,
+                "cached_pages": cached_pages,
+                "local_pages": local_pages,
                 "doc_size_bytes": 0,
                 "cost_usd": 0.0,
                 "cost_per_page": 0.001,  # $1 per 1000 pages
@@ -508,6 +1013,8 @@ class MistralOCRProcessor:
         return {
             "filename": filename,
             "pages_processed": pages_processed,
+            "cached_pages": cached_pages,
+            "local_pages": local_pages,
             "doc_size_bytes": doc_size_bytes,
             "cost_usd": cost_usd,
             "cost_per_page": 0.001,
@@ -515,48 +1022,71 @@ class MistralOCRProcessor:
         }
 
     def _save_cost_info(self, cost_info: Dict[str, Any], work_dir: str) -> None:
-        """Save cost information to ocr_cost.json in work directory."""
+        """Append cost information to the cost ledger of the work directory."""
+        ledger = CostLedger(cost_ledger_path(work_dir))
+        try:
+            if not os.path.exists(ledger.path):
+                self._import_legacy_costs(ledger, work_dir)
+            ledger.append({"kind": "ocr", "file": cost_info["filename"], **cost_info})
+        except Exception as e:
+            print(f"Error saving cost information: {str(e)}")
+
+    def _import_legacy_costs(self, ledger: CostLedger, work_dir: str) -> None:
+        """Move the entries of an ``ocr_cost.json`` written before the cost ledger into it."""
         cost_file_path = os.path.join(work_dir, "ocr_cost.json")
-        
-        # Load existing cost data if file exists
-        existing_costs = []
-        if os.path.exists(cost_file_path):
-            try:
-                with open(cost_file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    if isinstance(existing_data, dict) and 'entries' in existing_data:
-                        # Existing cost summary format - extract entries
-                        existing_costs = existing_data['entries']
-                    elif isinstance(existing_data, list):
-                        # Legacy list format
-                        existing_costs = existing_data
-                    elif isinstance(existing_data, dict):
-                        # Single entry format
-                        existing_costs = [existing_data]
-            except Exception as e:
-                print(f"Warning: Could not read existing cost file: {e}")
-        
-        # Append new cost info
-        existing_costs.append(cost_info)
-        
-        # Calculate total costs
-        total_pages = sum(item.get("pages_processed", 0) for item in existing_costs)
-        total_cost = sum(item.get("cost_usd", 0.0) for item in existing_costs)
-        
-        # Create summary with individual entries
-        cost_summary = {
-            "total_pages_processed": total_pages,
-            "total_cost_usd": total_cost,
-            "cost_per_page": 0.001,
-            "entries": existing_costs,
-            "last_updated": time.time()
-        }
-        
+        if not os.path.exists(cost_file_path):
+            return
         try:
-            with open(cost_file_path, 'w', encoding='utf-8') as f:
-                json.dump(cost_summary, f, indent=2, ensure_ascii=False)
+            with open(cost_file_path, 'r', encoding='utf-8') as f:
+                existing_data = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not read existing cost file: {e}")
+            return
+        if isinstance(existing_data, dict) and 'entries' in existing_data:
+            existing_costs = existing_data['entries']
+        elif isinstance(existing_data, list):
+            # Legacy list format
+            existing_costs = existing_data
+        else:
+            # Single entry format
+            existing_costs = [existing_data]
+        # under the ledger lock, so that concurrent PDFs import them once
+        ledger.extend([{"kind": "ocr", "file": item.get("filename"), "run": "legacy", **item} for item in existing_costs],
+                      only_if_empty=True)
+
+    def _write_cost_summary(self, work_dir: str) -> None:
+        """Rewrite ``ocr_cost.json``, the OCR costs of the work directory, from its cost ledger."""
+        ledger = CostLedger(cost_ledger_path(work_dir))
+        cost_file_path = os.path.join(work_dir, "ocr_cost.json")
+        try:
+            with _cost_summary_lock:
+                # in a batch the ledger is shared by the tasks, the view is that of this task
+                entries = ledger.entries(kind="ocr", task=get_task_id())
+                totals = summarize_costs(entries)
+                cost_summary = {
+                    "total_pages_processed": totals.get("pages_processed", 0),
+                    "total_cached_pages": totals.get("cached_pages", 0),
+                    "total_local_pages": totals.get("local_pages", 0),
+                    "total_cost_usd": totals["cost_usd"],
+                    "cost_per_page": 0.001,
+                    "entries": entries,
+                    "ledger": ledger.path,
+                    "last_updated": time.time()
+                }
+                # written aside and moved in place, so that readers never see a partial file
+                os.makedirs(work_dir, exist_ok=True)
+                fd, temporary_path = tempfile.mkstemp(dir=work_dir, prefix="ocr_cost.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(cost_summary, f, indent=2, ensure_ascii=False)
+                    os.replace(temporary_path, cost_file_path)
+                except BaseException:
+                    os.unlink(temporary_path)
+                    raise
             print(f"Updated cost tracking: {cost_file_path}")
-            print(f"Session total: {total_pages} pages, ${total_cost:.3f}")
+            print(f"Session total: {cost_summary['total_pages_processed']} pages, ${cost_summary['total_cost_usd']:.3f} "
+                  f"({cost_summary['total_cached_pages']} pages from the OCR cache, "
+                  f"{cost_summary['total_local_pages']} read locally)")
         except Exception as e:
             print(f"Error saving cost information: {str(e)}")
 
@@ -568,7 +1098,10 @@ def process_single_pdf(pdf_path: str,
                       save_text: bool = False,
                       output_dir: str = None,
                       meta_data_path: str = None,
-                      work_dir: str = None):
+                      work_dir: str = None,
+                      ocr_cache=True,
+                      pages_per_chunk: int = None,
+                      engines=DEFAULT_OCR_ENGINES):
     """
     Process a single PDF file with Mistral OCR.
     
@@ -580,11 +1113,14 @@ def process_single_pdf(pdf_path: str,
         output_dir: Directory to save the output files
         meta_data_path: Path to the metadata file
         work_dir: Working directory for cost tracking (optional)
+        ocr_cache: OCR result cache shared across work_dirs (True, a path, or False to disable)
+        pages_per_chunk: OCR PDFs with more pages in page-range chunks of this size (needs pypdf)
+        engines: Page engines tried in order, by default the PDF text layer, then Mistral OCR
     
     Returns:
         Dictionary with extracted text by page and cost information
     """
-    processor = MistralOCRProcessor()
+    processor = MistralOCRProcessor(ocr_cache=ocr_cache, pages_per_chunk=pages_per_chunk, engines=engines)
     return processor.process_single_pdf(
         pdf_path=pdf_path,
         save_markdown=save_markdown,
@@ -603,7 +1139,12 @@ def process_folder(folder_path: str,
                    meta_data_path: str = None,
                    max_depth: int = 10,
                    max_workers: int = 4,
-                   work_dir: str = None):
+                   work_dir: str = None,
+                   ocr_cache=True,
+                   pages_per_chunk: int = None,
+                   file_timeout: float = None,
+                   engines=DEFAULT_OCR_ENGINES,
+                   incremental: bool = True):
     """
     Process all PDF files in a folder and its subfolders.
     
@@ -615,13 +1156,19 @@ def process_folder(folder_path: str,
         output_dir: Directory to save the output files (default: folder_path + "_processed")
         meta_data_path: Path to the metadata file
         max_depth: Maximum depth to search for PDF files
-        max_workers: Number of parallel workers for processing
+        max_workers: Number of PDFs processed at once
         work_dir: Working directory for cost tracking (optional)
+        ocr_cache: OCR result cache shared across work_dirs (True, a path, or False to disable)
+        pages_per_chunk: OCR PDFs with more pages in page-range chunks of this size (needs pypdf)
+        file_timeout: Seconds after which a PDF is given up and counted as failed (optional)
+        engines: Page engines tried in order, by default the PDF text layer, then Mistral OCR
+        incremental: Only process the PDFs that are new, changed or failed since the last run
+            into ``output_dir`` (see ``ocr_manifest.json`` there)
     
     Returns:
-        Dictionary with processing results summary
+        Dictionary with processing results summary, ``skipped_files`` counting the PDFs left out
     """
-    processor = MistralOCRProcessor()
+    processor = MistralOCRProcessor(ocr_cache=ocr_cache, pages_per_chunk=pages_per_chunk, engines=engines)
     return processor.process_folder(
         folder_path=folder_path,
         save_markdown=save_markdown,
@@ -631,6 +1178,49 @@ def process_folder(folder_path: str,
         meta_data_path=meta_data_path,
         max_depth=max_depth,
         max_workers=max_workers,
-        work_dir=work_dir
+        work_dir=work_dir,
+        file_timeout=file_timeout,
+        incremental=incremental
+    )
+
+async def process_folder_async(folder_path: str,
+                               save_markdown: bool = True,
+                               save_json: bool = True,
+                               save_text: bool = False,
+                               output_dir: str = None,
+                               meta_data_path: str = None,
+                               max_depth: int = 10,
+                               max_in_flight: int = 4,
+                               work_dir: str = None,
+                               ocr_cache=True,
+                               pages_per_chunk: int = None,
+                               file_timeout: float = None,
+                               max_retries: int = 5,
+                               engines=DEFAULT_OCR_ENGINES,
+                               incremental: bool = True):
+    """
+    Process all PDF files in a folder and its subfolders, from a running event loop.
+
+    Same as ``process_folder``, with ``max_in_flight`` PDFs processed at once and
+    OCR requests retried up to ``max_retries`` times after 429, 5xx and network errors.
+    Cancelling the task cancels the PDFs still being processed.
+    
+    Returns:
+        Dictionary with processing results summary
+    """
+    processor = MistralOCRProcessor(ocr_cache=ocr_cache, pages_per_chunk=pages_per_chunk, max_retries=max_retries,
+                                    engines=engines)
+    return await processor.process_folder_async(
+        folder_path=folder_path,
+        save_markdown=save_markdown,
+        save_json=save_json,
+        save_text=save_text,
+        output_dir=output_dir,
+        meta_data_path=meta_data_path,
+        max_depth=max_depth,
+        max_in_flight=max_in_flight,
+        work_dir=work_dir,
+        file_timeout=file_timeout,
+        incremental=incremental
     )
 
@@ -0,0 +1,151 @@
+"""Persistent, content-addressed cache for Mistral OCR results.
+
+OCR is billed per page, and the same arXiv paper is typically processed again
+in every work_dir it is downloaded to. ``OCRCache`` stores the full OCR
+response (page markdown, images and annotations) in a SQLite file shared by
+all work_dirs, keyed by the SHA-256 of the PDF bytes together with the OCR
+model and options. Any change to the file or to the options is a miss.
+
+Responses are stored zlib-compressed. When the cache grows over
+``max_size_mb``, the least recently used entries are evicted.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+
+def default_ocr_cache_path():
+    """Return the cache file location, ``$CMBAGENT_OCR_CACHE`` or ``~/.cmbagent/ocr_cache.sqlite``."""
+    return os.environ.get(
+        "CMBAGENT_OCR_CACHE",
+        os.path.join(os.path.expanduser("~"), ".cmbagent", "ocr_cache.sqlite"),
+    )
+
+
+def ocr_cache_key(pdf_sha256, options):
+    """Return the cache key of OCR-ing the PDF with digest ``pdf_sha256`` with ``options`` (model, OCR parameters, page range)."""
+    payload = {"pdf_sha256": pdf_sha256, "options": options}
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class OCRCache:
+    """SQLite-backed OCR result cache with LRU eviction and hit counters.
+
+    Args:
+        path: SQLite file. Defaults to ``default_ocr_cache_path()``.
+        max_size_mb: Upper bound on the stored (compressed) results, in MB.
+    """
+
+    def __init__(self, path=None, max_size_mb=2048):
+        self.path = str(path or default_ocr_cache_path())
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "cached_pages": 0}
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results ("
+                " key TEXT PRIMARY KEY,"
+                " filename TEXT,"
+                " model TEXT,"
+                " num_pages INTEGER NOT NULL,"
+                " result BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ocr_results_last_access ON ocr_results (last_access)")
+
+    def get(self, key):
+        """Return the cached OCR response (a JSON-like dict) for ``key`` or ``None``."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT result, num_pages FROM ocr_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE ocr_results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._stats["hits"] += 1
+            self._stats["cached_pages"] += row[1]
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key, response, filename=None):
+        """Store ``response`` (the OCR response as a JSON-like dict) under ``key``."""
+        data = zlib.compress(json.dumps(response).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ocr_results (key, filename, model, num_pages, result, size, created, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, filename, response.get("model"), len(response.get("pages") or []), data, len(data), now, now),
+                )
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries until under the size limit. Returns the number removed."""
+        with self._lock, self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_results").fetchone()[0]
+            if total <= self.max_size_bytes:
+                return 0
+            stale = []
+            for key, size in self._conn.execute("SELECT key, size FROM ocr_results ORDER BY last_access"):
+                if total <= self.max_size_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM ocr_results WHERE key = ?", stale)
+            return len(stale)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM ocr_results")
+            self.reset_stats()
+
+    def stats(self):
+        """Return the hits, misses and pages served from the cache since creation or ``reset_stats``."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"hits": 0, "misses": 0, "cached_pages": 0}
+
+    def info(self):
+        """Return the number of entries and their total size in bytes."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_results").fetchone()
+        return {"path": self.path, "entries": entries, "size_bytes": size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_ocr_cache(ocr_cache):
+    """Normalize the ``ocr_cache`` argument of the OCR functions.
+
+    Args:
+        ocr_cache: ``None``/``False`` (disabled), ``True`` (default file),
+            a path to a SQLite file, or an ``OCRCache``.
+
+    Returns:
+        An ``OCRCache`` or ``None``.
+    """
+    if ocr_cache is None or ocr_cache is False:
+        return None
+    if isinstance(ocr_cache, OCRCache):
+        return ocr_cache
+    if ocr_cache is True:
+        return OCRCache()
+    return OCRCache(path=ocr_cache)
@@ -0,0 +1,150 @@
+"""Engines turning the pages of a PDF into markdown, tried in order by ``MistralOCRProcessor``.
+
+Each engine gets the pages that the previous ones could not read and returns
+the ones it could. ``"mistral"`` (the Mistral OCR API, handled by the
+processor itself, with its cache, chunking and page images) is meant to come
+last, for the pages no local engine could read::
+
+    MistralOCRProcessor(engines=["text_layer", "mistral"])   # the default
+    MistralOCRProcessor(engines=["mistral"])                 # every page through the API
+
+``text_layer`` reads the text layer of born-digital PDFs (most arXiv papers)
+with ``pypdf``, in threads, and keeps only the pages with usable text; scanned pages, pages of figures and pages whose fonts do not map
+to text are left to Mistral. It does not extract images. Reading in a pool of
+worker processes instead (``TextLayerEngine(processes=True)``) uses every CPU,
+but the workers are spawned, so they re-import the ``__main__`` module of the
+caller: only use it from scripts guarded by ``if __name__ == "__main__":``.
+
+Custom engines subclass ``OCREngine`` and are passed as instances, or
+registered by name in ``OCR_ENGINES``.
+"""
+
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+DEFAULT_OCR_ENGINES = ("text_layer", "mistral")
+
+
+class OCREngine:
+    """Interface of the page engines of ``MistralOCRProcessor``."""
+
+    name = None
+
+    async def extract(self, pdf_path, page_indices):
+        """Read pages of a PDF.
+
+        Args:
+            pdf_path: Path to the PDF file
+            page_indices: 0-based indices of the pages to read
+        Returns:
+            ``{page index: markdown}`` for the pages the engine could read, the
+            others are left to the next engine
+        """
+        raise NotImplementedError
+
+
+def usable_text(text, min_chars=200):
+    """Whether text extracted from a page is worth keeping instead of OCR-ing the page.
+
+    Args:
+        text: Text of the page
+        min_chars: Fewest non-blank characters of a page with usable text
+    """
+    if not text:
+        return False
+    characters = "".join(text.split())
+    if len(characters) < min_chars:
+        return False
+    # glyphs that do not map to characters, from fonts without a unicode table
+    if "(cid:" in text or characters.count("�") > len(characters) // 100:
+        return False
+    return sum(character.isalnum() for character in characters) / len(characters) >= 0.6
+
+
+def _extract_text_pages(pdf_path, page_indices):
+    # runs in a thread, or in a worker process
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    pages = []
+    for index in page_indices:
+        try:
+            text = reader.pages[index].extract_text()
+        except Exception:
+            text = None
+        pages.append((index, text))
+    return pages
+
+
+_pool_lock = threading.Lock()
+_process_pool = None
+
+
+def _get_process_pool(max_workers):
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            # spawn: the processor runs event loops and threads, which do not survive a fork
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+class TextLayerEngine(OCREngine):
+    """Read the text layer of born-digital PDFs with ``pypdf``, in threads or in a pool of worker processes.
+
+    Args:
+        min_chars: Fewest non-blank characters of a page kept, see ``usable_text``
+        pages_per_task: Pages read per task
+        processes: Read in a pool of spawned worker processes instead of threads (needs the
+            ``if __name__ == "__main__":`` guard in the calling script)
+        max_workers: Worker processes of the pool (shared by all instances), by default the number of CPUs
+    """
+
+    name = "text_layer"
+
+    def __init__(self, min_chars=200, pages_per_task=8, processes=False, max_workers=None):
+        self.min_chars = min_chars
+        self.pages_per_task = pages_per_task
+        self.processes = processes
+        self.max_workers = max_workers
+
+    async def extract(self, pdf_path, page_indices):
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            print("pypdf is not installed (pip install 'cmbagent[pdf]'), text layer engine skipped")
+            return {}
+
+        # the default executor, unless the process pool was asked for
+        executor = _get_process_pool(self.max_workers) if self.processes else None
+        loop = asyncio.get_running_loop()
+        batches = [page_indices[i:i + self.pages_per_task] for i in range(0, len(page_indices), self.pages_per_task)]
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, _extract_text_pages, str(pdf_path), batch) for batch in batches
+            ))
+        except Exception as e:
+            print(f"Could not read the text layer of {pdf_path}: {e}")
+            return {}
+        return {
+            index: text.strip()
+            for batch in results for index, text in batch
+            if usable_text(text, self.min_chars)
+        }
+
+
+OCR_ENGINES = {
+    "text_layer": TextLayerEngine,
+}
+
+
+def get_ocr_engine(engine):
+    """Return the engine ``engine``, an ``OCREngine`` or the name of one in ``OCR_ENGINES``."""
+    if isinstance(engine, OCREngine):
+        return engine
+    if engine not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR engine {engine!r}, expected one of {['mistral', *OCR_ENGINES]} or an OCREngine")
+    return OCR_ENGINES[engine]()
@@ -0,0 +1,486 @@
+"""Process-wide rate limiting of the LLM and OCR provider calls.
+
+All the calls made by a process to a provider and model share one limiter,
+whatever thread they come from (group chats, parallel plan steps,
+``summarize_documents`` or ``process_folder`` workers, the backend). Each
+limiter enforces requests per minute and tokens per minute with two token
+buckets, so concurrent callers queue up instead of all hitting the provider
+and getting 429s.
+
+When a call is rate limited anyway, the limiter pauses every caller for the
+delay given by the error's ``retry-after`` / ``x-ratelimit-reset-*`` headers
+(or an exponential backoff), halves its rate, and retries the call. The rate
+recovers slowly with successful calls.
+
+Every call made through ``OpenAIWrapper.create`` (all cmbagent agents) goes
+through the limiter once ``install_rate_limit_hook`` has run, which
+``CMBAgent`` does. Other call paths (e.g. OCR) use ``get_rate_limiter().call``,
+or ``acall`` for coroutine functions, which also retries server errors::
+
+    get_rate_limiter().call("mistral", "mistral-ocr-latest", client.ocr.process, **params)
+    await get_rate_limiter().acall("mistral", "mistral-ocr-latest", client.ocr.process_async, **params)
+
+The limits are set in ``default_rate_limits`` by provider, or by
+``"provider/model"``, and can be changed with ``configure_rate_limits``.
+``get_rate_limiter().stats()`` returns the counters of every limiter.
+
+Processes can draw from the same limits with ``get_rate_limiter().share(path)``:
+the buckets are then kept in the SQLite file ``path`` and updated in a
+transaction on each request, so that e.g. the workers of a batch run (see
+``cmbagent.workflows.batch``) queue up together instead of each using a
+fixed share of the quota.
+"""
+
+import re
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+import contextlib
+
+
+# requests and tokens per minute, None for no limit
+default_rate_limits = {
+    "openai": {"requests_per_minute": 5000, "tokens_per_minute": 2_000_000},
+    "anthropic": {"requests_per_minute": 1000, "tokens_per_minute": 400_000},
+    "google": {"requests_per_minute": 1000, "tokens_per_minute": 2_000_000},
+    "mistral": {"requests_per_minute": 300, "tokens_per_minute": None},
+    "default": {"requests_per_minute": 1000, "tokens_per_minute": None},
+}
+
+# smallest fraction of the configured rate that backoff can bring a limiter down to
+_MIN_RATE_FACTOR = 0.05
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value):
+    # "20", "1.5", "6m0s", "250ms" -> seconds
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    matches = _DURATION_PATTERN.findall(value)
+    if not matches:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in matches)
+
+
+def _error_status(error):
+    status = getattr(error, "status_code", None)
+    for attribute in ("response", "raw_response"):
+        if status is None:
+            status = getattr(getattr(error, attribute, None), "status_code", None)
+    return status
+
+
+def _error_headers(error):
+    for attribute in ("response", "raw_response"):
+        headers = getattr(getattr(error, attribute, None), "headers", None)
+        if headers is not None:
+            return headers
+    return {}
+
+
+def is_rate_limit_error(error):
+    """Whether ``error`` is a provider's rate-limit (HTTP 429) error."""
+    if _error_status(error) == 429:
+        return True
+    name = type(error).__name__
+    return name in ("RateLimitError", "ResourceExhausted", "TooManyRequestsError")
+
+
+def is_retryable_error(error):
+    """Whether ``error`` is transient: rate limiting (429), a server error (5xx) or a network failure."""
+    if is_rate_limit_error(error):
+        return True
+    status = _error_status(error)
+    if isinstance(status, int) and status >= 500:
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # httpx (OpenAI, Mistral SDKs) connection errors and timeouts
+    return any(cls.__name__ == "TransportError" for cls in type(error).__mro__)
+
+
+def retry_delay(error):
+    """Seconds to wait before retrying after ``error``, from its headers, or None."""
+    headers = _error_headers(error)
+    if "retry-after-ms" in headers:
+        return float(headers["retry-after-ms"]) / 1000
+    delays = [
+        _parse_duration(headers[name])
+        for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if name in headers
+    ]
+    delays = [delay for delay in delays if delay is not None]
+    return max(delays) if delays else None
+
+
+class TokenBucket:
+    """A bucket refilled at ``per_minute`` units per minute, holding up to ten seconds' worth.
+
+    Args:
+        per_minute: Refill rate, None for no limit.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 6) if per_minute else None
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now, factor):
+        if self.per_minute:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute * factor / 60)
+        self.updated = now
+
+    def wait_time(self, amount, factor):
+        """Seconds until ``amount`` can be taken (a full bucket always allows one request)."""
+        if not self.per_minute:
+            return 0.0
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / (self.per_minute * factor))
+
+    def take(self, amount):
+        if self.per_minute:
+            self.level -= amount
+
+
+class SharedRateState:
+    """The buckets of the limiters of several processes, in the SQLite file ``path``.
+
+    Args:
+        path: SQLite file, created if needed.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS limiters (name TEXT PRIMARY KEY, requests REAL, tokens REAL, "
+            "updated REAL, blocked_until REAL, factor REAL)"
+        )
+
+    def _connection(self):
+        # one connection per thread, in autocommit mode to handle the transactions here
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self, limiter):
+        """Load the state of ``limiter`` saved by the other processes, and save it back after the block."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT requests, tokens, updated, blocked_until, factor FROM limiters WHERE name = ?", (limiter.name,)
+            ).fetchone()
+            if row is not None:
+                limiter.requests.level, limiter.tokens.level, updated, limiter.blocked_until, limiter.factor = row
+                limiter.requests.updated = limiter.tokens.updated = updated
+            yield
+            connection.execute(
+                "INSERT OR REPLACE INTO limiters VALUES (?, ?, ?, ?, ?, ?)",
+                (limiter.name, limiter.requests.level, limiter.tokens.level, limiter.requests.updated,
+                 limiter.blocked_until, limiter.factor),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+class ProviderLimiter:
+    """Requests and tokens per minute of one provider and model, shared by all threads.
+
+    Args:
+        name: ``provider/model``, used in the stats.
+        requests_per_minute: Request limit, None for no limit.
+        tokens_per_minute: Token limit, None for no limit.
+    """
+
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.factor = 1.0  # fraction of the configured rate, lowered by backoff
+        self.scale = 1.0  # share of the quota used by this process
+        self.blocked_until = 0.0
+        self.clock = time.monotonic
+        self.shared = None
+        self._condition = threading.Condition()
+        self.counters = {
+            "requests": 0,
+            "tokens": 0,
+            "throttled": 0,
+            "wait_seconds": 0.0,
+            "rate_limit_errors": 0,
+            "retries": 0,
+        }
+
+    def share(self, shared):
+        """Draw from the buckets kept in ``shared``, a ``SharedRateState``, with the other processes using it."""
+        with self._condition:
+            # times are compared across processes
+            self.clock = time.time
+            self.requests.updated = self.tokens.updated = self.blocked_until = self.clock()
+            self.shared = shared
+
+    @contextlib.contextmanager
+    def _state(self):
+        # with the condition held: the state up to date with the other processes, if shared
+        if self.shared is None:
+            yield
+        else:
+            with self.shared.transaction(self):
+                yield
+
+    def acquire(self, tokens=0):
+        """Block until a request of ``tokens`` tokens can be made."""
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                with self._state():
+                    wait = self._take(tokens)
+                if wait <= 0:
+                    break
+                self._condition.wait(wait)
+            self._record_wait(time.monotonic() - start)
+
+    async def aacquire(self, tokens=0):
+        """Wait on the event loop, without holding a thread, until a request of ``tokens`` tokens can be made."""
+        start = time.monotonic()
+        while True:
+            with self._condition, self._state():
+                wait = self._take(tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        with self._condition:
+            self._record_wait(time.monotonic() - start)
+
+    def _take(self, tokens):
+        # with the condition held: take a request of ``tokens`` tokens and return 0,
+        # or return the seconds to wait before trying again
+        now = self.clock()
+        factor = self.factor * self.scale
+        self.requests.refill(now, factor)
+        self.tokens.refill(now, factor)
+        wait = max(self.blocked_until - now, self.requests.wait_time(1, factor), self.tokens.wait_time(tokens, factor))
+        if wait > 0:
+            return wait
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.counters["requests"] += 1
+        self.counters["tokens"] += tokens
+        return 0.0
+
+    def _record_wait(self, waited):
+        if waited > 0.001:
+            self.counters["throttled"] += 1
+            self.counters["wait_seconds"] += waited
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the actual usage of a request is known."""
+        with self._condition, self._state():
+            self.tokens.take(actual_tokens - estimated_tokens)
+            self.counters["tokens"] += actual_tokens - estimated_tokens
+
+    def succeeded(self):
+        # successful calls slowly restore the rate after a backoff
+        with self._condition, self._state():
+            self.factor = min(1.0, self.factor * 1.02)
+
+    def backoff(self, error, attempt=0):
+        """Pause all callers after a rate-limit error and lower the rate. Returns the delay."""
+        delay = retry_delay(error)
+        if delay is None:
+            delay = min(60.0, 2.0 ** attempt)
+        with self._condition, self._state():
+            self.counters["rate_limit_errors"] += 1
+            self.counters["retries"] += 1
+            self.factor = max(_MIN_RATE_FACTOR, self.factor * 0.5)
+            self.blocked_until = max(self.blocked_until, self.clock() + delay)
+            self._condition.notify_all()
+        return delay
+
+    def record_retry(self):
+        # a retry after an error that is not rate limiting, which leaves the rate alone
+        with self._condition:
+            self.counters["retries"] += 1
+
+    def stats(self):
+        with self._condition:
+            return {**self.counters, "rate_factor": self.factor * self.scale}
+
+
+class RateLimiter:
+    """The ``ProviderLimiter`` of every provider and model used by the process.
+
+    Args:
+        limits: Limits by provider or ``provider/model``, see ``default_rate_limits``.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(default_rate_limits if limits is None else limits)
+        self.scale = 1.0
+        self.shared = None
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider, model=None):
+        """Return the limiter of ``provider`` and ``model``."""
+        provider = (provider or "openai").lower()
+        name = f"{provider}/{model}" if model else provider
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limits = self.limits.get(name) or self.limits.get(provider) or self.limits.get("default") or {}
+                limiter = ProviderLimiter(name, limits.get("requests_per_minute"), limits.get("tokens_per_minute"))
+                limiter.scale = self.scale
+                if self.shared is not None:
+                    limiter.share(self.shared)
+                self._limiters[name] = limiter
+            return limiter
+
+    def set_scale(self, scale):
+        """Use only ``scale`` of the configured rates, e.g. to leave some of the quota to other clients."""
+        with self._lock:
+            self.scale = scale
+            for limiter in self._limiters.values():
+                limiter.scale = scale
+
+    def share(self, path):
+        """Share the limits with the other processes sharing the SQLite file ``path``."""
+        with self._lock:
+            self.shared = SharedRateState(path)
+            for limiter in self._limiters.values():
+                limiter.share(self.shared)
+
+    def call(self, provider, model, function, /, *args, tokens=0, max_retries=5, **kwargs):
+        """Call ``function(*args, **kwargs)`` within the limits, retrying it on rate-limit errors.
+
+        Args:
+            provider: Provider name, e.g. ``openai`` or ``mistral``.
+            model: Model name, or None for a provider-wide limit.
+            function: The API call.
+            tokens: Estimated number of tokens of the request.
+            max_retries: Retries after rate-limit errors before the error is raised.
+        """
+        limiter = self.get(provider, model)
+        for attempt in range(max_retries + 1):
+            limiter.acquire(tokens)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    raise
+                delay = limiter.backoff(e, attempt)
+                print(f"Rate limited by {limiter.name}, retrying in {delay:.1f} s ({attempt + 1}/{max_retries})")
+            else:
+                limiter.succeeded()
+                return result
+
+    async def acall(self, provider, model, function, /, *args, tokens=0, max_retries=5, base_delay=1.0, **kwargs):
+        """Await ``function(*args, **kwargs)`` within the limits, retrying it on transient errors.
+
+        Rate-limit errors back off as in ``call``; server errors and network
+        failures are retried after an exponential delay. Delays are jittered so
+        that concurrent callers failing together do not retry together.
+
+        Args:
+            provider: Provider name, e.g. ``openai`` or ``mistral``.
+            model: Model name, or None for a provider-wide limit.
+            function: Coroutine function making the API call.
+            tokens: Estimated number of tokens of the request.
+            max_retries: Retries after transient errors before the error is raised.
+            base_delay: Seconds before the first retry after a server error, doubled at each attempt.
+        """
+        limiter = self.get(provider, model)
+        for attempt in range(max_retries + 1):
+            await limiter.aacquire(tokens)
+            try:
+                result = await function(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e) or attempt == max_retries:
+                    raise
+                if is_rate_limit_error(e):
+                    delay = limiter.backoff(e, attempt)
+                else:
+                    limiter.record_retry()
+                    delay = min(60.0, base_delay * 2.0 ** attempt)
+                delay *= 0.5 + random.random()
+                print(f"{type(e).__name__} from {limiter.name}, retrying in {delay:.1f} s ({attempt + 1}/{max_retries})")
+                await asyncio.sleep(delay)
+            else:
+                limiter.succeeded()
+                return result
+
+    def stats(self):
+        """Return the counters of every limiter, by ``provider/model``."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.stats() for limiter in limiters}
+
+    def reset(self):
+        with self._lock:
+            self._limiters = {}
+
+
+_rate_limiter = RateLimiter()
+
+
+def get_rate_limiter():
+    """Return the process-wide ``RateLimiter``."""
+    return _rate_limiter
+
+
+def configure_rate_limits(limits):
+    """Update the limits by provider or ``provider/model``, e.g. ``{"openai/gpt-4.1": {"tokens_per_minute": 30000}}``."""
+    for name, value in limits.items():
+        _rate_limiter.limits[name] = {**_rate_limiter.limits.get(name, {}), **value}
+    _rate_limiter.reset()
+
+
+_patch_lock = threading.Lock()
+_original_create = None
+
+
+def _estimate_tokens(config):
+    # about four characters per token, plus the completion budget
+    characters = sum(len(str(message.get("content") or "")) for message in config.get("messages") or [])
+    return characters // 4 + (config.get("max_tokens") or config.get("max_completion_tokens") or 0)
+
+
+def _limited_create(self, **config):
+    if not self._clients or not self._config_list:
+        return _original_create(self, **config)
+    client_config = self._config_list[0]
+    provider = client_config.get("api_type") or "openai"
+    model = config.get("model") or client_config.get("model")
+    tokens = _estimate_tokens(config)
+    response = _rate_limiter.call(provider, model, _original_create, self, tokens=tokens, **config)
+
+    total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+    if isinstance(total_tokens, int):
+        _rate_limiter.get(provider, model).record_usage(tokens, total_tokens)
+    return response
+
+
+def install_rate_limit_hook():
+    """Patch ``OpenAIWrapper.create`` once so that all LLM calls go through the rate limiter."""
+    global _original_create
+    with _patch_lock:
+        if _original_create is not None:
+            return
+        from autogen.oai.client import OpenAIWrapper
+        _original_create = OpenAIWrapper.create
+        OpenAIWrapper.create = _limited_create
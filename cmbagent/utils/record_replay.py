@@ -0,0 +1,296 @@
+"""Record and replay full workflow runs.
+
+``record_run(path)`` writes every LLM request/response and every code
+execution result of a run to a compact JSON-lines log (gzip-compressed when
+``path`` ends in ``.gz``). ``replay_run(path)`` serves the same run back from
+the log: the LLM clients are never called and no code is executed, so a
+recorded deep_research or one-shot run can be re-run deterministically and
+offline, e.g. to debug a hand-off or to profile cmbagent's own overhead.
+
+Recorded LLM responses are replayed per agent: each request is hashed as in
+the response cache and served the first recorded response with the same hash,
+so that concurrent plan steps can be replayed in any order. When no recorded
+request matches (the prompts or the code changed since the recording), the
+next recorded response is served and a divergence is counted, or raised in
+``strict`` mode.
+
+The workflows and ``CMBAgent.solve`` accept ``record=`` and ``replay=``
+paths through the ``recordable`` decorator::
+
+    one_shot(task, agent="engineer", record="run.jsonl.gz")
+    one_shot(task, agent="engineer", replay="run.jsonl.gz")
+
+Only LLM calls and code execution are replayed. Workflow steps that download
+files (arXiv papers, OCR) still run as usual.
+"""
+
+import gzip
+import json
+import time
+import inspect
+import functools
+import threading
+import contextlib
+from collections import defaultdict, deque
+
+from .response_cache import (
+    request_key,
+    request_params,
+    response_to_json,
+    response_from_json,
+    install_response_cache_hook,
+)
+
+
+LOG_VERSION = 1
+
+_patch_lock = threading.Lock()
+_original_create = None
+_original_execute_code_blocks = None
+
+# the session the hooks report to, one run at a time
+_active_session = None
+
+
+def _open_log(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _pop_matching(queue, match):
+    for i, entry in enumerate(queue):
+        if match(entry):
+            del queue[i]
+            return entry
+    return None
+
+
+class RunRecorder:
+    """Append the LLM calls and code execution results of a run to a log file.
+
+    Args:
+        path: Log file, gzip-compressed if it ends in ``.gz``.
+    """
+
+    def __init__(self, path):
+        from .. import __version__
+
+        self.path = str(path)
+        self.n_llm_calls = 0
+        self.n_code_executions = 0
+        self._lock = threading.Lock()
+        self._file = _open_log(self.path, "w")
+        self._write({"type": "header", "version": LOG_VERSION, "cmbagent_version": __version__, "created": time.time()})
+
+    def _write(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def create(self, wrapper, config):
+        agent_name = getattr(config.get("agent"), "name", None)
+        key = request_key(request_params(wrapper, config)) if wrapper._clients else None
+        start = time.perf_counter()
+        response = _original_create(wrapper, **config)
+        response_json = response_to_json(response)
+        if response_json is None:
+            # streamed or non-chat responses cannot be replayed
+            print(f"record_run: response of type {type(response).__name__} for agent {agent_name} not recorded")
+            return response
+        self._write({
+            "type": "llm",
+            "agent": agent_name,
+            "key": key,
+            "model": response.model,
+            "elapsed": round(time.perf_counter() - start, 3),
+            "response": json.loads(response_json),
+        })
+        self.n_llm_calls += 1
+        return response
+
+    def execute_code_blocks(self, executor, code_blocks):
+        result = _original_execute_code_blocks(executor, code_blocks)
+        self._write({
+            "type": "code",
+            "code_blocks": [{"code": block.code, "language": block.language} for block in code_blocks],
+            "exit_code": result.exit_code,
+            "output": result.output,
+            "code_file": getattr(result, "code_file", None),
+        })
+        self.n_code_executions += 1
+        return result
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        print(f"Recorded {self.n_llm_calls} LLM calls and {self.n_code_executions} code executions to {self.path}")
+
+
+class RunReplayer:
+    """Serve LLM responses and code execution results from a recorded log.
+
+    Args:
+        path: Log file written by ``RunRecorder``.
+        strict: Raise ``RuntimeError`` when a request differs from the recorded one
+            instead of counting it as a divergence.
+    """
+
+    def __init__(self, path, strict=False):
+        self.path = str(path)
+        self.strict = strict
+        self.divergences = []
+        self._lock = threading.Lock()
+        self._llm = defaultdict(deque)
+        self._code = deque()
+        with _open_log(self.path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["type"] == "llm":
+                    self._llm[entry["agent"]].append(entry)
+                elif entry["type"] == "code":
+                    self._code.append(entry)
+                elif entry["type"] == "header" and entry.get("version", LOG_VERSION) > LOG_VERSION:
+                    raise ValueError(f"{self.path} was written by a newer cmbagent (log version {entry['version']})")
+
+    def _diverged(self, message):
+        if self.strict:
+            raise RuntimeError(f"replay_run: {message}")
+        self.divergences.append(message)
+
+    def create(self, wrapper, config):
+        agent_name = getattr(config.get("agent"), "name", None)
+        key = request_key(request_params(wrapper, config)) if wrapper._clients else None
+        with self._lock:
+            queue = self._llm.get(agent_name)
+            if not queue:
+                raise RuntimeError(f"replay_run: no recorded LLM response left for agent {agent_name} in {self.path}")
+            # concurrent runs (parallel plan steps) interleave, look for the same request first
+            entry = _pop_matching(queue, lambda entry: entry.get("key") == key)
+            matched = entry is not None
+            if not matched:
+                entry = queue.popleft()
+        if not matched:
+            self._diverged(f"request of agent {agent_name} differs from the recorded one")
+        # nothing is paid for a replayed reply: the usage summaries are left as they are
+        return response_from_json(wrapper, json.dumps(entry["response"]))
+
+    def execute_code_blocks(self, executor, code_blocks):
+        from autogen.coding.base import CommandLineCodeResult
+
+        codes = [block.code for block in code_blocks]
+        with self._lock:
+            if not self._code:
+                raise RuntimeError(f"replay_run: no recorded code execution left in {self.path}")
+            entry = _pop_matching(self._code, lambda entry: [block["code"] for block in entry["code_blocks"]] == codes)
+            matched = entry is not None
+            if not matched:
+                entry = self._code.popleft()
+        if not matched:
+            self._diverged("executed code differs from the recorded one")
+        return CommandLineCodeResult(exit_code=entry["exit_code"], output=entry["output"], code_file=entry["code_file"])
+
+    def remaining(self):
+        """Return the number of recorded LLM calls and code executions not replayed yet."""
+        with self._lock:
+            return sum(len(queue) for queue in self._llm.values()), len(self._code)
+
+    def close(self):
+        llm_left, code_left = self.remaining()
+        if llm_left or code_left:
+            print(f"replay_run: {llm_left} LLM calls and {code_left} code executions of {self.path} were not replayed")
+        if self.divergences:
+            print(f"replay_run: {len(self.divergences)} divergences from the recording")
+
+
+def _hooked_create(self, **config):
+    session = _active_session
+    if session is None or config.get("stream"):
+        return _original_create(self, **config)
+    return session.create(self, config)
+
+
+def _hooked_execute_code_blocks(self, code_blocks):
+    session = _active_session
+    if session is None:
+        return _original_execute_code_blocks(self, code_blocks)
+    return session.execute_code_blocks(self, code_blocks)
+
+
+def install_record_replay_hooks():
+    """Patch ``OpenAIWrapper.create`` and ``LocalCommandLineCodeExecutor.execute_code_blocks`` once."""
+    global _original_create, _original_execute_code_blocks
+    # the response cache hook goes underneath, so that replay never reaches it
+    install_response_cache_hook()
+    with _patch_lock:
+        if _original_create is not None:
+            return
+        from autogen.oai.client import OpenAIWrapper
+        from autogen.coding import LocalCommandLineCodeExecutor
+        _original_create = OpenAIWrapper.create
+        _original_execute_code_blocks = LocalCommandLineCodeExecutor.execute_code_blocks
+        OpenAIWrapper.create = _hooked_create
+        LocalCommandLineCodeExecutor.execute_code_blocks = _hooked_execute_code_blocks
+
+
+@contextlib.contextmanager
+def _session(session):
+    global _active_session
+    if _active_session is not None:
+        session.close()
+        raise RuntimeError("a run is already being recorded or replayed")
+    _active_session = session
+    try:
+        yield session
+    finally:
+        _active_session = None
+        session.close()
+
+
+def record_run(path):
+    """Context manager recording the LLM calls and code executions made inside it to ``path``."""
+    install_record_replay_hooks()
+    return _session(RunRecorder(path))
+
+
+def replay_run(path, strict=False):
+    """Context manager replaying the run recorded in ``path``, without network or code execution."""
+    install_record_replay_hooks()
+    return _session(RunReplayer(path, strict=strict))
+
+
+def run_session(record=None, replay=None):
+    """Return the context manager for the ``record=``/``replay=`` arguments of a workflow.
+
+    Args:
+        record: Log file to record the run to.
+        replay: Log file to replay the run from.
+    """
+    if record and replay:
+        raise ValueError("record and replay cannot be used together")
+    if record:
+        return record_run(record)
+    if replay:
+        return replay_run(replay)
+    return contextlib.nullcontext()
+
+
+def recordable(func):
+    """Add ``record=`` and ``replay=`` keyword arguments to a workflow function."""
+
+    @functools.wraps(func)
+    def wrapper(*args, record=None, replay=None, **kwargs):
+        with run_session(record=record, replay=replay):
+            return func(*args, **kwargs)
+
+    signature = inspect.signature(func)
+    parameters = list(signature.parameters.values())
+    extra = [inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, default=None) for name in ("record", "replay")]
+    if parameters and parameters[-1].kind == inspect.Parameter.VAR_KEYWORD:
+        parameters = parameters[:-1] + extra + parameters[-1:]
+    else:
+        parameters = parameters + extra
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
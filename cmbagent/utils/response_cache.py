@@ -0,0 +1,269 @@
+"""Persistent, content-addressed cache for LLM responses.
+
+Autogen's own ``cache_seed`` cache is force-disabled in the cmbagent fork, so
+rerunning a deep_research plan or retrying a one-shot task pays again for
+identical planner, formatter and reviewer calls. ``ResponseCache`` stores chat
+completions in a SQLite file keyed by a hash of the full request: model,
+messages, tools, tool choice, response format and sampling parameters. Any
+change to the request is a miss.
+
+The cache is opt-in per agent: ``ResponseCache.attach(agent)`` marks an
+autogen agent, and a single class-level hook on ``OpenAIWrapper.create`` looks
+the marker up on every call. The hook survives autogen rebuilding
+``agent.client`` whenever tools are registered.
+
+Cache hits are not billed: they do not add to the agent's usage summary, so
+``display_cost`` only reports what was actually paid for, and the hit/miss
+counters are reported next to it.
+
+Eviction is size and age based: entries older than ``max_age_days`` are
+dropped, then the least recently used entries until the file holds at most
+``max_size_mb`` of responses.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+
+from .rate_limit import install_rate_limit_hook
+
+
+# request parameters that do not change the completion
+_IGNORED_PARAMS = ("stream", "timeout", "user", "extra_headers")
+
+_patch_lock = threading.Lock()
+_original_create = None
+
+
+def default_response_cache_path():
+    """Return the cache file location, ``$CMBAGENT_RESPONSE_CACHE`` or ``~/.cmbagent/response_cache.sqlite``."""
+    return os.environ.get(
+        "CMBAGENT_RESPONSE_CACHE",
+        os.path.join(os.path.expanduser("~"), ".cmbagent", "response_cache.sqlite"),
+    )
+
+
+def _json_default(value):
+    # response_format is usually a pydantic model class
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        return {"__schema__": value.model_json_schema()}
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def request_key(params):
+    """Return the content hash identifying a chat completion request.
+
+    Args:
+        params: The request parameters sent to the model client.
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON encoding of ``params``.
+    """
+    relevant = {key: value for key, value in params.items() if key not in _IGNORED_PARAMS}
+    encoded = json.dumps(relevant, sort_keys=True, default=_json_default, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def request_params(wrapper, config):
+    """Return the request parameters ``OpenAIWrapper.create`` sends for its first config."""
+    create_config, extra_kwargs = wrapper._separate_create_config({**config, **wrapper._config_list[0]})
+    return wrapper._construct_create_params(create_config, extra_kwargs)
+
+
+def response_to_json(response):
+    """Serialize a chat completion, or return ``None`` if it is not one."""
+    from openai.types.chat import ChatCompletion
+
+    if not isinstance(response, ChatCompletion):
+        return None
+    # drop the attributes autogen attaches to the response object
+    return response.model_dump_json(exclude={"cost", "message_retrieval_function", "config_id", "pass_filter"})
+
+
+def response_from_json(wrapper, response_json):
+    """Rebuild a chat completion that ``wrapper`` can return as if it came from its first client."""
+    from openai.types.chat import ChatCompletion
+
+    response = ChatCompletion.model_validate_json(response_json)
+    response.cost = 0
+    response.message_retrieval_function = wrapper._clients[0].message_retrieval
+    response.config_id = 0
+    response.pass_filter = True
+    return response
+
+
+class ResponseCache:
+    """SQLite-backed LLM response cache with size/age eviction and hit counters.
+
+    Args:
+        path: SQLite file. Defaults to ``default_response_cache_path()``.
+        max_size_mb: Upper bound on the stored responses, in MB.
+        max_age_days: Entries older than this are evicted.
+    """
+
+    def __init__(self, path=None, max_size_mb=512, max_age_days=30):
+        self.path = str(path or default_response_cache_path())
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self._lock = threading.RLock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._writes_since_eviction = 0
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT,"
+                " agent TEXT,"
+                " response TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.evict()
+
+    def get(self, key, agent_name=None):
+        """Return the cached response JSON for ``key`` or ``None``, updating the counters."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats[agent_name]["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._stats[agent_name]["hits"] += 1
+            return row[0]
+
+    def set(self, key, response_json, model=None, agent_name=None):
+        """Store ``response_json`` under ``key``."""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, agent, response, size, created, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, agent_name, response_json, len(response_json), now, now),
+                )
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= 100:
+                self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the size limit.
+
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock, self._conn:
+            self._writes_since_eviction = 0
+            removed = self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_seconds,)
+            ).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_size_bytes:
+                return removed
+            stale = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+                if total <= self.max_size_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            return removed + len(stale)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._stats.clear()
+
+    def stats(self):
+        """Return ``{agent_name: {"hits": int, "misses": int}}`` since creation or ``reset_stats``."""
+        with self._lock:
+            return {agent: dict(counts) for agent, counts in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def info(self):
+        """Return the number of entries and their total size in bytes."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"path": self.path, "entries": entries, "size_bytes": size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def attach(self, agent):
+        """Serve ``agent``'s (an autogen ``ConversableAgent``) LLM calls through this cache."""
+        install_response_cache_hook()
+        agent._cmbagent_response_cache = self
+
+    @staticmethod
+    def detach(agent):
+        agent.__dict__.pop("_cmbagent_response_cache", None)
+
+
+def get_response_cache(response_cache):
+    """Normalize the ``response_cache`` argument of ``CMBAgent`` and the workflows.
+
+    Args:
+        response_cache: ``None``/``False`` (disabled), ``True`` (default file),
+            a path to a SQLite file, or a ``ResponseCache``.
+
+    Returns:
+        A ``ResponseCache`` or ``None``.
+    """
+    if response_cache is None or response_cache is False:
+        return None
+    if isinstance(response_cache, ResponseCache):
+        return response_cache
+    if response_cache is True:
+        return ResponseCache()
+    return ResponseCache(path=response_cache)
+
+
+def _cached_create(self, **config):
+    agent = config.get("agent")
+    cache = getattr(agent, "_cmbagent_response_cache", None)
+    if cache is None or config.get("stream") or not self._clients:
+        return _original_create(self, **config)
+
+    key = request_key(request_params(self, config))
+    agent_name = getattr(agent, "name", None)
+
+    cached = cache.get(key, agent_name)
+    if cached is not None:
+        # nothing was paid for this reply: the usage summaries are left as they are
+        return response_from_json(self, cached)
+
+    response = _original_create(self, **config)
+    response_json = response_to_json(response)
+    if response_json is not None:
+        cache.set(key, response_json, model=response.model, agent_name=agent_name)
+    return response
+
+
+def install_response_cache_hook():
+    """Patch ``OpenAIWrapper.create`` once so that attached agents go through their cache."""
+    global _original_create
+    # the rate limiter goes underneath, so that cache hits are not rate limited
+    install_rate_limit_hook()
+    with _patch_lock:
+        if _original_create is not None:
+            return
+        from autogen.oai.client import OpenAIWrapper
+        _original_create = OpenAIWrapper.create
+        OpenAIWrapper.create = _cached_create
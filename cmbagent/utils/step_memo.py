@@ -0,0 +1,90 @@
+"""Memoization of deep_research control steps by content hash.
+
+A step is fingerprinted from everything that determines what it does: the
+task, its sub-task (text, agent and instructions), the models and limits of
+the control agents, the summaries of the steps it builds on, and the content
+of the data and codebase files present when it starts. After a successful
+step, its final context, chat history, summary and output files are saved
+under that fingerprint. A later run reaching a step with the same fingerprint
+restores them instead of running the step again, so resubmitting a lightly
+edited plan only re-executes the steps that changed (and the ones after them).
+
+Output files are kept in a ``BlobStore``, so unchanged files are stored once
+across steps and runs.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+from .blob_store import BlobStore, tree_digests, snapshot_tree, restore_tree
+
+
+# sub-task fields that define the work of a step, depends_on is covered by the summaries
+_SUB_TASK_FIELDS = ("sub_task", "sub_task_agent", "bullet_points")
+
+
+class StepMemo:
+    """Fingerprints and stored results of control steps.
+
+    Args:
+        memo_dir: Directory holding the memoized steps, usually ``<work_dir>/context/step_memo``.
+    """
+
+    def __init__(self, memo_dir):
+        self.memo_dir = str(memo_dir)
+        self.blobs = BlobStore(os.path.join(self.memo_dir, "blobs"))
+
+    def fingerprint(self, task, sub_task, settings, context, work_dir):
+        """Return the fingerprint of a step about to run in ``work_dir`` with ``context``.
+
+        Args:
+            task: The main task.
+            sub_task: The step's entry of ``final_plan.json``.
+            settings: Models and limits of the control agents (no API keys).
+            context: The shared context the step starts from.
+            work_dir: The step's work directory, whose data and codebase files are hashed.
+        """
+        payload = {
+            "task": task,
+            "sub_task": {key: sub_task.get(key) for key in _SUB_TASK_FIELDS},
+            "settings": settings,
+            "previous_steps_execution_summary": context.get("previous_steps_execution_summary", ""),
+            "inputs": tree_digests(work_dir, (context["database_path"], context["codebase_path"])),
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, fingerprint):
+        return os.path.join(self.memo_dir, f"{fingerprint}.pkl")
+
+    def load(self, fingerprint):
+        """Return the saved step for ``fingerprint``, or ``None``."""
+        path = self._entry_path(fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable step memo {path}: {e}")
+            return None
+
+    def save(self, fingerprint, work_dir, final_context, chat_history, summary):
+        """Save a successful step: its context, chat history, summary and output files."""
+        entry = {
+            "final_context": final_context,
+            "chat_history": chat_history,
+            "summary": summary,
+            "outputs": snapshot_tree(work_dir, (final_context["database_path"], final_context["codebase_path"]), self.blobs),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.memo_dir, prefix=".tmp_")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp_path, self._entry_path(fingerprint))
+
+    def restore(self, entry, work_dir):
+        """Write the output files of a saved step back into ``work_dir``."""
+        restore_tree(work_dir, entry["outputs"], self.blobs)
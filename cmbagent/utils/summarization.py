@@ -4,13 +4,28 @@ CMBAgent Summarization Utilities
 This module provides document summarization capabilities for scientific papers.
 It includes functions to summarize single or multiple markdown documents using
 specialized AI agents.
+
+Two summarization engines produce the same ``document_summary.json``:
+
+- ``"direct"`` (default): one structured-output call to the summarizer model,
+  with the schema of the ``summarizer_response_formatter`` agent, through an
+  ``OpenAIWrapper`` shared by all the documents summarized with that model.
+- ``"agents"``: a ``CMBAgent`` group chat per document, the summarizer agent
+  followed by the summarizer_response_formatter agent.
+
+With the direct engine, documents longer than ``max_chunk_chars`` are
+summarized map-reduce: ``split_markdown`` cuts them at headings and at the
+page markers of the OCR markdown, the parts are summarized in parallel, and
+a last call merges the summaries of the parts into that of the document.
 """
 
 import os
 import time
 import json
 import shutil
+import re
 import glob
+import threading
 from pathlib import Path
 from typing import Dict, Any, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -21,15 +36,45 @@ from .utils import (
     work_dir_default,
     default_agents_llm_model,
 )
-from ..cmbagent import CMBAgent
+from .manifest import ProcessingManifest
+from .cost_ledger import CostLedger, cost_ledger_path
+from .yaml import yaml_load_file_cached
+
+
+SUMMARIZATION_ENGINES = ("direct", "agents")
+
+# longest document (in characters, about 4 per token) summarized in one call
+DEFAULT_MAX_CHUNK_CHARS = 60000
+
+# the page markers written by MistralOCRProcessor._save_to_markdown, and markdown headings
+_PAGE_MARKER_PATTERN = re.compile(r"^<!-- page (\d+) -->$")
+_HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+MAP_INSTRUCTIONS = """
+You are given part {part} of {n_parts} of the document{pages}, not the whole document.
+Summarize this part only: fill in the entries that appear in it, and leave the
+others empty (empty string or empty list) rather than guessing them.
+"""
+
+REDUCE_INSTRUCTIONS = """
+You are given, as JSON, the summaries of consecutive parts of one document, in order.
+Merge them into the summary of the whole document: take the title, authors and date
+from the parts that have them, write the abstract and the key findings for the
+document as a whole, and merge the lists without duplicates.
+"""
 
+_summarizer_clients = {}
+_summarizer_clients_lock = threading.Lock()
 
-def clean_work_dir(work_dir):
-    """Clean the work directory before starting new work."""
+
+def clean_work_dir(work_dir, keep=()):
+    """Clean the work directory before starting new work, except the files and directories named in ``keep``."""
     from shutil import rmtree
     work_dir = Path(work_dir)
     if work_dir.exists():
         for item in work_dir.iterdir():
+            if item.name in keep:
+                continue
             if item.is_dir():
                 rmtree(item, ignore_errors=True)
             else:
@@ -132,11 +177,215 @@ def _parse_formatted_content(content):
     return summary_data if summary_data else None
 
 
+def _summarizer_instructions():
+    """Return the instructions of the summarizer agent, used as the system message of direct summaries."""
+    yaml_path = Path(__file__).resolve().parent.parent / "agents" / "research" / "summarizer" / "summarizer.yaml"
+    return yaml_load_file_cached(str(yaml_path))["instructions"]
+
+
+def _get_summarizer_client(summarizer_model, api_keys):
+    """Return the ``OpenAIWrapper`` shared by the direct summaries made with ``summarizer_model``."""
+    from autogen import OpenAIWrapper
+    from ..agents.research.summarizer_response_formatter.summarizer_response_formatter import SummarizerResponseFormatterAgent
+    from .rate_limit import install_rate_limit_hook
+
+    config = get_model_config(summarizer_model, api_keys)
+    key = (summarizer_model, config["api_type"], config["api_key"])
+    with _summarizer_clients_lock:
+        if key not in _summarizer_clients:
+            # the calls share the provider rate limits with the agents
+            install_rate_limit_hook()
+            _summarizer_clients[key] = OpenAIWrapper(
+                config_list=[{**config, "response_format": SummarizerResponseFormatterAgent.SummarizerResponse}],
+                cache_seed=None,
+            )
+        return _summarizer_clients[key]
+
+
+def split_markdown(markdown: str, max_chars: int = DEFAULT_MAX_CHUNK_CHARS) -> List[Dict[str, Any]]:
+    """Split a markdown document into parts of at most ``max_chars`` characters.
+
+    The document is cut before headings and page markers, and the sections are
+    packed in order into parts. Sections longer than ``max_chars`` are cut
+    between paragraphs, and paragraphs longer than that anywhere.
+
+    Returns:
+        List of ``{"text": ..., "pages": (first page, last page) or None}``.
+    """
+    if len(markdown) <= max_chars:
+        return [{"text": markdown, "pages": None}]
+
+    # sections, with the page they start on
+    sections = []
+    lines, page, section_page = [], None, None
+    for line in markdown.split("\n"):
+        marker = _PAGE_MARKER_PATTERN.match(line.strip())
+        if marker or _HEADING_PATTERN.match(line):
+            if lines:
+                sections.append(("\n".join(lines), section_page))
+            lines = []
+            if marker:
+                page = int(marker.group(1))
+            section_page = page
+        lines.append(line)
+    if lines:
+        sections.append(("\n".join(lines), section_page))
+
+    # pieces of at most max_chars, cut between paragraphs where possible, with
+    # the separator that precedes them in the document
+    pieces = []
+    for text, page in sections:
+        if len(text) <= max_chars:
+            pieces.append((text, page, "\n"))
+            continue
+        for p, paragraph in enumerate(text.split("\n\n")):
+            for i in range(0, max(len(paragraph), 1), max_chars):
+                separator = "" if i else "\n\n" if p else "\n"
+                pieces.append((paragraph[i:i + max_chars], page, separator))
+
+    chunks = []
+    for text, page, separator in pieces:
+        if chunks and len(chunks[-1]["text"]) + len(separator) + len(text) <= max_chars:
+            chunks[-1]["text"] += separator + text
+        else:
+            chunks.append({"text": text, "pages": None})
+        if page is not None:
+            first = chunks[-1]["pages"][0] if chunks[-1]["pages"] else page
+            chunks[-1]["pages"] = (first, page)
+    return chunks
+
+
+def _structured_summary(client, instructions, content):
+    """Return the structured summary of ``content`` by the summarizer model, and the response."""
+    from ..agents.research.summarizer_response_formatter.summarizer_response_formatter import SummarizerResponseFormatterAgent
+
+    response = client.create(messages=[
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": content},
+    ])
+    try:
+        message_content = response.choices[0].message.content
+        summary = SummarizerResponseFormatterAgent.SummarizerResponse.model_validate_json(message_content).model_dump()
+    except Exception:
+        # providers whose client returns the formatted markdown instead of the JSON
+        summary = _parse_formatted_content(client.extract_text_or_completion_object(response)[0] or "")
+    return summary, response
+
+
+def _reduce_summaries(client, summaries, max_chars, responses):
+    """Merge the summaries of consecutive parts of a document, in rounds if they do not fit in one call."""
+    instructions = _summarizer_instructions() + REDUCE_INSTRUCTIONS
+    summaries = [summary for summary in summaries if summary]
+    while len(summaries) > 1:
+        # groups of consecutive summaries that fit in one call, at least two
+        groups = [[]]
+        for summary in summaries:
+            if len(groups[-1]) > 1 and len(json.dumps(groups[-1] + [summary], ensure_ascii=False)) > max_chars:
+                groups.append([])
+            groups[-1].append(summary)
+        merged = []
+        for group in groups:
+            if len(group) == 1:
+                merged.extend(group)
+                continue
+            summary, response = _structured_summary(client, instructions, json.dumps(group, indent=1, ensure_ascii=False))
+            responses.append(response)
+            merged.append(summary or group[0])
+        summaries = merged
+    return summaries[0] if summaries else None
+
+
+def _summarize_direct(markdown_document, work_dir, summarizer_model, api_keys,
+                      max_chunk_chars=DEFAULT_MAX_CHUNK_CHARS, chunk_workers=4):
+    """Summarize a document with structured-output calls to the summarizer model.
+
+    A document of up to ``max_chunk_chars`` characters takes one call. A longer
+    one is summarized in parts, ``chunk_workers`` at a time, and the summaries
+    of the parts are merged. The cost of the calls is recorded in the cost
+    ledger of ``work_dir`` and in a ``cost/cost_report_*.json`` file, as
+    ``CMBAgent.display_cost`` does.
+    """
+    client = _get_summarizer_client(summarizer_model, api_keys)
+    instructions = _summarizer_instructions()
+
+    chunks = split_markdown(markdown_document, max_chunk_chars)
+    if len(chunks) == 1:
+        document_summary, response = _structured_summary(client, instructions, markdown_document)
+        responses = [response]
+    else:
+        print(f"Summarizing the document in {len(chunks)} parts")
+
+        def summarize_chunk(part):
+            chunk = chunks[part]
+            pages = f" (pages {chunk['pages'][0]}-{chunk['pages'][1]})" if chunk["pages"] else ""
+            map_instructions = instructions + MAP_INSTRUCTIONS.format(part=part + 1, n_parts=len(chunks), pages=pages)
+            return _structured_summary(client, map_instructions, chunk["text"])
+
+        with ThreadPoolExecutor(max_workers=chunk_workers) as executor:
+            summaries, responses = map(list, zip(*executor.map(summarize_chunk, range(len(chunks)))))
+        document_summary = _reduce_summaries(client, summaries, max_chunk_chars, responses)
+
+    costs = {
+        "Agent": "summarizer",
+        "Cost ($)": 0.0,
+        "Prompt Tokens": 0,
+        "Completion Tokens": 0,
+        "Total Tokens": 0,
+        "Model": summarizer_model,
+    }
+    for response in responses:
+        usage = getattr(response, "usage", None)
+        costs["Cost ($)"] += float(getattr(response, "cost", 0.0) or 0.0)
+        costs["Prompt Tokens"] += int(getattr(usage, "prompt_tokens", 0) or 0)
+        costs["Completion Tokens"] += int(getattr(usage, "completion_tokens", 0) or 0)
+        costs["Total Tokens"] += int(getattr(usage, "total_tokens", 0) or 0)
+    try:
+        report_path = os.path.join(work_dir, "cost", f"cost_report_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump([costs, {**costs, "Agent": "Total"}], f, indent=2)
+        CostLedger(cost_ledger_path(work_dir)).append({
+            "kind": "llm",
+            "agent": "summarizer",
+            "model": summarizer_model,
+            "cost_usd": costs["Cost ($)"],
+            "prompt_tokens": costs["Prompt Tokens"],
+            "completion_tokens": costs["Completion Tokens"],
+            "total_tokens": costs["Total Tokens"],
+            "calls": len(responses),
+            "report": os.path.relpath(report_path, work_dir),
+        })
+        print(f"Cost of the summary: ${costs['Cost ($)']:.6f} ({costs['Total Tokens']} tokens, {len(responses)} calls)")
+    except Exception as e:
+        print(f"Warning: Could not record the cost of the summary: {e}")
+
+    return document_summary
+
+
+def _save_document_summary(document_summary, work_dir):
+    """Save the structured summary to ``document_summary.json`` in ``work_dir`` and print it."""
+    if document_summary and work_dir:
+        try:
+            summary_file = os.path.join(work_dir, 'document_summary.json')
+            with open(summary_file, 'w', encoding='utf-8') as f:
+                json.dump(document_summary, f, indent=2, ensure_ascii=False)
+            print(f"Document summary saved to: {summary_file}")
+        except Exception as e:
+            print(f"Warning: Could not save document_summary.json: {e}")
+
+    # Pretty print the document_summary
+    if document_summary:
+        print(json.dumps(document_summary, indent=4))
+
+
 def summarize_document(markdown_document_path,
                        work_dir=work_dir_default,
                        clear_work_dir=True,
                        summarizer_model=default_agents_llm_model['summarizer'],
-                       summarizer_response_formatter_model=default_agents_llm_model['summarizer_response_formatter']):
+                       summarizer_response_formatter_model=default_agents_llm_model['summarizer_response_formatter'],
+                       engine="direct",
+                       max_chunk_chars=DEFAULT_MAX_CHUNK_CHARS,
+                       chunk_workers=4):
     """
     Summarize a single markdown document using CMBAgent summarizer agents.
 
@@ -145,11 +394,18 @@ def summarize_document(markdown_document_path,
         work_dir: Working directory for output files
         clear_work_dir: Whether to clear the working directory before starting
         summarizer_model: Model to use for the summarizer agent
-        summarizer_response_formatter_model: Model to use for the formatter agent
+        summarizer_response_formatter_model: Model to use for the formatter agent (``"agents"`` engine only)
+        engine: ``"direct"`` for one structured-output call to the summarizer model,
+            ``"agents"`` for the summarizer and formatter agents of a ``CMBAgent``
+        max_chunk_chars: Longer documents are summarized in parts of this size, then merged (``"direct"`` engine)
+        chunk_workers: Number of parts of a document summarized at once
 
     Returns:
         dict: Structured document summary with title, authors, abstract, etc.
     """
+    if engine not in SUMMARIZATION_ENGINES:
+        raise ValueError(f"Unknown summarization engine {engine!r}, expected one of {SUMMARIZATION_ENGINES}")
+
     api_keys = get_api_keys_from_env()
 
     # Load the document from the document_path to markdown file
@@ -163,10 +419,20 @@ def summarize_document(markdown_document_path,
     if clear_work_dir:
         clean_work_dir(work_dir)
 
+    if engine == "direct":
+        document_summary = _summarize_direct(markdown_document, work_dir, summarizer_model, api_keys,
+                                             max_chunk_chars=max_chunk_chars, chunk_workers=chunk_workers)
+        _save_document_summary(document_summary, work_dir)
+        return document_summary
+
+    # Import here to avoid circular dependency
+    from ..cmbagent import CMBAgent
+
     summarizer_config = get_model_config(summarizer_model, api_keys)
     summarizer_response_formatter_config = get_model_config(summarizer_response_formatter_model, api_keys)
 
     cmbagent = CMBAgent(
+        initial_agent="summarizer",
         work_dir=work_dir,
         agent_llm_configs={
             'summarizer': summarizer_config,
@@ -215,18 +481,7 @@ def summarize_document(markdown_document_path,
                 break
 
     # Save structured summary to JSON if we have it
-    if document_summary and work_dir:
-        try:
-            summary_file = os.path.join(work_dir, 'document_summary.json')
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                json.dump(document_summary, f, indent=2, ensure_ascii=False)
-            print(f"Document summary saved to: {summary_file}")
-        except Exception as e:
-            print(f"Warning: Could not save document_summary.json: {e}")
-
-    # Pretty print the document_summary
-    if document_summary:
-        print(json.dumps(document_summary, indent=4))
+    _save_document_summary(document_summary, work_dir)
 
     # Delete codebase and database folders as they are not needed
     if final_context and 'codebase_path' in final_context:
@@ -266,7 +521,9 @@ def _process_single_markdown_with_error_handling(markdown_path: str,
                                                  work_dir_base: Path,
                                                  clear_work_dir: bool,
                                                  summarizer_model: str,
-                                                 summarizer_response_formatter_model: str) -> Dict[str, Any]:
+                                                 summarizer_response_formatter_model: str,
+                                                 engine: str = "direct",
+                                                 max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS) -> Dict[str, Any]:
     """Process a single markdown file with error handling."""
     try:
         # Create indexed work directory for this document
@@ -288,7 +545,9 @@ def _process_single_markdown_with_error_handling(markdown_path: str,
             work_dir=work_dir,
             clear_work_dir=clear_work_dir,
             summarizer_model=summarizer_model,
-            summarizer_response_formatter_model=summarizer_response_formatter_model
+            summarizer_response_formatter_model=summarizer_response_formatter_model,
+            engine=engine,
+            max_chunk_chars=max_chunk_chars
         )
         end_time = time.time()
         execution_time_summarization = end_time - start_time
@@ -334,27 +593,77 @@ def _process_single_markdown_with_error_handling(markdown_path: str,
         }
 
 
+def _load_previous_summary(manifest, markdown_path, index, options):
+    """Return the result of an earlier run for an unchanged document, or None if it has to be summarized."""
+    entry = manifest.get(markdown_path)
+    if entry is None or manifest.pending_reason(markdown_path, entry.get("outputs", ()), options) is not None:
+        return None
+    try:
+        with open(os.path.join(manifest.base_dir, entry["outputs"][0]), 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError, IndexError, KeyError) as e:
+        print(f"⚠️ Could not read the previous summary of {Path(markdown_path).name} ({e}), summarizing it again")
+        return None
+    return {
+        "markdown_path": str(markdown_path),
+        "index": index,
+        "work_dir": entry.get("work_dir"),
+        "success": True,
+        "skipped": True,
+        "document_summary": summary,
+        "filename": Path(markdown_path).name,
+        "arxiv_id": entry.get("arxiv_id")
+    }
+
+
+def _record_summary(manifest, result, options):
+    """Record the outcome of summarizing a document in the manifest."""
+    summary_file = Path(result.get("work_dir") or manifest.base_dir) / "document_summary.json"
+    if result.get("success") and summary_file.exists():
+        status, outputs, error = "done", [os.path.relpath(summary_file, manifest.base_dir)], None
+    else:
+        status, outputs, error = "failed", [], result.get("error", "no summary produced")
+    try:
+        manifest.record(result["markdown_path"], status, outputs=outputs, options=options, error=error,
+                        work_dir=result.get("work_dir"), arxiv_id=result.get("arxiv_id"))
+    except Exception as e:
+        print(f"⚠️ Warning: Could not update {manifest.path}: {e}")
+
+
 def summarize_documents(folder_path,
                        work_dir_base=work_dir_default,
                        clear_work_dir=True,
                        summarizer_model=default_agents_llm_model['summarizer'],
                        summarizer_response_formatter_model=default_agents_llm_model['summarizer_response_formatter'],
                        max_workers=4,
-                       max_depth=10):
+                       max_depth=10,
+                       incremental=True,
+                       engine="direct",
+                       max_chunk_chars=DEFAULT_MAX_CHUNK_CHARS):
     """
     Process multiple markdown documents in parallel, summarizing each one.
 
+    Each document summarized is recorded in ``summary_manifest.json`` in
+    ``work_dir_base`` (see ``cmbagent.utils.manifest``). With ``incremental``
+    a re-run only summarizes the new, changed and failed documents; the
+    summaries of the others are read back from their work directories, which
+    ``clear_work_dir`` keeps along with the manifest.
+
     Args:
         folder_path (str): Path to folder containing markdown files
         work_dir_base (str): Base working directory for output
-        clear_work_dir (bool): Whether to clear the working directory
+        clear_work_dir (bool): Whether to clear the working directory, except what ``incremental`` reuses
         summarizer_model: Model to use for summarizer agent
         summarizer_response_formatter_model: Model to use for formatter agent
         max_workers (int): Maximum number of parallel workers
         max_depth (int): Maximum depth for recursive file search
+        incremental (bool): Skip the documents summarized by an earlier run, according to the manifest
+        engine (str): Summarization engine, ``"direct"`` or ``"agents"`` (see ``summarize_document``)
+        max_chunk_chars (int): Longer documents are summarized in parts of this size, then merged
 
     Returns:
-        Dict: Summary of processing results including individual document summaries
+        Dict: Summary of processing results including individual document summaries,
+        ``skipped_files`` counting the documents left out
     """
     folder_path = Path(folder_path).resolve()
 
@@ -375,6 +684,7 @@ def summarize_documents(folder_path,
         return {
             "processed_files": 0,
             "failed_files": 0,
+            "skipped_files": 0,
             "total_files": 0,
             "results": [],
             "folder_path": str(folder_path),
@@ -391,6 +701,7 @@ def summarize_documents(folder_path,
     results = {
         "processed_files": 0,
         "failed_files": 0,
+        "skipped_files": 0,
         "total_files": len(markdown_files),
         "results": [],
         "folder_path": str(folder_path),
@@ -399,8 +710,28 @@ def summarize_documents(folder_path,
 
     start_time = time.time()
 
+    # Reuse the summaries of the documents unchanged since an earlier run
+    manifest = ProcessingManifest(work_dir_base / "summary_manifest.json")
+    options = {
+        "summarizer_model": summarizer_model,
+        "summarizer_response_formatter_model": summarizer_response_formatter_model,
+        "engine": engine,
+        "max_chunk_chars": max_chunk_chars,
+    }
+    pending = []
+    for i, markdown_path in enumerate(markdown_files):
+        skipped = _load_previous_summary(manifest, markdown_path, i + 1, options) if incremental else None
+        if skipped is None:
+            pending.append((i, markdown_path))
+        else:
+            results["skipped_files"] += 1
+            results["results"].append(skipped)
+    if results["skipped_files"]:
+        print(f"⏭️ Skipping {results['skipped_files']} documents summarized by an earlier run (see {manifest.path})")
+
     if clear_work_dir:
-        clean_work_dir(work_dir_base)
+        keep = {Path(manifest.path).name} | {Path(result["work_dir"]).name for result in results["results"] if result.get("work_dir")}
+        clean_work_dir(work_dir_base, keep=keep)
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Submit all tasks
@@ -412,8 +743,10 @@ def summarize_documents(folder_path,
                 work_dir_base,
                 clear_work_dir,
                 summarizer_model,
-                summarizer_response_formatter_model
-            ): (markdown_path, i + 1) for i, markdown_path in enumerate(markdown_files)
+                summarizer_response_formatter_model,
+                engine,
+                max_chunk_chars
+            ): (markdown_path, i + 1) for i, markdown_path in pending
         }
 
         # Process completed tasks
@@ -431,14 +764,16 @@ def summarize_documents(folder_path,
 
                 results["results"].append(result)
             except Exception as e:
-                results["failed_files"] += 1
-                print(f"✗ Failed [{index:02d}]: {Path(markdown_path).name} - {str(e)}")
-                results["results"].append({
+                result = {
                     "markdown_path": str(markdown_path),
                     "index": index,
                     "success": False,
                     "error": str(e)
-                })
+                }
+                results["failed_files"] += 1
+                print(f"✗ Failed [{index:02d}]: {Path(markdown_path).name} - {str(e)}")
+                results["results"].append(result)
+            _record_summary(manifest, result, options)
 
     end_time = time.time()
     total_time = end_time - start_time
@@ -446,6 +781,7 @@ def summarize_documents(folder_path,
     print(f"\n📋 Processing complete:")
     print(f"  Successfully processed: {results['processed_files']} files")
     print(f"  Failed: {results['failed_files']} files")
+    print(f"  Skipped (unchanged since an earlier run): {results['skipped_files']} files")
     print(f"  Total time: {total_time:.2f} seconds")
     print(f"  Output directory: {results['work_dir_base']}")
 
@@ -473,7 +809,9 @@ def preprocess_task(text: str,
                    summarizer_response_formatter_model: str = default_agents_llm_model['summarizer_response_formatter'],
                    skip_arxiv_download: bool = False,
                    skip_ocr: bool = False,
-                   skip_summarization: bool = False) -> str:
+                   skip_summarization: bool = False,
+                   summarization_engine: str = "direct",
+                   incremental: bool = True) -> str:
     """
     Preprocess a task description by:
     1. Extracting arXiv URLs and downloading PDFs
@@ -484,7 +822,8 @@ def preprocess_task(text: str,
     Args:
         text: The input task description text containing arXiv URLs
         work_dir: Working directory for processing files
-        clear_work_dir: Whether to clear the work directory before starting
+        clear_work_dir: Whether to clear the work directory before starting, except the
+            summaries reused by ``incremental``
         max_workers: Number of parallel workers for processing
         max_depth: Maximum directory depth for file searching
         summarizer_model: Model to use for summarizer agent
@@ -492,6 +831,9 @@ def preprocess_task(text: str,
         skip_arxiv_download: Skip the arXiv download step
         skip_ocr: Skip the OCR step
         skip_summarization: Skip the summarization step
+        summarization_engine: ``"direct"`` or ``"agents"``, see ``summarize_document``
+        incremental: Reuse the summaries of the papers unchanged since an earlier run (see
+            ``summarize_documents``); their OCR is served from the OCR cache
 
     Returns:
         str: The original text with appended "Contextual Information and References" section
@@ -503,7 +845,8 @@ def preprocess_task(text: str,
     print(f"📁 Work directory: {work_dir}")
 
     if clear_work_dir:
-        clean_work_dir(work_dir)
+        # summarize_documents clears the summaries of the papers no longer in the task
+        clean_work_dir(work_dir, keep=("summaries",) if incremental else ())
 
     # Step 1: Extract arXiv URLs and download PDFs
     arxiv_results = None
@@ -542,7 +885,9 @@ def preprocess_task(text: str,
                 work_dir=work_dir
             )
             print(f"✅ OCR processed {ocr_results.get('processed_files', 0)} files")
-            if ocr_results.get('processed_files', 0) == 0:
+            if ocr_results.get('skipped_files', 0):
+                print(f"📋 {ocr_results['skipped_files']} files unchanged since an earlier run")
+            if ocr_results.get('processed_files', 0) + ocr_results.get('skipped_files', 0) == 0:
                 print("ℹ️ No PDF files found for OCR, returning original text")
                 return text
         except Exception as e:
@@ -569,11 +914,15 @@ def preprocess_task(text: str,
                 max_workers=max_workers,
                 max_depth=max_depth,
                 summarizer_model=summarizer_model,
-                summarizer_response_formatter_model=summarizer_response_formatter_model
+                summarizer_response_formatter_model=summarizer_response_formatter_model,
+                engine=summarization_engine,
+                incremental=incremental
             )
             print(f"✅ Summarized {summary_results.get('processed_files', 0)} documents")
+            if summary_results.get('skipped_files', 0):
+                print(f"📋 Reused {summary_results['skipped_files']} summaries from an earlier run")
 
-            if summary_results.get('processed_files', 0) == 0:
+            if summary_results.get('processed_files', 0) + summary_results.get('skipped_files', 0) == 0:
                 print("ℹ️ No documents were summarized, returning original text")
                 return text
 
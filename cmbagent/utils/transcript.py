@@ -0,0 +1,205 @@
+"""Streaming, append-only chat transcripts.
+
+Chat histories are otherwise only written to disk once a chat is over. While a
+``transcript_session(path)`` is active, every message appended to a group chat
+(the main chat and the nested ones) is also appended to a JSON-lines
+transcript as it is produced, so a run that crashes after many rounds still
+leaves its conversation on disk. Each line is written to the file as soon as
+its message is appended, so readers see it right away; only the fsyncs are
+batched, to keep the overhead per message low.
+
+Each line is one message::
+
+    {"index": 3, "time": 1718000000.0, "name": "engineer", "role": "user",
+     "content": "...", "tool_calls": [...]}
+
+The reader functions stream a transcript without loading it all, filter it by
+agent, return its last messages, or follow it while it is being written (for
+the backend and UI)::
+
+    for message in follow_transcript("chats/transcript_step_1.jsonl", agents=["engineer"]):
+        print(message["content"])
+"""
+
+import os
+import json
+import time
+import threading
+import contextlib
+from collections import deque
+
+
+_patch_lock = threading.Lock()
+_original_append = None
+
+# transcripts are per thread, so that concurrent plan steps each write their own
+_local = threading.local()
+
+# message fields kept in the transcript besides name, role and content
+_EXTRA_FIELDS = ("tool_calls", "tool_responses", "tool_call_id", "function_call")
+
+
+class TranscriptWriter:
+    """Append chat messages to a JSON-lines file, fsync'd in batches.
+
+    Args:
+        path: Transcript file, appended to if it exists, the message indices continuing from its last one.
+        batch_size: Number of messages written between two fsyncs.
+        flush_interval: Seconds after which the written messages are fsync'd anyway.
+    """
+
+    def __init__(self, path, batch_size=8, flush_interval=2.0):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.first_index = 0
+        if os.path.exists(self.path):
+            for record in read_transcript(self.path):
+                self.first_index = record.get("index", self.first_index - 1) + 1
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() > 0 and not _ends_with_newline(self.path):
+            # a line cut short by a crash: keep it on its own
+            self._file.write("\n")
+        self._unsynced = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.n_messages = 0
+
+    def append(self, message, name=None):
+        """Add ``message`` (an AG2 message dict) sent by ``name`` to the transcript."""
+        record = {
+            "index": None,
+            "time": time.time(),
+            "name": name or message.get("name"),
+            "role": message.get("role"),
+            "content": message.get("content"),
+        }
+        for field in _EXTRA_FIELDS:
+            if message.get(field):
+                record[field] = message[field]
+        with self._lock:
+            record["index"] = self.first_index + self.n_messages
+            self.n_messages += 1
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Fsync the messages written since the last fsync."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+                self._file.close()
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _hooked_append(self, message, speaker):
+    _original_append(self, message, speaker)
+    for writer in getattr(_local, "writers", ()):
+        try:
+            writer.append(message, name=getattr(speaker, "name", None))
+        except Exception as e:
+            print(f"Could not write to transcript {writer.path}: {e}")
+
+
+def install_transcript_hook():
+    """Patch ``GroupChat.append`` once so that active transcripts see every message."""
+    global _original_append
+    with _patch_lock:
+        if _original_append is not None:
+            return
+        from autogen.agentchat.groupchat import GroupChat
+        _original_append = GroupChat.append
+        GroupChat.append = _hooked_append
+
+
+@contextlib.contextmanager
+def transcript_session(path, batch_size=8, flush_interval=2.0):
+    """Context manager writing the group chat messages of this thread to ``path``."""
+    install_transcript_hook()
+    writer = TranscriptWriter(path, batch_size=batch_size, flush_interval=flush_interval)
+    if not hasattr(_local, "writers"):
+        _local.writers = []
+    _local.writers.append(writer)
+    try:
+        yield writer
+    finally:
+        _local.writers.remove(writer)
+        writer.close()
+
+
+def _parse_lines(lines, agents):
+    for line in lines:
+        if not line.endswith("\n"):
+            # a line being written, or cut short by a crash
+            return
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if agents is None or record.get("name") in agents:
+            yield record
+
+
+def read_transcript(path, agents=None):
+    """Yield the messages of a transcript one by one.
+
+    Args:
+        path: Transcript file.
+        agents: If given, only yield the messages of these agents.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        yield from _parse_lines(f, agents)
+
+
+def tail_transcript(path, n=20, agents=None):
+    """Return the last ``n`` messages of a transcript (of ``agents`` if given)."""
+    return list(deque(read_transcript(path, agents=agents), maxlen=n))
+
+
+def follow_transcript(path, agents=None, poll_interval=0.5, stop=None):
+    """Yield the messages of a transcript, then the new ones as they are written.
+
+    Args:
+        path: Transcript file, which may not exist yet.
+        agents: If given, only yield the messages of these agents.
+        poll_interval: Seconds between checks for new messages.
+        stop: Optional ``threading.Event``; following ends once it is set and
+            the messages written so far have been yielded.
+    """
+    while not os.path.exists(path):
+        if stop is not None and stop.is_set():
+            return
+        time.sleep(poll_interval)
+    with open(path, "r", encoding="utf-8") as f:
+        pending = ""
+        while True:
+            chunk = f.read()
+            if chunk:
+                pending += chunk
+                lines = pending.splitlines(keepends=True)
+                pending = lines.pop() if not lines[-1].endswith("\n") else ""
+                yield from _parse_lines(lines, agents)
+                continue
+            if stop is not None and stop.is_set():
+                return
+            time.sleep(poll_interval)
@@ -1,16 +1,17 @@
 # cmbagent/utils.py
 import os
-import autogen
 import pickle
 import logging
+import functools
 from ruamel.yaml import YAML
-from autogen.cmbagent_utils import cmbagent_debug
 from pathlib import Path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='[%(name)s] %(message)s')
 
-cmbagent_debug = autogen.cmbagent_debug
+# Same switches as autogen.cmbagent_utils, read from the environment directly so that
+# importing cmbagent.utils does not import autogen.
+cmbagent_debug = os.getenv("CMBAGENT_DEBUG", "False").lower() == "true"
 
 
 
@@ -103,7 +104,7 @@ In attendance are:
 # default_file_search_max_num_results = 20
 # The default is 20 for `gpt-4*` models and 5 for `gpt-3.5-turbo`. This number
 # should be between 1 and 50 inclusive.
-file_search_max_num_results = autogen.file_search_max_num_results
+file_search_max_num_results = 20
 
 default_max_round = 50
 
@@ -232,12 +233,34 @@ def aas_keyword_to_url(keyword):
 # Keywords are in the utils/keywords directory
 keywords_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keywords')
 
-with open(os.path.join(keywords_dir, 'aas_kwd_to_url.pkl'), 'rb') as file:
-    AAS_keywords_dict = pickle.load(file)
 
-# print(my_dict)
-# Assuming you have already loaded your dictionary into `my_dict`
-AAS_keywords_string = ', '.join(AAS_keywords_dict.keys())
+
+@functools.lru_cache(maxsize=None)
+def get_aas_keywords_dict():
+    """
+    Return the AAS keyword -> IAU Thesaurus URL dictionary.
+
+    The pickle is only loaded the first time it is needed (e.g. by the aas_keyword_finder),
+    not when cmbagent is imported.
+    """
+    with open(os.path.join(keywords_dir, 'aas_kwd_to_url.pkl'), 'rb') as file:
+        return pickle.load(file)
+
+
+@functools.lru_cache(maxsize=None)
+def get_aas_keywords_string():
+    """Return all AAS keywords as a comma separated string."""
+    return ', '.join(get_aas_keywords_dict().keys())
+
+
+def __getattr__(name):
+    # AAS_keywords_dict and AAS_keywords_string used to be built at import time
+    # and are still available as module attributes, loaded on first access.
+    if name == 'AAS_keywords_dict':
+        return get_aas_keywords_dict()
+    if name == 'AAS_keywords_string':
+        return get_aas_keywords_string()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 unesco_taxonomy_path = os.path.join(keywords_dir, 'unesco_hierarchical.json')
 aaai_keywords_path = os.path.join(keywords_dir, 'aaai.md')
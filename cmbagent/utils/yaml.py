@@ -13,6 +13,8 @@ Customization of YAML's loaded and dumper:
 
 import os
 import re
+import copy
+import threading
 from collections.abc import Mapping
 from typing import Any
 
@@ -101,6 +103,8 @@ ScientificLoader.add_implicit_resolver(
 class DefaultsLoader(ScientificLoader):
     current_folder: str | None = None
     yaml_root_name: str | None = None
+    # files pulled in through '!defaults' while loading, used to validate cached results
+    dependencies: list[str] | None = None
 
 
 def _construct_defaults(loader, node):
@@ -126,6 +130,8 @@ def _construct_defaults(loader, node):
                 "Mentioned non-existent defaults file '%s', "
                 "searched for in folder '%s'." % (dfile, folder)
             )
+        if loader.dependencies is not None:
+            loader.dependencies.append(dfilename)
         this_loaded_defaults = yaml_load_file(dfilename)
         loaded_defaults = recursive_update(loaded_defaults, this_loaded_defaults)
     loader.current_folder = folder
@@ -173,16 +179,32 @@ DefaultsLoader.add_implicit_resolver("!path", path_matcher, None)
 DefaultsLoader.add_constructor("!path", path_constructor)
 
 
-def yaml_load(text_stream, file_name=None) -> dict[str, Any]:
+if getattr(yaml, "CLoader", None) is not None:
+    # Same loader on top of the libyaml parser. Only scanning/parsing is done in C;
+    # resolvers and constructors are the Python ones above, so results are identical.
+
+    class CDefaultsLoader(yaml.CLoader):
+        current_folder: str | None = None
+        yaml_root_name: str | None = None
+        dependencies: list[str] | None = None
+
+    CDefaultsLoader.yaml_implicit_resolvers = copy.deepcopy(DefaultsLoader.yaml_implicit_resolvers)
+    CDefaultsLoader.yaml_constructors = dict(DefaultsLoader.yaml_constructors)
+else:  # PyYAML built without libyaml
+    CDefaultsLoader = None
+
+
+def yaml_load(text_stream, file_name=None, loader=None) -> dict[str, Any]:
     errstr = "Error in your input file " + ("'" + file_name + "'" if file_name else "")
+    loader = loader or DefaultsLoader
     try:
         # set current_folder to store the file name, to be used to locate relative
         # defaults files
-        DefaultsLoader.current_folder = os.path.dirname(file_name) if file_name else None
-        DefaultsLoader.yaml_root_name = (
+        loader.current_folder = os.path.dirname(file_name) if file_name else None
+        loader.yaml_root_name = (
             os.path.splitext(os.path.basename(file_name))[0] if file_name else None
         )
-        return yaml.load(text_stream, DefaultsLoader)
+        return yaml.load(text_stream, loader)
     # Redefining the general exception to give more user-friendly information
     except yaml.constructor.ConstructorError as e:
         raise InputImportError(errstr + ":\n" + str(e))
@@ -244,6 +266,65 @@ def yaml_load_file(file_name: str | None, yaml_text: str | None = None) -> dict[
     return yaml_load(yaml_text, file_name=file_name)
 
 
+# Cached loading #########################################################################
+
+_yaml_cache: dict[str, dict[str, Any]] = {}
+_yaml_cache_lock = threading.RLock()
+
+
+def _file_stamp(file_name: str) -> tuple[int, int]:
+    stat = os.stat(file_name)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def yaml_load_file_cached(file_name: str, use_c_loader: bool = True) -> dict[str, Any]:
+    """Load a yaml file, parsing it only once per process while it is unchanged.
+
+    Parsed results are cached by absolute path and validated against the
+    modification time and size of the file and of any '!defaults' files it
+    pulled in. Every call returns a fresh deep copy, so callers may modify
+    the result without affecting the cache or each other.
+
+    If ``use_c_loader`` is True and PyYAML was built with libyaml, the file is
+    parsed with the C-accelerated loader.
+    """
+    path = os.path.abspath(file_name)
+    with _yaml_cache_lock:
+        entry = _yaml_cache.get(path)
+        if entry is not None:
+            try:
+                fresh = all(_file_stamp(f) == stamp for f, stamp in entry["stamps"])
+            except OSError:
+                fresh = False
+            if not fresh:
+                entry = None
+
+        if entry is None:
+            loader = CDefaultsLoader if use_c_loader and CDefaultsLoader is not None else DefaultsLoader
+            stamp = _file_stamp(path)
+            with open(path, encoding="utf-8-sig") as file:
+                yaml_text = file.read()
+            loader.dependencies = []
+            try:
+                data = yaml_load(yaml_text, file_name=path, loader=loader)
+                dependencies = loader.dependencies
+            finally:
+                loader.dependencies = None
+            entry = {
+                "stamps": [(path, stamp)] + [(f, _file_stamp(f)) for f in dependencies],
+                "data": data,
+            }
+            _yaml_cache[path] = entry
+
+        return copy.deepcopy(entry["data"])
+
+
+def clear_yaml_cache() -> None:
+    """Drop all cached yaml files."""
+    with _yaml_cache_lock:
+        _yaml_cache.clear()
+
+
 # Custom dumper ##########################################################################
 
 
@@ -7,6 +7,7 @@ This package contains different execution workflows for CMBAgent:
 - planning_and_control: Legacy planning and control workflow (deprecated, use deep_research)
 - keywords: Keyword extraction using various taxonomies (UNESCO, AAAI, AAS)
 - control: Control-only execution
+- batch: Many one_shot / deep_research tasks run concurrently in worker processes
 """
 
 from .one_shot import one_shot
@@ -15,6 +16,7 @@ from .human_in_the_loop import human_in_the_loop
 from .planning_and_control import planning_and_control
 from .keywords import get_keywords, get_keywords_from_aaai, get_keywords_from_string, get_aas_keywords
 from .control import control, load_plan
+from .batch import run_batch, load_batch_tasks
 
 __all__ = [
     'one_shot',
@@ -23,6 +25,8 @@ __all__ = [
     'planning_and_control',
     'control',
     'load_plan',
+    'run_batch',
+    'load_batch_tasks',
     'get_keywords',
     'get_keywords_from_aaai',
     'get_keywords_from_string',
@@ -0,0 +1,224 @@
+"""Batch runner for many one_shot / deep_research tasks.
+
+Tasks are read from a JSON-lines file, one task per line::
+
+    {"id": "sum", "task": "Compute the sum of 1 to 10 with numpy.", "workflow": "one_shot", "agent": "engineer"}
+    {"id": "cmb", "task": "Plot the CMB power spectrum.", "workflow": "deep_research", "max_plan_steps": 3}
+
+Every key other than ``id``, ``task`` and ``workflow`` is passed to the
+workflow function. The tasks run concurrently in worker processes (one fresh
+process per task), each in its own work directory ``<work_dir>/tasks/<id>``
+with its output in ``batch.log`` there. All workers use the same persistent
+LLM response cache and draw from the same provider rate limits, kept in
+``<work_dir>/rate_limits.sqlite`` (see ``cmbagent.utils.rate_limit``), and
+record their costs in the batch ledger ``<work_dir>/cost_ledger.jsonl``, each
+entry tagged with its task id, so that the cost of the batch so far can be
+queried while it runs::
+
+    CostLedger(cost_ledger_path(work_dir)).totals(by="task")
+
+Progress is appended to ``<work_dir>/batch_state.jsonl`` as tasks finish.
+Running the same batch again (e.g. after a crash) skips the tasks that
+already succeeded.
+"""
+
+import os
+import sys
+import json
+import time
+import traceback
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ..utils import work_dir_default
+from ..utils.cost_ledger import LEDGER_FILENAME, CostLedger, cost_totals
+
+
+BATCH_WORKFLOWS = ("one_shot", "deep_research")
+
+
+def load_batch_tasks(path):
+    """Read the tasks of a batch from a JSON-lines file.
+
+    Parameters
+    ----------
+    path : str or Path
+        JSON-lines file with one task per line, blank lines and lines starting with ``#`` are skipped
+
+    Returns
+    -------
+    list of dict
+        The tasks, each with an ``id`` (``task_<line number>`` if not given)
+    """
+    tasks = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)
+            if "task" not in entry:
+                raise ValueError(f"{path}:{line_number}: missing 'task'")
+            entry.setdefault("id", f"task_{line_number:04d}")
+            tasks.append(entry)
+    ids = [entry["id"] for entry in tasks]
+    duplicates = sorted({task_id for task_id in ids if ids.count(task_id) > 1})
+    if duplicates:
+        raise ValueError(f"{path}: duplicate task ids {duplicates}")
+    return tasks
+
+
+def load_batch_state(work_dir):
+    """Return ``{task id: latest state}`` from ``<work_dir>/batch_state.jsonl``."""
+    state = {}
+    path = os.path.join(work_dir, "batch_state.jsonl")
+    if not os.path.exists(path):
+        return state
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # last line cut short by a crash
+                continue
+            state[entry["id"]] = entry
+    return state
+
+
+def task_cost(work_dir, task_id=None, since=None):
+    """Sum the costs recorded in the cost ledgers under ``work_dir``, of the batch task ``task_id`` and after ``since`` if given."""
+    try:
+        return cost_totals(work_dir, since=since, task=task_id)["cost_usd"]
+    except OSError:
+        return 0.0
+
+
+def _batch_task_cost(cost_ledger, task_id, since):
+    try:
+        return CostLedger(cost_ledger).totals(task=task_id, since=since)["cost_usd"]
+    except OSError:
+        return 0.0
+
+
+def _run_batch_task(entry, task_dir, defaults, rate_limit_state, cost_ledger):
+    # runs in a worker process, with stdout and stderr sent to the task's log
+    from .. import workflows
+    from ..utils.rate_limit import get_rate_limiter
+
+    # the workers queue up for the provider quotas together, and record their costs in the batch ledger
+    get_rate_limiter().share(rate_limit_state)
+    os.environ["CMBAGENT_COST_LEDGER"] = cost_ledger
+    os.environ["CMBAGENT_TASK_ID"] = entry["id"]
+
+    os.makedirs(task_dir, exist_ok=True)
+    start = time.time()
+    kwargs = {**defaults, **{key: value for key, value in entry.items() if key not in ("id", "task", "workflow")}}
+    workflow = entry.get("workflow", "one_shot")
+    with open(os.path.join(task_dir, "batch.log"), "a", buffering=1) as log:
+        sys.stdout = sys.stderr = log
+        try:
+            getattr(workflows, workflow)(entry["task"], work_dir=task_dir, **kwargs)
+            status, error = "done", None
+        except Exception:
+            status, error = "failed", traceback.format_exc()
+            print(error)
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    return {"status": status, "error": error, "elapsed": time.time() - start,
+            "cost": _batch_task_cost(cost_ledger, entry["id"], start)}
+
+
+def run_batch(tasks, work_dir=work_dir_default, max_workers=None, response_cache=True, resume=True, **kwargs):
+    """Run many one_shot / deep_research tasks concurrently in worker processes.
+
+    Parameters
+    ----------
+    tasks : str, Path or list of dict
+        JSON-lines file of tasks (see ``load_batch_tasks``) or the list of tasks
+    work_dir : str or Path, optional
+        Directory of the batch, each task runs in ``work_dir/tasks/<id>``
+    max_workers : int, optional
+        Number of tasks run at once, by default the number of CPUs
+    response_cache : bool or str, optional
+        LLM response cache shared by all workers: True for the default SQLite
+        file, a path, or False to disable it, by default True
+    resume : bool, optional
+        Skip the tasks that already succeeded in an earlier run of this batch, by default True
+    **kwargs
+        Default keyword arguments of the workflow functions, overridden by the task entries
+
+    Returns
+    -------
+    dict
+        ``{task id: state}`` with the status (``done``, ``failed`` or
+        ``skipped``), elapsed seconds, cost and error of each task
+    """
+    from ..utils.response_cache import default_response_cache_path
+
+    if isinstance(tasks, (str, Path)):
+        tasks = load_batch_tasks(tasks)
+    for entry in tasks:
+        if entry.get("workflow", "one_shot") not in BATCH_WORKFLOWS:
+            raise ValueError(f"task {entry['id']}: unknown workflow {entry['workflow']!r}, expected one of {BATCH_WORKFLOWS}")
+    work_dir = str(Path(work_dir).expanduser().resolve())
+    os.makedirs(os.path.join(work_dir, "tasks"), exist_ok=True)
+
+    if response_cache is True:
+        response_cache = default_response_cache_path()
+    defaults = {**kwargs, "response_cache": response_cache or None}
+
+    previous = load_batch_state(work_dir) if resume else {}
+    results = {}
+    pending = []
+    for entry in tasks:
+        if previous.get(entry["id"], {}).get("status") == "done":
+            results[entry["id"]] = {**previous[entry["id"]], "status": "skipped"}
+        else:
+            pending.append(entry)
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(pending) or 1))
+    print(f"Batch: {len(tasks)} tasks, {len(results)} already done, running {len(pending)} with {max_workers} workers")
+    print(f"Batch state: {os.path.join(work_dir, 'batch_state.jsonl')}")
+
+    rate_limit_state = os.path.join(work_dir, "rate_limits.sqlite")
+    cost_ledger = os.path.join(work_dir, LEDGER_FILENAME)
+    print(f"Batch costs: {cost_ledger}")
+    start = time.time()
+    n_done = n_failed = 0
+    total_cost = 0.0
+    # a fresh process per task, so that no state leaks between tasks
+    context = multiprocessing.get_context("spawn")
+    with open(os.path.join(work_dir, "batch_state.jsonl"), "a", encoding="utf-8") as state_file, \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=context, max_tasks_per_child=1) as executor:
+        futures = {}
+        for entry in pending:
+            task_dir = os.path.join(work_dir, "tasks", entry["id"])
+            futures[executor.submit(_run_batch_task, entry, task_dir, defaults, rate_limit_state, cost_ledger)] = (entry, task_dir)
+
+        for future in as_completed(futures):
+            entry, task_dir = futures[future]
+            try:
+                state = future.result()
+            except Exception as e:
+                # the worker process died
+                state = {"status": "failed", "error": repr(e), "elapsed": None, "cost": _batch_task_cost(cost_ledger, entry["id"], start)}
+            state = {"id": entry["id"], "work_dir": task_dir, "time": time.time(), **state}
+            state_file.write(json.dumps(state) + "\n")
+            state_file.flush()
+            os.fsync(state_file.fileno())
+            results[entry["id"]] = state
+
+            n_done += state["status"] == "done"
+            n_failed += state["status"] == "failed"
+            total_cost += state["cost"]
+            elapsed = f"{state['elapsed']:.1f} s" if state["elapsed"] is not None else "-"
+            print(f"[{n_done + n_failed}/{len(pending)}] {entry['id']}: {state['status']} "
+                  f"({elapsed}, ${state['cost']:.4f})" + (f", see {task_dir}/batch.log" if state["status"] == "failed" else ""))
+
+    wall_time = time.time() - start
+    print(f"\nBatch finished in {wall_time:.1f} s: {n_done} done, {n_failed} failed, "
+          f"{len(tasks) - len(pending)} skipped, cost ${total_cost:.4f}")
+    if pending and wall_time > 0:
+        print(f"Throughput: {len(pending) / wall_time * 3600:.1f} tasks/hour")
+    return results
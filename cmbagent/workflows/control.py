@@ -20,6 +20,7 @@ from ..utils import (
     get_model_config,
     get_api_keys_from_env
 )
+from ..utils.record_replay import recordable
 
 
 def load_plan(plan_path):
@@ -48,6 +49,7 @@ def load_plan(plan_path):
     return plan_dict
 
 
+@recordable
 def control(
     task,
     plan=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'plans', 'idea_plan.json'),
@@ -68,6 +70,7 @@ def control(
     work_dir=work_dir_default,
     clear_work_dir=True,
     api_keys=None,
+    response_cache=None,
 ):
     """Execute a task using a pre-existing plan from a JSON file.
 
@@ -116,6 +119,14 @@ def control(
         Whether to clear the work directory before execution, by default True
     api_keys : dict, optional
         API keys for model providers, by default fetched from environment
+    response_cache : bool, str or ResponseCache, optional
+        Persistent LLM response cache shared by all agents, see ``CMBAgent``, by default None
+    record : str, optional
+        Write every LLM response and code execution result of the run to this
+        log file (gzip-compressed for ``.gz``), see ``record_run``, by default None
+    replay : str, optional
+        Re-run deterministically from a log written with ``record``, without
+        network access or code execution, by default None
 
     Returns
     -------
@@ -184,6 +195,7 @@ def control(
 
     start_time = time.time()
     cmbagent = CMBAgent(
+        initial_agent="controller",
         work_dir=control_dir,
         agent_llm_configs={
             'engineer': engineer_config,
@@ -192,7 +204,8 @@ def control(
             'idea_hater': idea_hater_config,
         },
         clear_work_dir=clear_work_dir,
-        api_keys=api_keys
+        api_keys=api_keys,
+        response_cache=response_cache,
     )
 
     end_time = time.time()
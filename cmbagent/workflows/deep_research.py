@@ -11,7 +11,9 @@ import time
 import copy
 import datetime
 import pickle
+import shutil
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from ..agents.planning.planner_response_formatter.planner_response_formatter import save_final_plan
 from ..utils import (
@@ -20,27 +22,46 @@ from ..utils import (
     default_formatter_model as default_formatter_model_default,
     default_agents_llm_model,
     get_model_config,
-    get_api_keys_from_env
+    get_api_keys_from_env,
+    get_response_cache
 )
+from ..utils.record_replay import recordable
+from ..utils.step_memo import StepMemo
+from ..utils.checkpoints import save_checkpoint, load_checkpoint
 from ..context import shared_context as shared_context_default
 
 
-def load_context(context_path):
-    """Load context from a pickle file.
+def load_context(context_path, keys=None):
+    """Load a context checkpoint.
+
+    Reads the incremental checkpoints written by ``_save_context_checkpoint``
+    (``context_step_N.ckpt``) as well as the full pickles of earlier versions
+    (``context_step_N.pkl``). If ``context_path`` does not exist, the other
+    format with the same name is tried.
 
     Parameters
     ----------
     context_path : str
-        Path to the pickle file containing the context
+        Path to the checkpoint file containing the context
+    keys : list of str, optional
+        Only load these entries of the context, without reading the others
 
     Returns
     -------
     dict
         The loaded context dictionary
     """
-    with open(context_path, 'rb') as f:
-        context = pickle.load(f)
-    return context
+    root, ext = os.path.splitext(context_path)
+    if not os.path.exists(context_path):
+        for candidate in (root + ".ckpt", root + ".pkl"):
+            if os.path.exists(candidate):
+                context_path, ext = candidate, os.path.splitext(candidate)[1]
+                break
+    if ext == ".pkl":
+        with open(context_path, 'rb') as f:
+            context = pickle.load(f)
+        return context if keys is None else {key: context[key] for key in keys}
+    return load_checkpoint(context_path, keys=keys)
 
 
 def clean_work_dir(work_dir):
@@ -51,11 +72,282 @@ def clean_work_dir(work_dir):
     work_dir : str
         Path to the work directory to clean
     """
-    import shutil
     if os.path.exists(work_dir):
         shutil.rmtree(work_dir)
 
 
+def plan_dependencies(sub_tasks):
+    """Return the steps each plan step depends on.
+
+    Parameters
+    ----------
+    sub_tasks : list of dict
+        The ``sub_tasks`` of ``final_plan.json``
+
+    Returns
+    -------
+    dict
+        ``{step: set of steps}``, with 1-based step numbers. Sub-tasks without
+        ``depends_on`` (plans written before dependencies were declared) depend
+        on all the previous steps. References to the step itself or to later
+        steps are ignored, so the graph is always acyclic.
+    """
+    dependencies = {}
+    for step, sub_task in enumerate(sub_tasks, start=1):
+        depends_on = sub_task.get("depends_on")
+        if depends_on is None:
+            dependencies[step] = set(range(1, step))
+        else:
+            dependencies[step] = {int(d) for d in depends_on if 1 <= int(d) < step}
+    return dependencies
+
+
+def _ancestors(step, dependencies):
+    """All the steps ``step`` depends on, directly or not."""
+    ancestors = set()
+    stack = list(dependencies.get(step, ()))
+    while stack:
+        dependency = stack.pop()
+        if dependency not in ancestors:
+            ancestors.add(dependency)
+            stack.extend(dependencies.get(dependency, ()))
+    return ancestors
+
+
+def step_execution_summary(chat_history, agent_for_step, step):
+    """Return the ``### Step N`` summary of a control step, from its last message by the agent in charge."""
+    agent_for_step = agent_for_step.removesuffix("_context").removesuffix("_agent")
+    for msg in chat_history[::-1]:
+        if 'name' in msg:
+            if msg['name'] == agent_for_step or msg['name'] == f"{agent_for_step}_nest" or msg['name'] == f"{agent_for_step}_response_formatter":
+                return f"### Step {step}\n{msg['content'].strip()}"
+    return None
+
+
+def _save_step_outputs(cmbagent, results, step, context_dir):
+    """Write the timing report, cost report, chat history and context of a control step."""
+    work_dir = cmbagent.final_context['work_dir']
+
+    # Save timing report as JSON
+    timing_report = {
+        'initialization_time_control': results['initialization_time_control'],
+        'execution_time_control': results['execution_time_control'],
+        'total_time': results['initialization_time_control'] + results['execution_time_control']
+    }
+
+    # Add timestamp
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    timing_path = os.path.join(work_dir, f"time/timing_report_step_{step}_{timestamp}.json")
+    with open(timing_path, 'w') as f:
+        json.dump(timing_report, f, indent=2)
+
+    print(f"\nTiming report data saved to: {timing_path}\n")
+
+    # Create a dummy groupchat attribute if it doesn't exist
+    if not hasattr(cmbagent, 'groupchat'):
+        Dummy = type('Dummy', (object,), {'new_conversable_agents': []})
+        cmbagent.groupchat = Dummy()
+
+    # Now call display_cost without triggering the AttributeError
+    cmbagent.display_cost(name_append=f"step_{step}")
+
+    ## save the chat history and the final context
+    chat_full_path = os.path.join(work_dir, "chats")
+    os.makedirs(chat_full_path, exist_ok=True)
+    chat_output_path = os.path.join(chat_full_path, f"chat_history_step_{step}.json")
+    with open(chat_output_path, 'w') as f:
+        json.dump(results['chat_history'], f, indent=2)
+
+    _save_context_checkpoint(cmbagent.final_context, context_dir, step)
+
+
+def _save_context_checkpoint(context, context_dir, step):
+    # stored as a delta on the previous step's checkpoint, when there is one
+    context_path = os.path.join(context_dir, f"context_step_{step}.ckpt")
+    base_path = os.path.join(context_dir, f"context_step_{step-1}.ckpt") if step > 0 else None
+    save_checkpoint(context, context_path, base_path=base_path)
+
+
+def _clear_dir(path):
+    # everything inside ``path``, as ``CMBAgent.clear_work_dir`` does
+    for item in Path(path).iterdir():
+        if item.is_dir():
+            shutil.rmtree(item)
+        else:
+            item.unlink()
+
+
+def _run_control_steps_in_parallel(task, sub_tasks, initial_step, base_context, control_dir, context_dir,
+                                   make_cmbagent, max_rounds_control, max_parallel_steps,
+                                   step_memo=None, memo_settings=None, clear_work_dir=False):
+    """Run the control steps of a plan as a DAG, independent steps concurrently.
+
+    Each step runs with its own ``CMBAgent`` in ``control_dir/step_N``, which is
+    seeded with the data and codebase of the steps it depends on and sees their
+    summaries only. Once all steps are done their outputs are merged into
+    ``control_dir`` and their summaries into ``previous_steps_execution_summary``,
+    in step order (which is a dependency order). Steps found in ``step_memo``
+    are restored instead of being run.
+
+    When a step exceeds ``max_n_attempts`` no further step is started, and, as
+    in the sequential loop, only the steps before the lowest failed one are
+    merged and checkpointed, so that ``restart_at_step`` resumes from it.
+
+    Returns
+    -------
+    tuple
+        ``(results, final_context)`` of the last step of the plan with the merged
+        summaries, or of the lowest failed step.
+    """
+    dependencies = plan_dependencies(sub_tasks)
+    database_path, codebase_path = base_context['database_path'], base_context['codebase_path']
+
+    # steps before a restart are done, their summaries are in the restored context
+    done = set(range(1, initial_step))
+    previous_summary = base_context.get('previous_steps_execution_summary', '').strip() if done else ''
+    summaries = {}
+    step_results = {}
+    failed_results = {}
+
+    # the outputs of an earlier run in this work_dir, as the sequential loop clears them
+    if clear_work_dir:
+        _clear_dir(control_dir)
+    for step in range(initial_step, len(sub_tasks) + 1):
+        shutil.rmtree(control_dir / f"step_{step}", ignore_errors=True)
+
+    def run_step(step):
+        step_dir = control_dir / f"step_{step}"
+        for dependency in sorted(_ancestors(step, dependencies)):
+            for folder in (database_path, codebase_path):
+                source = control_dir / f"step_{dependency}" / folder
+                if source.is_dir():
+                    shutil.copytree(source, step_dir / folder, dirs_exist_ok=True)
+
+        sub_task = sub_tasks[step - 1]
+        context = copy.deepcopy(base_context)
+        context["agent_for_sub_task"] = sub_task['sub_task_agent']
+        context["current_plan_step_number"] = step
+        context["current_sub_task"] = sub_task['sub_task']
+        context["current_instructions"] = "\n".join(f"- {bullet}" for bullet in sub_task.get('bullet_points', []))
+        context["n_attempts"] = 0
+        context["previous_steps_execution_summary"] = "\n\n".join(
+            [previous_summary] * bool(previous_summary)
+            + [summaries[d] for d in sorted(_ancestors(step, dependencies)) if d in summaries]
+        ) or "\n"
+
+        fingerprint = None
+        if step_memo is not None:
+            fingerprint = step_memo.fingerprint(task, sub_task, memo_settings, context, step_dir)
+            memo = step_memo.load(fingerprint)
+            if memo is not None:
+                print(f"\nStep {step} is unchanged since a previous run, restoring its outputs.\n")
+                step_memo.restore(memo, step_dir)
+                _save_context_checkpoint(memo['final_context'], context_dir, step)
+                results = {
+                    'chat_history': memo['chat_history'],
+                    'final_context': memo['final_context'],
+                    'initialization_time_control': 0.0,
+                    'execution_time_control': 0.0,
+                }
+                return results, memo['summary'], False
+
+        start_time = time.time()
+        cmbagent = make_cmbagent(step_dir)
+        initialization_time_control = time.time() - start_time
+
+        start_time = time.time()
+        cmbagent.solve(
+            task,
+            max_rounds=max_rounds_control,
+            initial_agent="controller" if step == 1 else "control_starter",
+            shared_context=context,
+            step=step
+        )
+        results = {
+            'chat_history': cmbagent.chat_result.chat_history,
+            'final_context': cmbagent.final_context,
+            'initialization_time_control': initialization_time_control,
+            'execution_time_control': time.time() - start_time,
+        }
+        # as in the sequential loop, a failed step is neither saved nor summarized
+        if cmbagent.final_context['n_attempts'] >= cmbagent.final_context['max_n_attempts']:
+            return results, None, True
+        _save_step_outputs(cmbagent, results, step, context_dir)
+        summary = step_execution_summary(results['chat_history'], sub_task['sub_task_agent'], step)
+        if step_memo is not None:
+            step_memo.save(fingerprint, step_dir, cmbagent.final_context, results['chat_history'], summary)
+        return results, summary, False
+
+    pending = set(range(initial_step, len(sub_tasks) + 1))
+    running = {}
+    failed = False
+    with ThreadPoolExecutor(max_workers=max_parallel_steps) as executor:
+        while pending or running:
+            if not failed:
+                for step in sorted(pending):
+                    if dependencies[step] <= done:
+                        pending.discard(step)
+                        running[executor.submit(run_step, step)] = step
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                results, summary, step_failed = future.result()
+                if step_failed:
+                    print(f"in deep_research: step {step} exceeded max_n_attempts. Not starting any further step.")
+                    failed_results[step] = results
+                    failed = True
+                    continue
+                step_results[step] = results
+                if summary is not None:
+                    summaries[step] = summary
+                done.add(step)
+
+    # the steps after a failed one are run again on restart
+    first_failed = min(failed_results, default=None)
+    if first_failed is not None:
+        for step in [step for step in step_results if step > first_failed]:
+            del step_results[step]
+            summaries.pop(step, None)
+            # so that a restart after it cannot skip the failed step
+            Path(context_dir, f"context_step_{step}.ckpt").unlink(missing_ok=True)
+
+    # merge the step outputs and summaries in dependency order
+    for step in sorted(step_results):
+        for folder in (database_path, codebase_path):
+            source = control_dir / f"step_{step}" / folder
+            if source.is_dir():
+                shutil.copytree(source, control_dir / folder, dirs_exist_ok=True)
+
+    final_context = base_context
+    if step_results:
+        last_step = max(step_results)
+        final_context = _merged_step_context(step_results[last_step], previous_summary, summaries, control_dir)
+        _save_context_checkpoint(final_context, context_dir, last_step)
+
+    if first_failed is not None:
+        results = failed_results[first_failed]
+        return results, results['final_context']
+    if not step_results:
+        return {}, base_context
+    results = step_results[last_step]
+    results['final_context'] = final_context
+    return results, final_context
+
+
+def _merged_step_context(results, previous_summary, summaries, control_dir):
+    # the context of the last merged step, with the summaries of all of them
+    final_context = copy.deepcopy(results['final_context'])
+    final_context['previous_steps_execution_summary'] = "\n\n".join(
+        [previous_summary] * bool(previous_summary) + [summaries[step] for step in sorted(summaries)]
+    )
+    final_context['work_dir'] = str(control_dir)
+    print("previous_steps_execution_summary: ", final_context['previous_steps_execution_summary'])
+    return final_context
+
+
+@recordable
 def deep_research(
     task,
     max_rounds_planning=50,
@@ -81,6 +373,10 @@ def deep_research(
     restart_at_step=-1,
     clear_work_dir=False,
     researcher_filename=shared_context_default['researcher_filename'],
+    response_cache=None,
+    history_compaction=None,
+    max_parallel_steps=1,
+    memoize_steps=True,
 ):
     """Execute a complex research task with planning and multi-step execution.
 
@@ -138,6 +434,29 @@ def deep_research(
         Whether to clear work directory before starting, by default False
     researcher_filename : str, optional
         Filename for researcher output
+    response_cache : bool, str or ResponseCache, optional
+        Persistent LLM response cache shared by all agents, see ``CMBAgent``, by default None
+    history_compaction : dict or bool, optional
+        Token budgets of the controller, engineer and researcher histories during
+        control, see ``CMBAgent``. True uses the default budgets, None or False
+        disables compaction, by default None
+    max_parallel_steps : int, optional
+        Maximum number of plan steps executed concurrently, by default 1. With more
+        than one, steps run as soon as the steps they depend on (``depends_on`` in
+        ``final_plan.json``) are done, each in its own ``control/step_N`` work
+        directory. Their outputs and summaries are merged into ``control`` and
+        ``previous_steps_execution_summary`` in step order.
+    memoize_steps : bool, optional
+        Skip the control steps whose inputs (task, sub-task, models, previous
+        summaries and data/codebase files) are unchanged since a successful step
+        of a previous run in the same ``work_dir``, restoring their context and
+        outputs instead, by default True. See ``cmbagent.utils.step_memo``.
+    record : str, optional
+        Write every LLM response and code execution result of the run to this
+        log file (gzip-compressed for ``.gz``), see ``record_run``, by default None
+    replay : str, optional
+        Re-run deterministically from a log written with ``record``, without
+        network access or code execution, by default None
 
     Returns
     -------
@@ -166,6 +485,9 @@ def deep_research(
     if api_keys is None:
         api_keys = get_api_keys_from_env()
 
+    # one cache (and one SQLite connection) for the planning and control agents
+    response_cache = get_response_cache(response_cache)
+
     ## planning
     if restart_at_step <= 0:
 
@@ -179,6 +501,7 @@ def deep_research(
         plan_reviewer_config = get_model_config(plan_reviewer_model, api_keys)
 
         cmbagent = CMBAgent(
+            initial_agent="plan_setter",
             work_dir=planning_dir,
             default_llm_model=default_llm_model,
             default_formatter_model=default_formatter_model,
@@ -186,7 +509,8 @@ def deep_research(
                 'planner': planner_config,
                 'plan_reviewer': plan_reviewer_config,
             },
-            api_keys=api_keys
+            api_keys=api_keys,
+            response_cache=response_cache,
         )
         end_time = time.time()
         initialization_time_planning = end_time - start_time
@@ -226,9 +550,7 @@ def deep_research(
         print(f"\nStructured plan written to {outfile}")
         print(f"\nPlanning took {execution_time_planning:.4f} seconds\n")
 
-        context_path = os.path.join(context_dir, "context_step_0.pkl")
-        with open(context_path, 'wb') as f:
-            pickle.dump(cmbagent.final_context, f)
+        _save_context_checkpoint(cmbagent.final_context, context_dir, 0)
 
         # Save timing report as JSON
         timing_report = {
@@ -262,7 +584,7 @@ def deep_research(
     control_dir = Path(work_dir).expanduser().resolve() / "control"
     control_dir.mkdir(parents=True, exist_ok=True)
 
-    current_context = copy.deepcopy(planning_output) if restart_at_step <= 0 else load_context(os.path.join(context_dir, f"context_step_{restart_at_step-1}.pkl"))
+    current_context = copy.deepcopy(planning_output) if restart_at_step <= 0 else load_context(os.path.join(context_dir, f"context_step_{restart_at_step-1}.ckpt"))
     number_of_steps_in_plan = current_context['number_of_steps_in_plan']
     step_summaries = []
 
@@ -275,13 +597,10 @@ def deep_research(
             plan_dict = json.load(f)
         return plan_dict
 
-    for step in range(initial_step, number_of_steps_in_plan + 1):
-        clear_work_dir_step = True if step == 1 and restart_at_step <= 0 else False
-        starter_agent = "controller" if step == 1 else "control_starter"
-
-        start_time = time.time()
-        cmbagent = CMBAgent(
-            work_dir=control_dir,
+    def make_control_cmbagent(control_work_dir, clear_work_dir_step=False):
+        return CMBAgent(
+            initial_agent=["controller", "control_starter"],
+            work_dir=control_work_dir,
             clear_work_dir=clear_work_dir_step,
             default_llm_model=default_llm_model,
             default_formatter_model=default_formatter_model,
@@ -293,14 +612,45 @@ def deep_research(
                 'camb_context': camb_context_config,
             },
             mode="deep_research",
-            api_keys=api_keys
+            api_keys=api_keys,
+            response_cache=response_cache,
+            history_compaction=history_compaction,
         )
 
-        end_time = time.time()
-        initialization_time_control = end_time - start_time
+    plan_input = load_plan(os.path.join(work_dir, "planning/final_plan.json"))["sub_tasks"]
+
+    step_memo = StepMemo(context_dir / "step_memo") if memoize_steps else None
+    memo_settings = {
+        'engineer_model': engineer_model,
+        'researcher_model': researcher_model,
+        'idea_maker_model': idea_maker_model,
+        'idea_hater_model': idea_hater_model,
+        'camb_context_model': camb_context_model,
+        'default_llm_model': default_llm_model,
+        'default_formatter_model': default_formatter_model,
+        'max_rounds_control': max_rounds_control,
+        'max_n_attempts': max_n_attempts,
+    }
+
+    if max_parallel_steps > 1:
+        results, current_context = _run_control_steps_in_parallel(
+            task, plan_input, initial_step, current_context, control_dir, context_dir,
+            make_control_cmbagent, max_rounds_control, max_parallel_steps,
+            step_memo=step_memo, memo_settings=memo_settings, clear_work_dir=restart_at_step <= 0,
+        )
+        sequential_steps = []
+    else:
+        sequential_steps = range(initial_step, number_of_steps_in_plan + 1)
+
+    # the control agents are built once and reset between steps, so that
+    # steps 2..N do not pay for agent instantiation and hand-off registration again
+    cmbagent = None
+
+    for step in sequential_steps:
+        clear_work_dir_step = True if step == 1 and restart_at_step <= 0 else False
+        starter_agent = "controller" if step == 1 else "control_starter"
 
         if step == 1:
-            plan_input = load_plan(os.path.join(work_dir, "planning/final_plan.json"))["sub_tasks"]
             agent_for_step = plan_input[0]['sub_task_agent']
         else:
             agent_for_step = current_context['agent_for_sub_task']
@@ -310,6 +660,39 @@ def deep_research(
         parsed_context["current_plan_step_number"] = step
         parsed_context["n_attempts"] = 0  # reset number of failures for each step
 
+        if clear_work_dir_step:
+            # cleared before the step memo hashes the step inputs, not when the agents are built
+            _clear_dir(control_dir)
+
+        fingerprint = None
+        if step_memo is not None:
+            fingerprint = step_memo.fingerprint(task, plan_input[step - 1], memo_settings, parsed_context, control_dir)
+            memo = step_memo.load(fingerprint)
+            if memo is not None:
+                print(f"\nStep {step} is unchanged since a previous run, restoring its outputs.\n")
+                step_memo.restore(memo, control_dir)
+                if memo['summary'] is not None:
+                    step_summaries.append(memo['summary'])
+                current_context = copy.deepcopy(memo['final_context'])
+                results = {
+                    'chat_history': memo['chat_history'],
+                    'final_context': current_context,
+                    'initialization_time_control': 0.0,
+                    'execution_time_control': 0.0,
+                }
+                _save_context_checkpoint(current_context, context_dir, step)
+                continue
+
+        # only built (or reset) for the steps that run
+        start_time = time.time()
+        if cmbagent is None:
+            cmbagent = make_control_cmbagent(control_dir)
+        else:
+            cmbagent.reset()
+
+        end_time = time.time()
+        initialization_time_control = end_time - start_time
+
         start_time = time.time()
 
         cmbagent.solve(
@@ -336,16 +719,10 @@ def deep_research(
             break
 
         # Collect step summaries
-        for msg in results['chat_history'][::-1]:
-            if 'name' in msg:
-                agent_for_step = agent_for_step.removesuffix("_context")
-                agent_for_step = agent_for_step.removesuffix("_agent")
-                if msg['name'] == agent_for_step or msg['name'] == f"{agent_for_step}_nest" or msg['name'] == f"{agent_for_step}_response_formatter":
-                    this_step_execution_summary = msg['content']
-                    summary = f"### Step {step}\n{this_step_execution_summary.strip()}"
-                    step_summaries.append(summary)
-                    cmbagent.final_context['previous_steps_execution_summary'] = "\n\n".join(step_summaries)
-                    break
+        summary = step_execution_summary(results['chat_history'], agent_for_step, step)
+        if summary is not None:
+            step_summaries.append(summary)
+            cmbagent.final_context['previous_steps_execution_summary'] = "\n\n".join(step_summaries)
 
         print("previous_steps_execution_summary: ", cmbagent.final_context['previous_steps_execution_summary'])
 
@@ -354,39 +731,10 @@ def deep_research(
         results['initialization_time_control'] = initialization_time_control
         results['execution_time_control'] = execution_time_control
 
-        # Save timing report as JSON
-        timing_report = {
-            'initialization_time_control': initialization_time_control,
-            'execution_time_control': execution_time_control,
-            'total_time': initialization_time_control + execution_time_control
-        }
-
-        # Add timestamp
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        timing_path = os.path.join(current_context['work_dir'], f"time/timing_report_step_{step}_{timestamp}.json")
-        with open(timing_path, 'w') as f:
-            json.dump(timing_report, f, indent=2)
-
-        print(f"\nTiming report data saved to: {timing_path}\n")
+        _save_step_outputs(cmbagent, results, step, context_dir)
 
-        # Create a dummy groupchat attribute if it doesn't exist
-        if not hasattr(cmbagent, 'groupchat'):
-            Dummy = type('Dummy', (object,), {'new_conversable_agents': []})
-            cmbagent.groupchat = Dummy()
-
-        # Now call display_cost without triggering the AttributeError
-        cmbagent.display_cost(name_append=f"step_{step}")
-
-        ## save the chat history and the final context
-        chat_full_path = os.path.join(current_context['work_dir'], "chats")
-        os.makedirs(chat_full_path, exist_ok=True)
-        chat_output_path = os.path.join(chat_full_path, f"chat_history_step_{step}.json")
-        with open(chat_output_path, 'w') as f:
-            json.dump(results['chat_history'], f, indent=2)
-
-        context_path = os.path.join(context_dir, f"context_step_{step}.pkl")
-        with open(context_path, 'wb') as f:
-            pickle.dump(cmbagent.final_context, f)
+        if step_memo is not None:
+            step_memo.save(fingerprint, control_dir, cmbagent.final_context, results['chat_history'], summary)
 
     ## delete empty folders after execution
     database_full_path = os.path.join(current_context['work_dir'], current_context['database_path'])
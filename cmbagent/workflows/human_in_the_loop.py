@@ -89,6 +89,7 @@ def human_in_the_loop(
     researcher_config = get_model_config(researcher_model, api_keys)
 
     cmbagent = CMBAgent(
+        initial_agent=agent,
         work_dir=work_dir,
         agent_llm_configs={
             'engineer': engineer_config,
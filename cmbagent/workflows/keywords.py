@@ -14,7 +14,7 @@ from ..utils import (
     get_api_keys_from_env,
     unesco_taxonomy_path,
     aaai_keywords_path,
-    AAS_keywords_string
+    get_aas_keywords_string
 )
 from ..utils.keywords_utils import UnescoKeywords, AaaiKeywords
 
@@ -135,7 +135,7 @@ def get_keywords_from_aaai(
     from ..cmbagent import CMBAgent
 
     start_time = time.time()
-    cmbagent = CMBAgent(work_dir=work_dir, api_keys=api_keys)
+    cmbagent = CMBAgent(work_dir=work_dir, api_keys=api_keys, initial_agent='aaai_keywords_finder')
     end_time = time.time()
     initialization_time = end_time - start_time
 
@@ -227,7 +227,7 @@ def get_keywords_from_string(
     from ..cmbagent import CMBAgent
 
     start_time = time.time()
-    cmbagent = CMBAgent(work_dir=work_dir, api_keys=api_keys)
+    cmbagent = CMBAgent(work_dir=work_dir, api_keys=api_keys, initial_agent='list_keywords_finder')
     end_time = time.time()
     initialization_time = end_time - start_time
 
@@ -313,7 +313,7 @@ def get_aas_keywords(
     from ..cmbagent import CMBAgent
 
     start_time = time.time()
-    cmbagent = CMBAgent(work_dir=work_dir, api_keys=api_keys)
+    cmbagent = CMBAgent(work_dir=work_dir, api_keys=api_keys, initial_agent='aas_keyword_finder')
     end_time = time.time()
     initialization_time = end_time - start_time
 
@@ -328,7 +328,7 @@ def get_aas_keywords(
         mode="one_shot",
         shared_context={
             'text_input_for_AAS_keyword_finder': PROMPT,
-            'AAS_keywords_string': AAS_keywords_string,
+            'AAS_keywords_string': get_aas_keywords_string(),
             'N_AAS_keywords': n_keywords,
         }
     )
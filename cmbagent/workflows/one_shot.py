@@ -20,10 +20,12 @@ from ..utils import (
     get_model_config,
     camb_context_url,
 )
+from ..utils.record_replay import recordable
 from ..context import shared_context as shared_context_default
 from ..utils.context_utils import add_contexts_from_urls
 
 
+@recordable
 def one_shot(
     task,
     max_rounds=50,
@@ -43,6 +45,7 @@ def one_shot(
     massgen_verbose=False,
     massgen_enable_logging=True,
     massgen_use_for_retries=False,
+    response_cache=None,
 ):
     """Execute a single task using CMBAgent without iterative planning.
 
@@ -89,6 +92,14 @@ def one_shot(
     massgen_use_for_retries : bool, optional
         Use MassGen for retry attempts (debugging). If False (default), uses single LLM
         for faster debugging after initial code generation.
+    response_cache : bool, str or ResponseCache, optional
+        Persistent LLM response cache shared by all agents, see ``CMBAgent``, by default None
+    record : str, optional
+        Write every LLM response and code execution result of the run to this
+        log file (gzip-compressed for ``.gz``), see ``record_run``, by default None
+    replay : str, optional
+        Re-run deterministically from a log written with ``record``, without
+        network access or code execution, by default None
 
     Returns
     -------
@@ -128,6 +139,7 @@ def one_shot(
     camb_context_config = get_model_config(camb_context_model, api_keys)
 
     cmbagent = CMBAgent(
+        initial_agent=agent,
         mode="one_shot",
         work_dir=work_dir,
         agent_llm_configs={
@@ -144,6 +156,7 @@ def one_shot(
         massgen_verbose=massgen_verbose,
         massgen_enable_logging=massgen_enable_logging,
         massgen_use_for_retries=massgen_use_for_retries,
+        response_cache=response_cache,
     )
 
     end_time = time.time()
@@ -27,11 +27,14 @@ from ..utils import (
     default_formatter_model as default_formatter_model_default,
     default_agents_llm_model,
     get_model_config,
-    get_api_keys_from_env
+    get_api_keys_from_env,
+    get_response_cache
 )
+from ..utils.record_replay import recordable
 from ..context import shared_context as shared_context_default
 
 
+@recordable
 def planning_and_control(
     task,
     max_rounds_planning=50,
@@ -54,6 +57,8 @@ def planning_and_control(
     default_llm_model=default_llm_model_default,
     default_formatter_model=default_formatter_model_default,
     api_keys=None,
+    response_cache=None,
+    history_compaction=None,
 ):
     """Execute a task with planning and control phases (DEPRECATED).
 
@@ -118,6 +123,18 @@ def planning_and_control(
         Default model for response formatters
     api_keys : dict, optional
         API keys for model providers
+    response_cache : bool, str or ResponseCache, optional
+        Persistent LLM response cache shared by all agents, see ``CMBAgent``, by default None
+    history_compaction : dict or bool, optional
+        Token budgets of the controller, engineer and researcher histories during
+        control, see ``CMBAgent``. True uses the default budgets, None or False
+        disables compaction, by default None
+    record : str, optional
+        Write every LLM response and code execution result of the run to this
+        log file (gzip-compressed for ``.gz``), see ``record_run``, by default None
+    replay : str, optional
+        Re-run deterministically from a log written with ``record``, without
+        network access or code execution, by default None
 
     Returns
     -------
@@ -162,10 +179,14 @@ def planning_and_control(
     if api_keys is None:
         api_keys = get_api_keys_from_env()
 
+    # one cache (and one SQLite connection) for the planning and control agents
+    response_cache = get_response_cache(response_cache)
+
     planner_config = get_model_config(planner_model, api_keys)
     plan_reviewer_config = get_model_config(plan_reviewer_model, api_keys)
 
     cmbagent = CMBAgent(
+        initial_agent="plan_setter",
         work_dir=planning_dir,
         default_llm_model=default_llm_model,
         default_formatter_model=default_formatter_model,
@@ -173,7 +194,8 @@ def planning_and_control(
             'planner': planner_config,
             'plan_reviewer': plan_reviewer_config,
         },
-        api_keys=api_keys
+        api_keys=api_keys,
+        response_cache=response_cache,
     )
     end_time = time.time()
     initialization_time_planning = end_time - start_time
@@ -245,6 +267,7 @@ def planning_and_control(
 
     start_time = time.time()
     cmbagent = CMBAgent(
+        initial_agent="controller",
         work_dir=control_dir,
         default_llm_model=default_llm_model,
         default_formatter_model=default_formatter_model,
@@ -254,7 +277,9 @@ def planning_and_control(
             'idea_maker': idea_maker_config,
             'idea_hater': idea_hater_config,
         },
-        api_keys=api_keys
+        api_keys=api_keys,
+        response_cache=response_cache,
+        history_compaction=history_compaction,
     )
 
     end_time = time.time()
@@ -0,0 +1,16 @@
+from cmbagent.agent_registry import get_agent_registry, list_agents
+
+
+def test_agent_registry_is_cached():
+
+   first = get_agent_registry()
+   second = get_agent_registry()
+
+   # same classes are handed out, but callers get their own dict
+   assert first is not second
+   for class_name, entry in first.items():
+      assert second[class_name]['agent_class'] is entry['agent_class']
+
+   names = [row['name'] for row in list_agents()]
+   assert 'engineer' in names
+   assert 'controller' in names
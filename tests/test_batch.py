@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from cmbagent.workflows.batch import load_batch_tasks, run_batch
+
+
+def test_batch_resume(tmp_path):
+
+   tasks_path = tmp_path / "tasks.jsonl"
+   tasks_path.write_text(
+      '{"id": "sum", "task": "Compute 1 + 1.", "agent": "engineer"}\n'
+      '\n'
+      '# comment\n'
+      '{"task": "Compute 2 + 2.", "workflow": "deep_research"}\n'
+   )
+   tasks = load_batch_tasks(tasks_path)
+   assert [task["id"] for task in tasks] == ["sum", "task_0004"]
+
+   # tasks that succeeded in an earlier run are not run again
+   work_dir = tmp_path / "batch"
+   work_dir.mkdir()
+   with open(work_dir / "batch_state.jsonl", "w") as f:
+      f.write(json.dumps({"id": "sum", "status": "failed"}) + "\n")
+      f.write(json.dumps({"id": "sum", "status": "done", "cost": 0.1}) + "\n")
+      f.write(json.dumps({"id": "task_0004", "status": "done", "cost": 0.2}) + "\n")
+      f.write('{"id": "task_0004", "sta')
+   results = run_batch(tasks_path, work_dir=work_dir)
+   assert {task_id: state["status"] for task_id, state in results.items()} == {"sum": "skipped", "task_0004": "skipped"}
+
+   with pytest.raises(ValueError):
+      run_batch([{"id": "x", "task": "x", "workflow": "control"}], work_dir=work_dir)
@@ -0,0 +1,32 @@
+import os
+
+from cmbagent.utils.checkpoints import save_checkpoint, load_checkpoint, Checkpoint
+from cmbagent.workflows.deep_research import load_context
+
+
+def test_incremental_checkpoints(tmp_path):
+
+   docs = "camb documentation " * 2000
+   context = {"camb_context": docs, "current_plan_step_number": 0, "previous_steps_execution_summary": "\n"}
+   first = save_checkpoint(context, tmp_path / "context_step_0.ckpt")
+
+   # only the changed values are stored, the large unchanged one is not written again
+   context = {**context, "current_plan_step_number": 1, "previous_steps_execution_summary": "### Step 1\ndone"}
+   second = save_checkpoint(context, tmp_path / "context_step_1.ckpt", base_path=tmp_path / "context_step_0.ckpt")
+   assert first["changed"] == 3 and second["changed"] == 2
+   assert second["bytes_written"] < first["bytes_written"]
+
+   del context["camb_context"]
+   save_checkpoint(context, tmp_path / "context_step_2.ckpt", base_path=tmp_path / "context_step_1.ckpt")
+
+   # any step can be reconstructed, or just some of its keys
+   assert load_checkpoint(tmp_path / "context_step_1.ckpt") == {**context, "camb_context": docs}
+   assert load_checkpoint(tmp_path / "context_step_2.ckpt") == context
+   assert Checkpoint(tmp_path / "context_step_1.ckpt").get("camb_context") == docs
+
+   # rewriting a base checkpoint does not change the steps built on it
+   save_checkpoint({"current_plan_step_number": 7}, tmp_path / "context_step_1.ckpt")
+   assert load_checkpoint(tmp_path / "context_step_2.ckpt") == context
+
+   # load_context falls back to the other format with the same name
+   assert load_context(os.path.join(tmp_path, "context_step_2.pkl"), keys=["current_plan_step_number"]) == {"current_plan_step_number": 1}
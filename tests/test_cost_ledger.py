@@ -0,0 +1,106 @@
+import json
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from cmbagent.utils.cost_ledger import CostLedger, cost_ledger_path, cost_totals
+from cmbagent.workflows.batch import task_cost
+
+
+def append_costs(path, worker):
+   ledger = CostLedger(path)
+   for i in range(50):
+      ledger.append({"kind": "ocr", "file": f"paper_{i % 5}.pdf", "pages_processed": 1, "cost_usd": 0.001,
+                     "run": f"run_{worker}"})
+
+
+def test_cost_ledger_concurrent_appends(tmp_path):
+   path = cost_ledger_path(str(tmp_path))
+
+   # no entry is lost, from threads nor processes
+   with ThreadPoolExecutor(max_workers=4) as executor:
+      list(executor.map(append_costs, [path] * 4, range(4)))
+   processes = [multiprocessing.get_context("fork").Process(target=append_costs, args=(path, 4 + i)) for i in range(2)]
+   for process in processes:
+      process.start()
+   for process in processes:
+      process.join()
+
+   ledger = CostLedger(path)
+   lines = (tmp_path / "cost_ledger.jsonl").read_text().splitlines()
+   assert len(lines) == 300 and all(json.loads(line)["kind"] == "ocr" for line in lines)
+   totals = ledger.totals()
+   assert totals["entries"] == 300 and totals["pages_processed"] == 300
+   assert abs(totals["cost_usd"] - 0.3) < 1e-9
+
+   by_file = ledger.totals(by="file")
+   assert sorted(by_file) == [f"paper_{i}.pdf" for i in range(5)] and by_file["paper_0.pdf"]["entries"] == 60
+   assert len(ledger.totals(by="run")) == 6 and len(ledger.totals(by="day")) == 1
+
+   # the ledgers of nested work_dirs are summed, by kind
+   CostLedger(cost_ledger_path(str(tmp_path / "summaries" / "doc_001"))).append(
+      {"kind": "llm", "agent": "summarizer", "cost_usd": 0.2, "prompt_tokens": 1000})
+   assert cost_totals(str(tmp_path), kind="llm")["prompt_tokens"] == 1000
+   assert abs(task_cost(str(tmp_path)) - 0.5) < 1e-9
+
+
+def test_recorded_costs_restart_after_reset(tmp_path):
+   from cmbagent.cmbagent import CMBAgent
+
+   agent = object.__new__(CMBAgent)
+   agent.work_dir, agent.agents = str(tmp_path), []
+
+   def step_rows(cost):
+      row = {"Agent": "engineer", "Cost ($)": cost, "Prompt Tokens": 10, "Completion Tokens": 5, "Total Tokens": 15,
+             "Model": "gpt-4.1"}
+      return [row, {**row, "Agent": "Total"}]
+
+   # the control agent reused across deep_research steps: cost rows restart at each reset
+   agent._record_costs(step_rows(0.5), str(tmp_path / "cost" / "cost_report_step_1.json"))
+   agent.reset()
+   agent._record_costs(step_rows(0.3), str(tmp_path / "cost" / "cost_report_step_2.json"))
+   totals = CostLedger(cost_ledger_path(str(tmp_path))).totals()
+   assert totals["entries"] == 2 and abs(totals["cost_usd"] - 0.8) < 1e-9 and totals["total_tokens"] == 30
+
+
+def test_legacy_costs_imported_once(tmp_path):
+   from cmbagent.utils.ocr import MistralOCRProcessor
+
+   legacy = [{"filename": f"old_{i}.pdf", "pages_processed": 1, "cost_usd": 0.001} for i in range(200)]
+   (tmp_path / "ocr_cost.json").write_text(json.dumps({"entries": legacy}))
+   processor = MistralOCRProcessor(ocr_cache=False, engines=["text_layer"])
+
+   # PDFs finishing at once into a work_dir of the earlier format
+   def save(i):
+      processor._save_cost_info({"filename": f"new_{i}.pdf", "pages_processed": 1, "cost_usd": 0.001}, str(tmp_path))
+      processor._write_cost_summary(str(tmp_path))
+
+   with ThreadPoolExecutor(max_workers=8) as executor:
+      list(executor.map(save, range(8)))
+
+   by_run = CostLedger(cost_ledger_path(str(tmp_path))).totals(by="run")
+   assert by_run["legacy"]["entries"] == 200 and sum(t["entries"] for t in by_run.values()) == 208
+   assert json.loads((tmp_path / "ocr_cost.json").read_text())["total_pages_processed"] == 208
+   assert sorted(p.name for p in tmp_path.iterdir()) == ["cost_ledger.jsonl", "ocr_cost.json"]
+
+
+def test_batch_tasks_share_the_batch_ledger(tmp_path, monkeypatch):
+   from cmbagent.utils.ocr import MistralOCRProcessor
+
+   batch_ledger = cost_ledger_path(str(tmp_path))
+   monkeypatch.setenv("CMBAGENT_COST_LEDGER", batch_ledger)
+
+   # what the workers of run_batch record, each from its own task dir
+   processor = MistralOCRProcessor(ocr_cache=False, engines=["text_layer"])
+   for task_id, cost in [("a", 0.1), ("b", 0.2), ("a", 0.3)]:
+      task_dir = tmp_path / "tasks" / task_id
+      monkeypatch.setenv("CMBAGENT_TASK_ID", task_id)
+      assert cost_ledger_path(str(task_dir)) == batch_ledger
+      processor._save_cost_info({"filename": "paper.pdf", "pages_processed": 1, "cost_usd": cost}, str(task_dir))
+      processor._write_cost_summary(str(task_dir))
+
+   by_task = CostLedger(batch_ledger).totals(by="task")
+   assert sorted(by_task) == ["a", "b"] and by_task["a"]["entries"] == 2
+   assert abs(task_cost(str(tmp_path), task_id="a") - 0.4) < 1e-9
+   # the OCR cost view of a task dir only has the costs of that task
+   summary = json.loads((tmp_path / "tasks" / "a" / "ocr_cost.json").read_text())
+   assert abs(summary["total_cost_usd"] - 0.4) < 1e-9 and summary["ledger"] == batch_ledger
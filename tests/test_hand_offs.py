@@ -0,0 +1,31 @@
+from cmbagent.hand_offs import get_reachable_agents
+
+
+def test_reachable_agents():
+
+   assert get_reachable_agents("summarizer", mode="one_shot") == {
+      "summarizer", "summarizer_response_formatter", "terminator"
+   }
+
+   control_agents = get_reachable_agents(["controller", "control_starter"], mode="deep_research")
+   assert {"engineer", "engineer_nest", "executor", "installer", "terminator"} <= control_agents
+   assert "planner" not in control_agents
+
+
+def test_transit_message_hooks_do_not_pile_up_across_resets(tmp_path):
+   from types import SimpleNamespace
+   from autogen import ConversableAgent
+   from autogen.agentchat.group.group_utils import prepare_exclude_transit_messages
+   from cmbagent.cmbagent import CMBAgent
+
+   engineer = ConversableAgent("engineer", llm_config=False)
+   agent = object.__new__(CMBAgent)
+   agent.work_dir, agent.agents = str(tmp_path), [SimpleNamespace(agent=engineer)]
+
+   # every solve of a reused CMBAgent goes through initiate_group_chat, which registers the filter again
+   hooks = engineer.hook_lists["process_all_messages_before_reply"]
+   for _ in range(3):
+      prepare_exclude_transit_messages([engineer])
+      assert len(hooks) == 1
+      agent.reset()
+      assert hooks == []
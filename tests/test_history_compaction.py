@@ -0,0 +1,66 @@
+from cmbagent.utils.history_compaction import HistoryCompactor, get_history_compaction, message_tokens
+
+
+def test_history_compactor_budget():
+
+   output = "exitcode: 0 (execution succeeded)\nCode output: " + "1.0 " * 2000
+   code = "Here is the code:\n```python\n" + "x = 1\n" * 500 + "```\nDone."
+   messages = [{"role": "user", "name": "admin", "content": "the task"}]
+   for i in range(5):
+      messages.append({"role": "assistant", "name": "engineer", "content": code})
+      messages.append({"role": "user", "name": "executor", "content": output})
+
+   # under budget: untouched
+   compactor = HistoryCompactor(max_tokens=10 ** 6, keep_recent=2, name="engineer")
+   assert compactor.apply_transform(messages) is messages
+
+   # stale outputs and code blocks are dropped, the recent messages are kept
+   compactor = HistoryCompactor(max_tokens=5000, keep_recent=2, name="engineer")
+   compacted = compactor.apply_transform(messages)
+   assert compacted[0] == messages[0]
+   assert compacted[-2:] == messages[-2:]
+   assert "[code block dropped" in compacted[1]["content"]
+   assert sum(message_tokens(m) for m in compacted) <= 5000
+   assert compactor.stats["tokens_after"] < compactor.stats["tokens_before"]
+
+   # a tight budget folds the older turns into a summary
+   compactor = HistoryCompactor(max_tokens=500, keep_recent=2, name="engineer")
+   compacted = compactor.apply_transform(messages)
+   assert len(compacted) == 4
+   assert compacted[1]["name"] == "history_summary"
+   assert "engineer:" in compacted[1]["content"]
+
+   # opt-in: only the agents listed, over their defaults
+   settings = get_history_compaction({"engineer": False, "controller": {"max_tokens": 100}, "researcher": True})
+   assert sorted(settings) == ["controller", "researcher"]
+   assert settings["controller"] == {"max_tokens": 100, "keep_recent": 6}
+   assert get_history_compaction(None) == get_history_compaction(False) == {}
+   assert sorted(get_history_compaction(True)) == ["controller", "engineer", "researcher"]
+
+
+def test_compaction_tokens_in_cost_report(tmp_path):
+   import json
+   from types import SimpleNamespace
+   from cmbagent.cmbagent import CMBAgent
+   from cmbagent.utils.cost_ledger import CostLedger, cost_ledger_path
+
+   def cost_dict(name):
+      return {"Agent": [name], "Cost": [0.01], "Prompt Tokens": [100], "Completion Tokens": [10],
+              "Total Tokens": [110], "Model": ["gpt-4.1"]}
+
+   compactor = HistoryCompactor(max_tokens=5000, name="engineer")
+   compactor.stats.update(calls=3, compacted_calls=1, tokens_before=9000, tokens_after=4000)
+   agent = object.__new__(CMBAgent)
+   agent.work_dir, agent.final_context = str(tmp_path), {}
+   agent.agents = [SimpleNamespace(agent=SimpleNamespace(cost_dict=cost_dict(name))) for name in ("engineer", "executor")]
+   agent.history_compactors = {"engineer": compactor}
+   (tmp_path / "cost").mkdir()
+
+   agent.display_cost()
+   rows = {row["Agent"]: row for row in json.loads(open(agent.final_context["cost_report_path"]).read())}
+   assert rows["engineer"]["Prompt Tokens Before Compaction"] == 9000
+   assert rows["engineer"]["Prompt Tokens After Compaction"] == 4000
+   assert "Prompt Tokens Before Compaction" not in rows["executor"]
+   assert rows["Total"]["Prompt Tokens After Compaction"] == 4000
+   totals = CostLedger(cost_ledger_path(str(tmp_path))).totals()
+   assert totals["prompt_tokens_before_compaction"] == 9000 and totals["prompt_tokens_after_compaction"] == 4000
@@ -0,0 +1,31 @@
+from cmbagent.utils import FrozenLLMConfig
+
+
+def test_frozen_llm_config_overrides_share_settings():
+
+   base = FrozenLLMConfig.from_dict({
+      "cache_seed": None,
+      "temperature": 0.2,
+      "top_p": 0.1,
+      "config_list": [{"model": "gpt-4.1", "api_key": "k", "api_type": "openai"}],
+      "timeout": 1200,
+   })
+
+   o3 = base.override(model="o3-mini", reasoning_effort="medium")
+   assert o3.settings is base.settings
+   assert base.model == "gpt-4.1"
+
+   # reasoning models drop temperature/top_p
+   o3_dict = o3.to_dict()
+   assert "temperature" not in o3_dict and "top_p" not in o3_dict
+   assert o3_dict["config_list"][0]["model"] == "o3-mini"
+
+   # each agent gets its own mutable dict
+   first, second = base.to_dict(), base.to_dict()
+   first["config_list"][0]["response_format"] = object
+   assert "response_format" not in second["config_list"][0]
+
+   # per-agent temperature moves to the top level
+   warm = base.override(temperature=0.7).to_dict()
+   assert warm["temperature"] == 0.7
+   assert "temperature" not in warm["config_list"][0]
@@ -0,0 +1,245 @@
+import json
+import base64
+
+from mistralai.models import OCRResponse
+
+from cmbagent.utils.ocr import MistralOCRProcessor
+from cmbagent.utils.ocr_cache import OCRCache
+
+
+class FakeOCR:
+   def __init__(self):
+      self.calls = 0
+
+   async def process_async(self, **kwargs):
+      self.calls += 1
+      return OCRResponse.model_validate({
+         "pages": [{"index": i, "markdown": f"page {i + 1}", "images": [], "dimensions": None} for i in range(3)],
+         "model": "mistral-ocr-latest",
+         "usage_info": {"pages_processed": 3, "doc_size_bytes": 100},
+      })
+
+
+def test_ocr_cache(tmp_path):
+
+   pdf_path = tmp_path / "paper.pdf"
+   pdf_path.write_bytes(b"%PDF-1.4 fake")
+   cache = OCRCache(tmp_path / "ocr_cache.sqlite")
+   processor = MistralOCRProcessor(api_key="x", ocr_cache=cache)
+   processor.client = type("Client", (), {"ocr": FakeOCR()})()
+
+   # the same PDF in another work_dir is served from the cache
+   first = processor.process_single_pdf(str(pdf_path), work_dir=str(tmp_path / "run1"))
+   second = processor.process_single_pdf(str(pdf_path), work_dir=str(tmp_path / "run2"))
+   assert processor.client.ocr.calls == 1
+   assert second["full_markdown"] == first["full_markdown"] == "page 1\n\npage 2\n\npage 3"
+
+   costs = json.loads((tmp_path / "run2" / "ocr_cost.json").read_text())
+   assert costs["total_pages_processed"] == 0 and costs["total_cached_pages"] == 3
+   assert cache.stats() == {"hits": 1, "misses": 1, "cached_pages": 3}
+
+   # a changed file is a miss, and the cache is bounded
+   pdf_path.write_bytes(b"%PDF-1.4 edited")
+   processor.process_single_pdf(str(pdf_path), work_dir=str(tmp_path / "run1"))
+   assert processor.client.ocr.calls == 2
+   cache.max_size_bytes = cache.info()["size_bytes"] - 1
+   assert cache.evict() == 1 and cache.info()["entries"] == 1
+
+
+class FakeChunkOCR:
+   def __init__(self):
+      self.page_counts = []
+
+   async def process_async(self, document, **kwargs):
+      import base64, io
+      from pypdf import PdfReader
+      reader = PdfReader(io.BytesIO(base64.b64decode(document["document_url"].split(",", 1)[1])))
+      n = len(reader.pages)
+      self.page_counts.append(n)
+      widths = [int(page.mediabox.width) for page in reader.pages]
+      return OCRResponse.model_validate({
+         "pages": [{"index": i, "markdown": f"width {w}", "images": [], "dimensions": None} for i, w in enumerate(widths)],
+         "model": "mistral-ocr-latest",
+         "usage_info": {"pages_processed": n, "doc_size_bytes": 10},
+      })
+
+
+def test_ocr_in_chunks(tmp_path):
+   pypdf = __import__("pytest").importorskip("pypdf")
+
+   # pages told apart by their width
+   writer = pypdf.PdfWriter()
+   for width in range(100, 107):
+      writer.add_blank_page(width=width, height=100)
+   pdf_path = tmp_path / "thesis.pdf"
+   with open(pdf_path, "wb") as f:
+      writer.write(f)
+
+   processor = MistralOCRProcessor(api_key="x", ocr_cache=OCRCache(tmp_path / "ocr_cache.sqlite"), pages_per_chunk=3)
+   processor.client = type("Client", (), {"ocr": FakeChunkOCR()})()
+   result = processor.process_single_pdf(str(pdf_path), work_dir=str(tmp_path))
+
+   assert sorted(processor.client.ocr.page_counts) == [1, 3, 3]
+   assert [page["markdown"] for page in result["pages"]] == [f"width {w}" for w in range(100, 107)]
+   assert result["cost_info"]["pages_processed"] == 7
+
+
+class FakeImageOCR:
+   async def process_async(self, **kwargs):
+      image = "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8 jpeg bytes").decode()
+      return OCRResponse.model_validate({
+         "pages": [{"index": 0, "markdown": "see ![img-0.jpeg](img-0.jpeg)", "dimensions": None, "images": [{
+            "id": "img-0.jpeg", "top_left_x": 1, "top_left_y": 2, "bottom_right_x": 3, "bottom_right_y": 4,
+            "image_base64": image, "image_annotation": '{"image_type": "graph", "description": "a plot", "label": "1"}',
+         }]}],
+         "model": "mistral-ocr-latest",
+         "usage_info": {"pages_processed": 1, "doc_size_bytes": 10},
+      })
+
+
+def test_ocr_images_written_to_files(tmp_path):
+   pdf_path = tmp_path / "paper.pdf"
+   pdf_path.write_bytes(b"%PDF-1.4 fake")
+   processor = MistralOCRProcessor(api_key="x", ocr_cache=False)
+   processor.client = type("Client", (), {"ocr": FakeImageOCR()})()
+   result = processor.process_single_pdf(str(pdf_path), output_dir=str(tmp_path / "out"))
+
+   ref = result["pages"][0]["images"][0]
+   assert ref["path"] == "images/paper/1_0.jpeg" and ref["annotation"]["label"] == "1"
+   assert (tmp_path / "out" / ref["path"]).read_bytes() == b"\xff\xd8 jpeg bytes"
+   assert result["full_markdown"] == "see ![img-0.jpeg](images/paper/1_0.jpeg)"
+   assert "data:image" not in (tmp_path / "out" / "paper_ocr.json").read_text()
+
+
+class SlowOCR(FakeOCR):
+   async def process_async(self, document, **kwargs):
+      import asyncio
+      if "c2xvdw" in document["document_url"]:  # base64 of "slow"
+         await asyncio.sleep(10)
+      return await super().process_async(**kwargs)
+
+
+def test_process_folder_file_timeout(tmp_path):
+   folder = tmp_path / "pdfs"
+   folder.mkdir()
+   (folder / "fast.pdf").write_bytes(b"fast")
+   (folder / "slow.pdf").write_bytes(b"slow")
+   processor = MistralOCRProcessor(api_key="x", ocr_cache=False)
+   processor.client = type("Client", (), {"ocr": SlowOCR()})()
+
+   # the slow PDF is given up, the other one is kept
+   results = processor.process_folder(str(folder), output_dir=str(tmp_path / "out"), max_workers=2, file_timeout=0.5)
+   assert results["processed_files"] == 1 and results["failed_files"] == 1
+   failed = [result for result in results["results"] if not result["success"]]
+   assert failed[0]["pdf_path"].endswith("slow.pdf") and "timed out" in failed[0]["error"]
+   assert (tmp_path / "out" / "fast.md").exists()
+
+
+class FlakyOCR(FakeOCR):
+   async def process_async(self, document, **kwargs):
+      if "YmFk" in document["document_url"]:  # base64 of "bad"
+         raise ValueError("unreadable PDF")
+      return await super().process_async(**kwargs)
+
+
+def test_process_folder_incremental(tmp_path):
+   folder = tmp_path / "pdfs"
+   folder.mkdir()
+   (folder / "a.pdf").write_bytes(b"a")
+   (folder / "b.pdf").write_bytes(b"bad")
+   processor = MistralOCRProcessor(api_key="x", ocr_cache=False)
+   processor.client = type("Client", (), {"ocr": FlakyOCR()})()
+   output_dir = str(tmp_path / "out")
+
+   first = processor.process_folder(str(folder), output_dir=output_dir)
+   assert (first["processed_files"], first["failed_files"], first["skipped_files"]) == (1, 1, 0)
+
+   # only the failed PDF is retried
+   (folder / "b.pdf").write_bytes(b"good")
+   second = processor.process_folder(str(folder), output_dir=output_dir)
+   assert (second["processed_files"], second["failed_files"], second["skipped_files"]) == (1, 0, 1)
+   assert second["skipped"][0].endswith("a.pdf") and processor.client.ocr.calls == 2
+
+   # then a changed PDF, and one whose outputs were removed
+   (folder / "a.pdf").write_bytes(b"a, edited")
+   (tmp_path / "out" / "b.md").unlink()
+   third = processor.process_folder(str(folder), output_dir=output_dir)
+   assert (third["processed_files"], third["skipped_files"]) == (2, 0)
+   assert processor.process_folder(str(folder), output_dir=output_dir)["skipped_files"] == 2
+   assert processor.process_folder(str(folder), output_dir=output_dir, incremental=False)["processed_files"] == 2
+
+
+def write_text_pdf(path, page_texts):
+   # pages with a text layer, or blank (as scanned pages) for None
+   from pypdf import PdfWriter
+   from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+   writer = PdfWriter()
+   font = writer._add_object(DictionaryObject({
+      NameObject("/Type"): NameObject("/Font"),
+      NameObject("/Subtype"): NameObject("/Type1"),
+      NameObject("/BaseFont"): NameObject("/Helvetica"),
+   }))
+   for text in page_texts:
+      page = writer.add_blank_page(width=612, height=792)
+      if text is None:
+         continue
+      stream = DecodedStreamObject()
+      lines = " ".join(f"({line}) Tj 0 -14 Td" for line in text.split("\n"))
+      stream.set_data(f"BT /F1 11 Tf 72 720 Td {lines} ET".encode())
+      page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+      page[NameObject("/Contents")] = writer._add_object(stream)
+   with open(path, "wb") as f:
+      writer.write(f)
+
+
+def test_text_layer_engine(tmp_path):
+   __import__("pytest").importorskip("pypdf")
+
+   text = "\n".join(f"Line {i} of a born-digital paper about the cosmic microwave background." for i in range(10))
+   pdf_path = tmp_path / "paper.pdf"
+   write_text_pdf(pdf_path, [text, None, text])
+
+   processor = MistralOCRProcessor(api_key="x", ocr_cache=False)
+   processor.client = type("Client", (), {"ocr": FakeChunkOCR()})()
+   result = processor.process_single_pdf(str(pdf_path), work_dir=str(tmp_path))
+
+   # only the page without a text layer is sent to Mistral
+   assert processor.client.ocr.page_counts == [1]
+   assert [page["engine"] for page in result["pages"]] == ["text_layer", "mistral", "text_layer"]
+   assert "cosmic microwave background" in result["pages"][0]["markdown"]
+   assert result["pages"][1]["markdown"] == "width 612"
+   assert result["cost_info"]["pages_processed"] == 1 and result["cost_info"]["local_pages"] == 2
+
+   # read in threads by default: no worker processes re-importing the caller's __main__
+   from cmbagent.utils import ocr_engines
+   assert ocr_engines._process_pool is None
+
+
+def test_pdf_data_url():
+   import io, os
+   from cmbagent.utils.ocr import _pdf_data_url
+
+   # encoded block by block into one buffer, as a whole file would be
+   for data in (b"", b"%PDF", os.urandom(7 * 1024 * 1024 + 1)):
+      expected = "data:application/pdf;base64," + base64.b64encode(data).decode()
+      assert _pdf_data_url(io.BytesIO(data), len(data)) == expected
+   # a file that shrank since its size was read
+   assert _pdf_data_url(io.BytesIO(b"%PDF"), 100) == "data:application/pdf;base64,JVBERg=="
+
+
+def test_text_layer_without_mistral_key(tmp_path, monkeypatch):
+   pytest = __import__("pytest")
+   pytest.importorskip("pypdf")
+   monkeypatch.delenv("MISTRAL_API_KEY", raising=False)
+
+   text = "\n".join(f"Line {i} of a born-digital paper about the cosmic microwave background." for i in range(10))
+   write_text_pdf(tmp_path / "digital.pdf", [text, text])
+   write_text_pdf(tmp_path / "scanned.pdf", [text, None])
+   processor = MistralOCRProcessor(ocr_cache=False)
+
+   # the key is only needed once a page has to go to Mistral
+   result = processor.process_single_pdf(str(tmp_path / "digital.pdf"), output_dir=str(tmp_path / "out"))
+   assert [page["engine"] for page in result["pages"]] == ["text_layer", "text_layer"]
+   with pytest.raises(ValueError, match="MISTRAL_API_KEY"):
+      processor.process_single_pdf(str(tmp_path / "scanned.pdf"), output_dir=str(tmp_path / "out"))
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from cmbagent.workflows.deep_research import plan_dependencies, _ancestors, _run_control_steps_in_parallel
+from cmbagent.agents.planning.planner_response_formatter.planner_response_formatter import (
+   PlannerResponse,
+   _parse_plan_string,
+)
+
+
+def test_plan_dependencies():
+
+   plan = PlannerResponse(sub_tasks=[
+      {"sub_task": "review A", "sub_task_agent": "researcher", "bullet_points": ["a"], "depends_on": []},
+      {"sub_task": "review B", "sub_task_agent": "researcher", "bullet_points": ["b"], "depends_on": []},
+      {"sub_task": "compare", "sub_task_agent": "engineer", "bullet_points": ["c"], "depends_on": [1, 2]},
+      {"sub_task": "report", "sub_task_agent": "researcher", "bullet_points": ["d"], "depends_on": [3, 4, 7]},
+   ])
+
+   # the formatted plan (what is stored in the context) keeps the dependencies
+   sub_tasks = _parse_plan_string(plan.format())
+   assert [sub_task["depends_on"] for sub_task in sub_tasks] == [[], [], [1, 2], [3, 4, 7]]
+
+   dependencies = plan_dependencies(sub_tasks)
+   assert dependencies == {1: set(), 2: set(), 3: {1, 2}, 4: {3}}
+   assert _ancestors(4, dependencies) == {1, 2, 3}
+
+   # plans without declared dependencies run sequentially
+   assert plan_dependencies([{"sub_task": "x"}, {"sub_task": "y"}]) == {1: set(), 2: {1}}
+
+
+class FakeControlAgent:
+   def __init__(self, work_dir, failing_steps):
+      self.work_dir, self.failing_steps = work_dir, failing_steps
+
+   def solve(self, task, max_rounds, initial_agent, shared_context, step):
+      (self.work_dir / "time").mkdir(parents=True, exist_ok=True)
+      (self.work_dir / "data").mkdir(exist_ok=True)
+      (self.work_dir / "data" / f"step_{step}.txt").write_text("output")
+      self.final_context = {**shared_context, "work_dir": str(self.work_dir), "max_n_attempts": 3,
+                            "n_attempts": 3 if step in self.failing_steps else 0}
+      self.chat_result = SimpleNamespace(chat_history=[{"name": "engineer", "content": f"step {step} done"}])
+
+   def display_cost(self, name_append=None):
+      pass
+
+
+def test_parallel_steps_stop_at_failed_step(tmp_path):
+   control_dir, context_dir = tmp_path / "control", tmp_path / "context"
+   context_dir.mkdir()
+   # outputs of an earlier run in the same work_dir
+   for folder in (control_dir / "data", control_dir / "step_2" / "data"):
+      folder.mkdir(parents=True)
+      (folder / "stale.txt").write_text("old")
+
+   sub_tasks = [{"sub_task": f"task {i}", "sub_task_agent": "engineer", "depends_on": []} for i in range(1, 4)]
+   base_context = {"database_path": "data", "codebase_path": "codebase", "previous_steps_execution_summary": "\n"}
+   results, context = _run_control_steps_in_parallel(
+      "task", sub_tasks, 1, base_context, control_dir, context_dir,
+      lambda step_dir: FakeControlAgent(step_dir, failing_steps={2}), 10, 3, clear_work_dir=True)
+
+   # step 2 failed: step 3 is neither merged nor checkpointed, so a restart runs steps 2 and 3 again
+   assert context["current_plan_step_number"] == 2 and context["n_attempts"] == 3
+   assert sorted(path.name for path in (control_dir / "data").iterdir()) == ["step_1.txt"]
+   assert sorted(path.name for path in context_dir.glob("*.ckpt")) == ["context_step_1.ckpt"]
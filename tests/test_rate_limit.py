@@ -0,0 +1,111 @@
+import time
+import asyncio
+import multiprocessing
+
+import pytest
+
+from cmbagent.utils.rate_limit import RateLimiter, retry_delay, is_rate_limit_error, is_retryable_error
+
+
+class RateLimitError(Exception):
+   def __init__(self, headers):
+      self.status_code = 429
+      self.response = type("Response", (), {"headers": headers})()
+
+
+def test_rate_limiter():
+
+   limiter = RateLimiter({"default": {"requests_per_minute": 600, "tokens_per_minute": None}})
+
+   # 600 requests per minute: a burst of 100, then 10 per second
+   start = time.monotonic()
+   for _ in range(102):
+      limiter.call("openai", "gpt-4.1", lambda: None)
+   assert 0.15 < time.monotonic() - start < 1.0
+   assert limiter.stats()["openai/gpt-4.1"]["requests"] == 102
+
+   assert retry_delay(RateLimitError({"retry-after": "2"})) == 2
+   assert retry_delay(RateLimitError({"x-ratelimit-reset-requests": "1m30s", "x-ratelimit-reset-tokens": "250ms"})) == 90
+   assert is_rate_limit_error(RateLimitError({})) and not is_rate_limit_error(ValueError())
+
+   # rate-limited calls back off by the retry-after header and are retried
+   calls = []
+
+   def flaky():
+      calls.append(time.monotonic())
+      if len(calls) < 3:
+         raise RateLimitError({"retry-after-ms": "100"})
+      return "ok"
+
+   assert limiter.call("mistral", "mistral-ocr-latest", flaky) == "ok"
+   assert calls[-1] - calls[0] >= 0.2
+   stats = limiter.stats()["mistral/mistral-ocr-latest"]
+   assert stats["rate_limit_errors"] == 2 and stats["rate_factor"] == pytest.approx(0.25 * 1.02)
+
+   with pytest.raises(ValueError):
+      limiter.call("mistral", None, lambda: int("x"))
+
+
+class ServerError(Exception):
+   status_code = 503
+
+
+def test_rate_limiter_acall():
+
+   limiter = RateLimiter({"default": {"requests_per_minute": None, "tokens_per_minute": None}})
+   calls = []
+
+   async def flaky(value):
+      calls.append(value)
+      if len(calls) < 3:
+         raise ServerError()
+      return value
+
+   # server errors are retried without lowering the rate, other errors are raised
+   assert asyncio.run(limiter.acall("mistral", None, flaky, "ok", base_delay=0.01)) == "ok"
+   stats = limiter.stats()["mistral"]
+   assert len(calls) == 3 and stats["retries"] == 2 and stats["rate_factor"] == 1.0
+   assert is_retryable_error(ServerError()) and not is_retryable_error(ValueError())
+
+   async def broken():
+      raise ValueError()
+
+   with pytest.raises(ValueError):
+      asyncio.run(limiter.acall("mistral", None, broken))
+
+
+def test_rate_limiter_acall_waits_on_the_event_loop():
+
+   limiter = RateLimiter({"default": {"requests_per_minute": 6, "tokens_per_minute": None}})
+   limiter.call("mistral", None, lambda: None)
+
+   async def ocr():
+      return "ok"
+
+   # the next request is ten seconds away: waiting for it holds no thread and can be cancelled
+   start = time.monotonic()
+   with pytest.raises(asyncio.TimeoutError):
+      asyncio.run(asyncio.wait_for(limiter.acall("mistral", None, ocr), 0.1))
+   assert time.monotonic() - start < 2.0
+   assert limiter.stats()["mistral"]["requests"] == 1
+
+
+def make_shared_calls(path, n):
+   limiter = RateLimiter({"default": {"requests_per_minute": 1200, "tokens_per_minute": None}})
+   limiter.share(path)
+   for _ in range(n):
+      limiter.call("openai", "gpt-4.1", lambda: None)
+
+
+def test_rate_limiter_shared_between_processes(tmp_path):
+   path = tmp_path / "rate_limits.sqlite"
+
+   # 1200 requests per minute: one burst of 200 for both processes, then 20 per second
+   start = time.monotonic()
+   processes = [multiprocessing.get_context("fork").Process(target=make_shared_calls, args=(path, 110)) for _ in range(2)]
+   for process in processes:
+      process.start()
+   for process in processes:
+      process.join()
+   assert all(process.exitcode == 0 for process in processes)
+   assert time.monotonic() - start > 0.8
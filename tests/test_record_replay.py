@@ -0,0 +1,55 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from autogen.coding import CodeBlock, LocalCommandLineCodeExecutor
+
+from cmbagent.utils.record_replay import RunReplayer, record_run, replay_run, run_session
+
+
+def test_code_execution_record_and_replay(tmp_path):
+
+   log_path = tmp_path / "run.jsonl.gz"
+   marker = tmp_path / "marker.txt"
+   code = f"open({str(marker)!r}, 'a').write('x')\nprint('hello')"
+   (tmp_path / "code").mkdir()
+   executor = LocalCommandLineCodeExecutor(work_dir=tmp_path / "code")
+
+   with record_run(log_path):
+      recorded = executor.execute_code_blocks([CodeBlock(code=code, language="python")])
+   assert recorded.exit_code == 0
+   assert marker.read_text() == "x"
+
+   # replayed results come from the log, the code does not run again
+   with replay_run(log_path) as replayer:
+      replayed = executor.execute_code_blocks([CodeBlock(code=code, language="python")])
+   assert (replayed.exit_code, replayed.output) == (recorded.exit_code, recorded.output)
+   assert marker.read_text() == "x"
+   assert replayer.divergences == []
+   assert replayer.remaining() == (0, 0)
+
+   with pytest.raises(RuntimeError):
+      with replay_run(log_path, strict=True):
+         executor.execute_code_blocks([CodeBlock(code="print('changed')", language="python")])
+
+   with pytest.raises(ValueError):
+      run_session(record=log_path, replay=log_path)
+
+
+def test_replayed_reply_keeps_usage_summary(tmp_path):
+   from autogen.oai.client import OpenAIWrapper
+
+   response = {
+      "id": "x", "object": "chat.completion", "created": 0, "model": "gpt-4.1",
+      "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "replayed"}}],
+   }
+   log_path = tmp_path / "run.jsonl"
+   log_path.write_text(json.dumps({"type": "llm", "agent": "engineer", "key": None, "response": response}) + "\n")
+   wrapper = OpenAIWrapper(config_list=[{"model": "gpt-4.1", "api_key": "sk-x"}])
+   usage = {"total_cost": 0.5, "gpt-4.1": {"cost": 0.5, "prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110}}
+   wrapper.total_usage_summary, wrapper.actual_usage_summary = dict(usage), dict(usage)
+
+   replayer = RunReplayer(log_path)
+   reply = replayer.create(wrapper, {"messages": [{"role": "user", "content": "hi"}], "agent": SimpleNamespace(name="engineer")})
+   assert reply.choices[0].message.content == "replayed"
+   assert wrapper.total_usage_summary == usage and wrapper.actual_usage_summary == usage
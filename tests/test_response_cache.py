@@ -0,0 +1,69 @@
+import json
+import time
+from types import SimpleNamespace
+
+from cmbagent.utils.response_cache import ResponseCache, request_key
+
+
+def test_response_cache_hits_and_eviction(tmp_path):
+
+   params = {
+      "model": "gpt-4.1",
+      "messages": [{"role": "user", "content": "hi"}],
+      "temperature": 0.0,
+      "stream": False,
+   }
+   key = request_key(params)
+
+   # irrelevant parameters do not change the key, sampling parameters do
+   assert request_key({**params, "stream": True}) == key
+   assert request_key({**params, "temperature": 0.5}) != key
+
+   cache = ResponseCache(tmp_path / "cache.sqlite", max_size_mb=1)
+   assert cache.get(key, "engineer") is None
+   cache.set(key, '{"id": "x"}', model="gpt-4.1", agent_name="engineer")
+   assert cache.get(key, "engineer") == '{"id": "x"}'
+   assert cache.stats() == {"engineer": {"hits": 1, "misses": 1}}
+
+   # persisted on disk
+   reopened = ResponseCache(tmp_path / "cache.sqlite")
+   assert reopened.get(key) == '{"id": "x"}'
+
+   # least recently used entries go first when over the size limit
+   cache.max_size_bytes = 2 * 600
+   for i in range(3):
+      cache.set(f"k{i}", "x" * 600)
+      time.sleep(0.01)
+   cache.get("k0")
+   cache.evict()
+   assert cache.get("k0") is not None
+   assert cache.get("k1") is None
+
+   # expired entries are dropped
+   cache.max_age_seconds = 0
+   cache.evict()
+   assert cache.info()["entries"] == 0
+
+
+class HitCache:
+   def get(self, key, agent_name=None):
+      return json.dumps({
+         "id": "x", "object": "chat.completion", "created": 0, "model": "gpt-4.1",
+         "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "cached"}}],
+      })
+
+
+def test_cache_hit_keeps_usage_summary():
+   from autogen.oai.client import OpenAIWrapper
+   from cmbagent.utils.response_cache import install_response_cache_hook
+
+   install_response_cache_hook()
+   wrapper = OpenAIWrapper(config_list=[{"model": "gpt-4.1", "api_key": "sk-x"}])
+   usage = {"total_cost": 0.5, "gpt-4.1": {"cost": 0.5, "prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110}}
+   wrapper.total_usage_summary, wrapper.actual_usage_summary = dict(usage), dict(usage)
+
+   # the calls paid for before a hit are still reported
+   agent = SimpleNamespace(name="engineer", _cmbagent_response_cache=HitCache())
+   response = wrapper.create(messages=[{"role": "user", "content": "hi"}], agent=agent)
+   assert response.choices[0].message.content == "cached" and response.cost == 0
+   assert wrapper.total_usage_summary == usage and wrapper.actual_usage_summary == usage
@@ -0,0 +1,35 @@
+from cmbagent.utils.step_memo import StepMemo
+
+
+def test_step_memo_fingerprint_and_restore(tmp_path):
+
+   work_dir = tmp_path / "control"
+   (work_dir / "codebase").mkdir(parents=True)
+   (work_dir / "data").mkdir()
+   (work_dir / "codebase" / "sum.py").write_text("print(55)")
+
+   memo = StepMemo(tmp_path / "step_memo")
+   sub_task = {"sub_task": "sum", "sub_task_agent": "engineer", "bullet_points": ["numpy"], "depends_on": []}
+   settings = {"engineer_model": "gpt-4.1"}
+   context = {"database_path": "data", "codebase_path": "codebase", "previous_steps_execution_summary": "\n"}
+
+   fingerprint = memo.fingerprint("task", sub_task, settings, context, work_dir)
+   assert memo.load(fingerprint) is None
+
+   # any input change gives another fingerprint, depends_on alone does not
+   assert memo.fingerprint("task", {**sub_task, "depends_on": [1]}, settings, context, work_dir) == fingerprint
+   assert memo.fingerprint("task", {**sub_task, "sub_task": "sum twice"}, settings, context, work_dir) != fingerprint
+   assert memo.fingerprint("task", sub_task, {"engineer_model": "o3"}, context, work_dir) != fingerprint
+   (work_dir / "codebase" / "sum.py").write_text("print(56)")
+   assert memo.fingerprint("task", sub_task, settings, context, work_dir) != fingerprint
+   (work_dir / "codebase" / "sum.py").write_text("print(55)")
+
+   # the step's outputs are restored from the memo
+   (work_dir / "data" / "result.txt").write_text("55")
+   memo.save(fingerprint, work_dir, {**context, "n_attempts": 0}, [{"content": "done"}], "### Step 1\ndone")
+   (work_dir / "data" / "result.txt").unlink()
+
+   entry = memo.load(fingerprint)
+   assert entry["summary"] == "### Step 1\ndone"
+   memo.restore(entry, work_dir)
+   assert (work_dir / "data" / "result.txt").read_text() == "55"
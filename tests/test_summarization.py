@@ -0,0 +1,89 @@
+import json
+from types import SimpleNamespace
+
+from cmbagent.utils import summarization
+from cmbagent.utils.cost_ledger import CostLedger, cost_ledger_path
+
+
+SUMMARY = {
+   "title": "A paper", "authors": ["A. Author"], "date": "2024", "abstract": "We did it.",
+   "keywords": ["CMB"], "key_findings": ["It works."], "scientific_software": ["camb"],
+   "data_sources": [], "data_sets": ["Planck 2018"], "data_analysis_methods": ["MCMC"],
+}
+
+
+class FakeWrapper:
+   def __init__(self):
+      self.messages = []
+
+   def create(self, messages):
+      self.messages.append(messages)
+      message = SimpleNamespace(content=json.dumps(SUMMARY))
+      usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120)
+      return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage, cost=0.01)
+
+
+def test_summarize_documents_direct(tmp_path, monkeypatch):
+   wrapper = FakeWrapper()
+   monkeypatch.setattr(summarization, "_get_summarizer_client", lambda model, api_keys: wrapper)
+   folder = tmp_path / "docs_processed"
+   folder.mkdir()
+   for name in ("2401.00001.md", "2401.00002.md"):
+      (folder / name).write_text("# A paper\n\nWe did it.")
+
+   # one call per document, no agents, same output contract
+   results = summarization.summarize_documents(str(folder), work_dir_base=str(tmp_path / "summaries"))
+   assert results["processed_files"] == 2 and len(wrapper.messages) == 2
+   assert wrapper.messages[0][0]["role"] == "system" and "summarizer" in wrapper.messages[0][0]["content"]
+   for result in results["results"]:
+      assert result["document_summary"] == SUMMARY
+      with open(f"{result['work_dir']}/document_summary.json") as f:
+         assert json.load(f) == SUMMARY
+      assert CostLedger(cost_ledger_path(result["work_dir"])).totals()["total_tokens"] == 120
+
+
+def test_summarize_documents_rerun(tmp_path, monkeypatch):
+   wrapper = FakeWrapper()
+   monkeypatch.setattr(summarization, "_get_summarizer_client", lambda model, api_keys: wrapper)
+   folder = tmp_path / "docs_processed"
+   folder.mkdir()
+   for name in ("2401.00001.md", "2401.00002.md"):
+      (folder / name).write_text("# A paper\n\nWe did it.")
+   work_dir_base = tmp_path / "summaries"
+   summarization.summarize_documents(str(folder), work_dir_base=str(work_dir_base))
+   (work_dir_base / "stale.txt").write_text("from an earlier task")
+
+   # the default clear_work_dir keeps the manifest and the summaries of unchanged documents
+   (folder / "2401.00002.md").write_text("# A paper\n\nWe did it again.")
+   results = summarization.summarize_documents(str(folder), work_dir_base=str(work_dir_base))
+   assert (results["processed_files"], results["skipped_files"]) == (1, 1) and len(wrapper.messages) == 3
+   assert all(result["document_summary"] == SUMMARY for result in results["results"])
+   assert sorted(path.name for path in work_dir_base.iterdir()) == [
+      "doc_001_2401.00001", "doc_002_2401.00002", "processing_summary.json", "summary_manifest.json"]
+
+
+def test_split_markdown():
+   pages = [f"<!-- page {i} -->\n\n## Section {i}\n\n" + f"Text of page {i}. " * 50 for i in range(1, 11)]
+   markdown = "# paper\n\n" + "\n\n".join(pages)
+
+   # cut at page markers and headings, pages tracked
+   chunks = summarization.split_markdown(markdown, max_chars=2500)
+   assert len(chunks) > 1 and all(len(chunk["text"]) <= 2500 for chunk in chunks)
+   assert "\n".join(chunk["text"] for chunk in chunks) == markdown
+   assert chunks[0]["pages"][0] == 1 and chunks[-1]["pages"][1] == 10
+   assert all(chunk["text"].lstrip().startswith(("<!--", "#")) for chunk in chunks)
+   assert summarization.split_markdown(markdown, max_chars=len(markdown)) == [{"text": markdown, "pages": None}]
+
+
+def test_summarize_long_document(tmp_path, monkeypatch):
+   wrapper = FakeWrapper()
+   monkeypatch.setattr(summarization, "_get_summarizer_client", lambda model, api_keys: wrapper)
+   document = tmp_path / "long.md"
+   document.write_text("\n\n".join(f"<!-- page {i} -->\n\n" + "Text. " * 400 for i in range(1, 9)))
+
+   # one call per part, then one to merge them
+   summary = summarization.summarize_document(str(document), work_dir=str(tmp_path / "summary"), max_chunk_chars=5000)
+   assert summary == SUMMARY and len(wrapper.messages) == 5
+   assert "part 1 of 4 of the document (pages 1-2)" in wrapper.messages[0][0]["content"]
+   assert json.loads(wrapper.messages[-1][1]["content"]) == [SUMMARY] * 4
+   assert CostLedger(cost_ledger_path(str(tmp_path / "summary"))).totals()["total_tokens"] == 600
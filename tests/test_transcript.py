@@ -0,0 +1,41 @@
+import threading
+
+from autogen.agentchat.groupchat import GroupChat
+from cmbagent.utils.transcript import transcript_session, read_transcript, tail_transcript, follow_transcript
+
+
+class Speaker:
+   def __init__(self, name):
+      self.name = name
+
+
+def test_transcript_streaming(tmp_path):
+
+   path = tmp_path / "chats" / "transcript.jsonl"
+   groupchat = GroupChat(agents=[], messages=[])
+
+   with transcript_session(path, batch_size=2, flush_interval=60) as writer:
+      for i, name in enumerate(["engineer", "executor", "engineer"]):
+         groupchat.append({"role": "user", "content": f"message {i}"}, Speaker(name))
+      # every message is readable as soon as it is appended, only the fsyncs are batched
+      assert [m["content"] for m in read_transcript(path)] == ["message 0", "message 1", "message 2"]
+      assert writer._unsynced == 1
+   assert writer.n_messages == 3
+
+   # messages outside the session are not recorded
+   groupchat.append({"role": "user", "content": "ignored"}, Speaker("engineer"))
+   with open(path, "a") as f:
+      f.write('{"index": 3, "name": "engineer"')  # cut short by a crash
+
+   assert [m["content"] for m in read_transcript(path, agents=["engineer"])] == ["message 0", "message 2"]
+   assert [m["index"] for m in tail_transcript(path, n=1)] == [2]
+
+   stop = threading.Event()
+   stop.set()
+   assert len(list(follow_transcript(path, stop=stop))) == 3
+
+   # a later solve in the same chats directory continues the indices, after the cut line
+   with transcript_session(path) as writer:
+      groupchat.append({"role": "user", "content": "message 3"}, Speaker("engineer"))
+   assert [m["index"] for m in read_transcript(path)] == [0, 1, 2, 3]
+   assert tail_transcript(path, n=1)[0]["content"] == "message 3"
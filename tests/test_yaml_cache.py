@@ -0,0 +1,22 @@
+import os
+
+from cmbagent.utils.yaml import yaml_load_file, yaml_load_file_cached
+
+
+def test_yaml_load_file_cached(tmp_path):
+
+   yaml_file = tmp_path / "agent.yaml"
+   yaml_file.write_text("name: agent\ntemperature: 1e-5\n")
+
+   info = yaml_load_file_cached(str(yaml_file))
+   assert info == yaml_load_file(str(yaml_file))
+
+   # callers get their own copy
+   info["name"] = "changed"
+   assert yaml_load_file_cached(str(yaml_file))["name"] == "agent"
+
+   # edits are picked up
+   yaml_file.write_text("name: renamed\n")
+   stat = os.stat(yaml_file)
+   os.utime(yaml_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+   assert yaml_load_file_cached(str(yaml_file)) == {"name": "renamed"}